@@ -0,0 +1,509 @@
+"""
+Benchmark suite with scaling curves and baseline comparison.
+
+Measures zone evaluation across polygon vertex counts, polygon grids against
+prepared geometry (including a pathological spiky polygon), ingest across zone
+counts, object counts and history table sizes, ingest body decoding per
+codec, sharded ingest across worker processes, zone edits across fleet
+sizes, and the read API against
+populated databases. Every case runs against its own temporary SQLite
+file. Results are written as JSON; --compare flags cases that got slower
+than a stored baseline by more than --threshold and exits non-zero.
+
+Run from the backend directory:
+
+    python -m benchmarks.suite --out bench.json
+    python -m benchmarks.suite --quick --compare bench.json
+"""
+import argparse
+import json
+import math
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List
+from sqlalchemy import insert
+from sqlmodel import SQLModel, Session, create_engine
+from src.app.db.models import AlertEvent, AlertType, Position, TelemetryData, TelemetryPoint, TelemetryRecord, Zone
+from src.app.db.session import configure_sqlite
+from src.app.services import codec
+from src.app.services.ingestion import process_batch, process_telemetry
+from src.app.services.state_store import state_store
+from src.app.services.trails import trail_buffer
+from src.app.services.zone_eval import CompiledZone, is_point_in_zone
+from src.app.services.zone_registry import zone_registry
+from benchmarks.zone_index import MAX_LAT, MAX_LON, MIN_LAT, MIN_LON, make_zones
+
+T0 = datetime(2026, 2, 1, tzinfo=timezone.utc)
+
+FULL = {
+    "vertices": [4, 16, 64, 256, 1024, 4096],
+    "grid_vertices": [2000, 10000, 50000],
+    "zones": [1, 10, 100, 1000],
+    "objects": [10, 1000, 10000],
+    "history": [0, 100_000, 1_000_000],
+    "api_objects": [100, 1000],
+    "shards": [1, 2, 4, 8],
+    "ops": 2000,
+    "repeats": 5,
+}
+QUICK = {
+    "vertices": [4, 64, 1024],
+    "grid_vertices": [2000, 20000],
+    "zones": [1, 100],
+    "objects": [10, 1000],
+    "history": [0, 50_000],
+    "api_objects": [100],
+    "shards": [2],
+    "ops": 500,
+    "repeats": 3,
+}
+
+class Case:
+    """
+    One temporary SQLite database with the in-process caches reset around it.
+    """
+
+    def __init__(self):
+        self._dir = tempfile.TemporaryDirectory(prefix="geofence-bench-")
+        self.engine = create_engine(f"sqlite:///{Path(self._dir.name) / 'bench.db'}",
+                                    connect_args={"check_same_thread": False})
+        configure_sqlite(self.engine)
+        SQLModel.metadata.create_all(self.engine)
+        self.session = Session(self.engine)
+
+    def __enter__(self) -> "Case":
+        zone_registry.reset()
+        state_store.reset()
+        trail_buffer.reset()
+        return self
+
+    def __exit__(self, *exc):
+        self.session.close()
+        self.engine.dispose()
+        zone_registry.reset()
+        state_store.reset()
+        trail_buffer.reset()
+        self._dir.cleanup()
+
+def timed(fn: Callable[[], None], ops: int, repeats: int) -> float:
+    """
+    Best-of-`repeats` microseconds per operation for `fn`, which performs
+    `ops` operations per call. The minimum is the least noisy estimate on a
+    shared machine.
+    """
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) / ops * 1e6)
+    return min(samples)
+
+def make_point(object_id: str, seconds: float, rng: random.Random) -> TelemetryPoint:
+    return TelemetryPoint(
+        object_id=object_id,
+        ts=T0 + timedelta(seconds=seconds),
+        position=Position(lat=rng.uniform(MIN_LAT, MAX_LAT), lon=rng.uniform(MIN_LON, MAX_LON)),
+        confidence=0.9,
+        telemetry=TelemetryData(speed_mps=10, heading_deg=90),
+    )
+
+def regular_polygon(vertices: int, lat: float, lon: float, radius: float) -> Zone:
+    coords = [[lat + radius * math.sin(2 * math.pi * k / vertices), lon + radius * math.cos(2 * math.pi * k / vertices)]
+              for k in range(vertices)]
+    return Zone(id=1, name=f"poly_{vertices}", is_polygon=True, polygon_coords=json.dumps(coords))
+
+def seed_history(session: Session, rows: int, objects: int):
+    chunk = 50_000
+    for offset in range(0, rows, chunk):
+        session.execute(insert(TelemetryRecord), [
+            dict(object_id=f"obj_{i % objects}", ts=T0 - timedelta(seconds=rows - i),
+                 lat=60 + (i % 1000) / 1000, lon=-80 + (i % 700) / 700)
+            for i in range(offset, min(rows, offset + chunk))
+        ])
+    session.commit()
+
+# --- Benchmarks ---
+
+def bench_zone_eval(cfg: dict, results: Dict[str, dict]):
+    rng = random.Random(1)
+    for vertices in cfg["vertices"]:
+        zone = regular_polygon(vertices, 63.0, -80.0, 1.0)
+        points = [make_point("p", 0, rng) for _ in range(cfg["ops"])]
+        # Half the points inside the zone's bbox so both paths do real work
+        for point in points[::2]:
+            point.position.lat = 63.0 + rng.uniform(-1, 1)
+            point.position.lon = -80.0 + rng.uniform(-1, 1)
+        compiled = CompiledZone(zone)
+
+        def reference():
+            for point in points:
+                is_point_in_zone(point, zone)
+
+        def prepared():
+            for point in points:
+                compiled.contains(point.position.lat, point.position.lon)
+
+        record(results, f"zone_eval.is_point_in_zone[vertices={vertices}]",
+               timed(reference, len(points), cfg["repeats"]), "us/op")
+        record(results, f"zone_eval.compiled_contains[vertices={vertices}]",
+               timed(prepared, len(points), cfg["repeats"]), "us/op")
+
+def _grid_shape(shape: str, vertices: int, rng: random.Random):
+    """
+    Polygon rings around the origin: a smooth "coastline", or a "star" of
+    random spikes, where every cell is crossed by long edges and gridding
+    should give up early.
+    """
+    import numpy as np
+    from shapely.geometry import Polygon
+
+    t = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    if shape == "star":
+        r = 1 + 0.3 * np.array([rng.random() for _ in range(vertices)])
+    else:
+        r = 1 + sum(0.3 / k * rng.gauss(0, 1) * np.sin(k * t + rng.uniform(0, 6)) for k in range(1, 60))
+        r = r + 0.002 * np.array([rng.gauss(0, 1) for _ in range(vertices)])
+    return Polygon(np.c_[np.cos(t) * r, np.sin(t) * r])
+
+def bench_polygon_grid(cfg: dict, results: Dict[str, dict]):
+    """
+    PolygonGrid build time (or time to give up) and point lookups against
+    prepared Shapely geometry, one point at a time and vectorized. The grid
+    only pays off where grid lookups beat prepared ones; this picks
+    settings.polygon_grid_min_vertices.
+    """
+    import numpy as np
+    import shapely
+    from src.app.services.polygon_grid import GridTooCostly, PolygonGrid
+
+    for shape in ("coastline", "star"):
+        for vertices in cfg["grid_vertices"]:
+            rng = random.Random(9)
+            polygon = _grid_shape(shape, vertices, rng)
+            started = time.perf_counter()
+            try:
+                grid = PolygonGrid(polygon)
+            except GridTooCostly:
+                grid = None
+            name = f"shape={shape},vertices={vertices}"
+            record(results, f"polygon_grid.build[{name}]", (time.perf_counter() - started) * 1000, "ms")
+            shapely.prepare(polygon)
+
+            min_x, min_y, max_x, max_y = polygon.bounds
+            x = np.array([rng.uniform(min_x, max_x) for _ in range(cfg["ops"])])
+            y = np.array([rng.uniform(min_y, max_y) for _ in range(cfg["ops"])])
+            xs, ys = x.tolist(), y.tolist()
+
+            def prepared_one():
+                for i in range(len(xs)):
+                    shapely.contains_xy(polygon, xs[i], ys[i])
+
+            record(results, f"polygon_grid.prepared_contains[{name}]",
+                   timed(prepared_one, len(xs), cfg["repeats"]), "us/op")
+            record(results, f"polygon_grid.prepared_contains_xy[{name}]",
+                   timed(lambda: shapely.contains_xy(polygon, x, y), len(xs), cfg["repeats"]), "us/point")
+            if grid is None:
+                continue
+
+            def grid_one():
+                for i in range(len(xs)):
+                    grid.contains(xs[i], ys[i])
+
+            record(results, f"polygon_grid.grid_contains[{name}]", timed(grid_one, len(xs), cfg["repeats"]), "us/op")
+            record(results, f"polygon_grid.grid_contains_xy[{name}]",
+                   timed(lambda: grid.contains_xy(x, y), len(xs), cfg["repeats"]), "us/point")
+
+def _ingest(case: Case, points: List[TelemetryPoint]):
+    for point in points:
+        process_telemetry(point, case.session)
+
+def bench_ingest(cfg: dict, results: Dict[str, dict]):
+    ops = cfg["ops"]
+    for zones in cfg["zones"]:
+        with Case() as case:
+            rng = random.Random(2)
+            case.session.add_all(make_zones(zones, rng))
+            case.session.commit()
+            points = [make_point(f"obj_{i % 100}", i, rng) for i in range(ops)]
+            _ingest(case, points[:100])  # warm the registry and state store
+            record(results, f"ingest.process_telemetry[zones={zones}]",
+                   timed(lambda: _ingest(case, points[100:]), ops - 100, 1), "us/op")
+
+    for objects in cfg["objects"]:
+        with Case() as case:
+            rng = random.Random(3)
+            case.session.add_all(make_zones(100, rng))
+            case.session.commit()
+            # Every object already known, then one more point each for a sample of them
+            _ingest(case, [make_point(f"obj_{i}", 0, rng) for i in range(objects)])
+            points = [make_point(f"obj_{rng.randrange(objects)}", 1 + i, rng) for i in range(ops)]
+            record(results, f"ingest.process_telemetry[objects={objects}]",
+                   timed(lambda: _ingest(case, points), ops, 1), "us/op")
+
+    for rows in cfg["history"]:
+        with Case() as case:
+            rng = random.Random(4)
+            case.session.add_all(make_zones(100, rng))
+            case.session.commit()
+            seed_history(case.session, rows, 1000)
+            points = [make_point(f"obj_{i % 1000}", i, rng) for i in range(ops)]
+            record(results, f"ingest.process_telemetry[history_rows={rows}]",
+                   timed(lambda: _ingest(case, points), ops, 1), "us/op")
+
+def bench_codec(cfg: dict, results: Dict[str, dict]):
+    """
+    Microseconds per point (one core) to turn a request body into points,
+    alone and together with process_batch; points/s/core is 1e6 / value.
+    """
+    from src.app.api.routes_telemetry import _parse_batch_body
+
+    rng = random.Random(6)
+    models = [make_point(f"obj_{i % 100}", i, rng) for i in range(cfg["ops"])]
+    dumped = [point.model_dump(mode="json") for point in models]
+    bodies = {
+        "json": (json.dumps(dumped).encode(), lambda body: [
+            TelemetryPoint.model_validate(item) for item in _parse_batch_body(body, "application/json")]),
+        "ndjson": ("\n".join(json.dumps(item) for item in dumped).encode(), lambda body: codec.decode_ndjson(body)[0]),
+        "binary": (codec.encode_binary(codec.FlatPoint.from_model(p) for p in models),
+                   lambda body: codec.decode_binary(body)[0]),
+    }
+    if codec.msgpack is not None:
+        micros = [(p.ts - codec.EPOCH) // timedelta(microseconds=1) for p in models]
+        packed = codec.msgpack.packb([
+            [p.object_id, us, p.position.lat, p.position.lon, None, p.confidence,
+             p.telemetry.speed_mps, p.telemetry.heading_deg] for p, us in zip(models, micros)])
+        bodies["msgpack"] = (packed, lambda body: codec.decode_msgpack(body)[0])
+
+    for name, (body, decode) in bodies.items():
+        assert len(decode(body)) == len(models)
+        record(results, f"codec.decode[{name}]", timed(lambda: decode(body), len(models), cfg["repeats"]), "us/point")
+
+    for name, (body, decode) in bodies.items():
+        with Case() as case:
+            case.session.add_all(make_zones(100, random.Random(7)))
+            case.session.commit()
+            process_batch(decode(body), case.session)  # warm the registry and state store
+            record(results, f"codec.decode_and_ingest[{name},zones=100]",
+                   timed(lambda: process_batch(decode(body), case.session), len(models), cfg["repeats"]), "us/point")
+
+def bench_shards(cfg: dict, results: Dict[str, dict]):
+    """
+    Microseconds per point for 1000-zone ingest in-process and across
+    worker processes (points/s = 1e6 / value).
+    """
+    from src.app.services.sharding import IngestShards
+
+    ops = cfg["ops"] * 5
+    for shards in [0] + cfg["shards"]:
+        with Case() as case:
+            rng = random.Random(8)
+            case.session.add_all(make_zones(1000, rng))
+            case.session.commit()
+            points = [codec.FlatPoint.from_model(make_point(f"obj_{i % 1000}", i, rng)) for i in range(ops + 1000)]
+            batches = [points[i:i + 500] for i in range(1000, len(points), 500)]
+            if shards:
+                coordinator = IngestShards(shards, str(case.engine.url))
+                coordinator.start()
+                run = coordinator.process_batch
+            else:
+                run = process_batch
+            try:
+                run(points[:1000], case.session)  # warm every object's state and the workers
+                record(results, f"shards.process_batch[zones=1000,shards={shards}]",
+                       timed(lambda: [run(batch, case.session) for batch in batches], ops, 1), "us/point")
+            finally:
+                if shards:
+                    coordinator.stop()
+
+def bench_small_requests(cfg: dict, results: Dict[str, dict]):
+    """
+    Microseconds per point when many clients each post one point at a time
+    (points/s = 1e6 / value), in-process and across worker processes, with
+    the group-commit writer running as in the server. Each client thread
+    owns its own objects, so per-object order holds.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from src.app.config import settings
+    from src.app.db.writer import start_writer, stop_writer
+    from src.app.services import sharding
+
+    clients = 16
+    ops = cfg["ops"] * 2
+    for shards in [0] + cfg["shards"]:
+        with Case() as case:
+            rng = random.Random(10)
+            case.session.add_all(make_zones(1000, rng))
+            case.session.commit()
+            points = [codec.FlatPoint.from_model(make_point(f"obj_{i % 1000}", i, rng)) for i in range(ops + 1000)]
+            start_writer(case.engine, settings.db_group_commit_max_batch, settings.db_group_commit_max_delay_ms / 1000)
+            if shards:
+                sharding.start_ingest_shards(shards, str(case.engine.url))
+            try:
+                sharding.ingest(points[:1000], case.session)  # warm every object's state and the workers
+                per_client = [[p for p in points[1000:] if int(p.object_id[4:]) % clients == c] for c in range(clients)]
+
+                def post_all(mine):
+                    for point in mine:
+                        sharding.ingest([point], case.session)
+
+                def run():
+                    with ThreadPoolExecutor(clients) as pool:
+                        list(pool.map(post_all, per_client))
+
+                record(results, f"small_requests.ingest[zones=1000,clients={clients},shards={shards}]",
+                       timed(run, ops, 1), "us/point")
+            finally:
+                sharding.stop_ingest_shards()
+                stop_writer()
+
+def bench_zone_update(cfg: dict, results: Dict[str, dict]):
+    """
+    Milliseconds per zone geometry edit across fleet sizes: every tracked
+    object is re-evaluated against the edited zone and each edit moves the
+    zone's edge across about half of the fleet.
+    """
+    from src.app.services.zone_update import reevaluate_zone
+
+    for objects in cfg["objects"]:
+        with Case() as case:
+            rng = random.Random(11)
+            case.session.add(Zone(id=1, name="Edited", min_lat=MIN_LAT, min_lon=MIN_LON, max_lat=MAX_LAT, max_lon=MAX_LON))
+            case.session.commit()
+            zone = case.session.get(Zone, 1)
+            case.session.expunge(zone)
+            process_batch([make_point(f"obj_{i}", 0, rng) for i in range(objects)], case.session)
+            edits = [(MIN_LAT + MAX_LAT) / 2, MAX_LAT]
+
+            def run():
+                for max_lat in edits:
+                    zone.max_lat = max_lat
+                    reevaluate_zone(case.session, zone)
+
+            record(results, f"zone_update.reevaluate[objects={objects}]",
+                   timed(run, len(edits), cfg["repeats"]) / 1000, "ms/edit")
+
+def bench_api(cfg: dict, results: Dict[str, dict]):
+    from fastapi.testclient import TestClient
+    from src.app.db.session import get_read_session, get_session
+    from src.app.main import app
+
+    history_rows = max(cfg["history"])
+    for objects in cfg["api_objects"]:
+        with Case() as case:
+            rng = random.Random(5)
+            case.session.add_all(make_zones(100, rng))
+            case.session.commit()
+            seed_history(case.session, history_rows, objects)
+            _ingest(case, [make_point(f"obj_{i}", i, rng) for i in range(objects)])
+            case.session.execute(insert(AlertEvent), [
+                dict(object_id=f"obj_{i % objects}", zone_id=1, alert_type=AlertType.ENTER,
+                     message="bench", ts=T0 + timedelta(seconds=i), ack=False)
+                for i in range(10 * objects)
+            ])
+            case.session.commit()
+
+            app.dependency_overrides[get_session] = lambda: case.session
+            app.dependency_overrides[get_read_session] = lambda: case.session
+            try:
+                client = TestClient(app)
+                requests = {
+                    "objects": "/api/objects/",
+                    "history": "/api/objects/obj_1/history",
+                    "history_range": f"/api/objects/obj_1/history?start={(T0 - timedelta(days=1)):%Y-%m-%dT%H:%M:%SZ}"
+                                     f"&max_points=500",
+                    "trails": "/api/objects/trails?n=30",
+                    "alerts": "/api/alerts/",
+                    "zones": "/api/zones/",
+                }
+                for name, url in requests.items():
+                    client.get(url).raise_for_status()
+                    ops = 20
+
+                    def fetch():
+                        for _ in range(ops):
+                            client.get(url)
+
+                    record(results, f"api.{name}[objects={objects},history_rows={history_rows}]",
+                           timed(fetch, ops, cfg["repeats"]) / 1000, "ms/request")
+            finally:
+                app.dependency_overrides.clear()
+
+BENCHMARKS = {
+    "zone_eval": bench_zone_eval,
+    "polygon_grid": bench_polygon_grid,
+    "ingest": bench_ingest,
+    "codec": bench_codec,
+    "shards": bench_shards,
+    "small_requests": bench_small_requests,
+    "zone_update": bench_zone_update,
+    "api": bench_api,
+}
+
+# --- Results ---
+
+def record(results: Dict[str, dict], name: str, value: float, unit: str):
+    results[name] = {"value": round(value, 3), "unit": unit}
+    print(f"  {name:<70} {value:>12.3f} {unit}", flush=True)
+
+def compare(current: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """
+    Print every case next to its baseline; return the names of cases that
+    are more than `threshold` (e.g. 0.2 = 20%) slower.
+    """
+    regressions = []
+    print(f"\n{'case':<70} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in current.items():
+        base = baseline.get(name)
+        if base is None or base["unit"] != result["unit"] or base["value"] <= 0:
+            print(f"{name:<70} {'-':>12} {result['value']:>12.3f} {'new':>8}")
+            continue
+        change = result["value"] / base["value"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<70} {base['value']:>12.3f} {result['value']:>12.3f} {change:>+7.0%}{flag}")
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quick", action="store_true", help="smaller sizes for a fast smoke run")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="run only these groups")
+    parser.add_argument("--out", help="write results to this JSON file")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against a stored results file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown that counts as a regression")
+    args = parser.parse_args(argv)
+
+    cfg = QUICK if args.quick else FULL
+    results: Dict[str, dict] = {}
+    for name in args.only or list(BENCHMARKS):
+        print(f"[{name}]", flush=True)
+        BENCHMARKS[name](cfg, results)
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2) + "\n")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}")
+            return 1
+        print("\nNo regressions")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
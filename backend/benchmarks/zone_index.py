@@ -0,0 +1,112 @@
+"""
+Per-point zone evaluation cost as the number of zones grows.
+
+Compares a full scan over every enabled zone with the STRtree candidate
+lookup used by ingest, and times end-to-end batch ingest against an
+in-memory SQLite database.
+
+Run from the backend directory:
+
+    python -m benchmarks.zone_index
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine
+from src.app.db.models import Zone, TelemetryPoint, Position, TelemetryData
+from src.app.services.ingestion import process_batch
+from src.app.services.state_store import state_store
+from src.app.services.zone_registry import zone_registry
+
+# Corridor roughly Iqaluit -> Hudson Bay
+MIN_LAT, MAX_LAT = 60.0, 66.0
+MIN_LON, MAX_LON = -95.0, -65.0
+ZONE_SIZE_DEG = 0.02
+
+def make_zones(count: int, rng: random.Random):
+    zones = []
+    for i in range(count):
+        lat = rng.uniform(MIN_LAT, MAX_LAT)
+        lon = rng.uniform(MIN_LON, MAX_LON)
+        if i % 2:
+            zones.append(Zone(name=f"box_{i}", min_lat=lat, min_lon=lon,
+                              max_lat=lat + ZONE_SIZE_DEG, max_lon=lon + ZONE_SIZE_DEG))
+        else:
+            coords = [[lat, lon], [lat + ZONE_SIZE_DEG, lon], [lat + ZONE_SIZE_DEG, lon + ZONE_SIZE_DEG],
+                      [lat, lon + ZONE_SIZE_DEG * 0.5]]
+            zones.append(Zone(name=f"poly_{i}", is_polygon=True, polygon_coords=json.dumps(coords)))
+    return zones
+
+def make_points(count: int, objects: int, rng: random.Random):
+    t0 = datetime(2026, 2, 1, tzinfo=timezone.utc)
+    return [
+        TelemetryPoint(
+            object_id=f"obj_{i % objects}",
+            ts=t0 + timedelta(seconds=i // objects),
+            position=Position(lat=rng.uniform(MIN_LAT, MAX_LAT), lon=rng.uniform(MIN_LON, MAX_LON)),
+            confidence=0.9,
+            telemetry=TelemetryData(speed_mps=10, heading_deg=90),
+        )
+        for i in range(count)
+    ]
+
+def run(zone_counts, points_per_run: int, objects: int, seed: int):
+    results = []
+    for zone_count in zone_counts:
+        rng = random.Random(seed)
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add_all(make_zones(zone_count, rng))
+            session.commit()
+            zone_registry.reset()
+            state_store.reset()
+            snapshot = zone_registry.snapshot(session)
+            points = make_points(points_per_run, objects, rng)
+            coords = [(p.position.lat, p.position.lon) for p in points]
+
+            start = time.perf_counter()
+            for lat, lon in coords:
+                for zone in snapshot.enabled:
+                    zone.contains(lat, lon)
+            scan_us = (time.perf_counter() - start) / len(coords) * 1e6
+
+            start = time.perf_counter()
+            for lat, lon in coords:
+                for zone in snapshot.candidates(lat, lon):
+                    zone.contains(lat, lon)
+            index_us = (time.perf_counter() - start) / len(coords) * 1e6
+
+            start = time.perf_counter()
+            process_batch(points, session)
+            ingest_us = (time.perf_counter() - start) / len(points) * 1e6
+
+        zone_registry.reset()
+        state_store.reset()
+        engine.dispose()
+        results.append({
+            "zones": zone_count,
+            "full_scan_us_per_point": round(scan_us, 2),
+            "indexed_us_per_point": round(index_us, 2),
+            "ingest_us_per_point": round(ingest_us, 2),
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--zones", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--objects", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"{'zones':>8} {'full scan us/pt':>16} {'indexed us/pt':>14} {'ingest us/pt':>13}")
+    for row in run(args.zones, args.points, args.objects, args.seed):
+        print(f"{row['zones']:>8} {row['full_scan_us_per_point']:>16.2f} "
+              f"{row['indexed_us_per_point']:>14.2f} {row['ingest_us_per_point']:>13.2f}")
+
+if __name__ == "__main__":
+    main()
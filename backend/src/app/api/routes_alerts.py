@@ -1,32 +1,151 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, Query
+import base64
+from datetime import datetime, timezone
+from typing import List, Optional, Set
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from pydantic import BaseModel
+from sqlalchemy import false, func, true, tuple_, update
 from sqlmodel import Session, select, desc
-from src.app.db.models import AlertEvent
-from src.app.db.session import get_session
+from src.app.db.models import AlertEvent, AlertType
+from src.app.db.session import get_session, get_read_session
+from src.app.db.writer import run_write
+from src.app.services.alert_policy import alert_suppressor
+from src.app.services.sharding import get_ingest_shards
+from src.app.services.state_store import state_store
 
 router = APIRouter(prefix="/api/alerts", tags=["alerts"])
 
+class AlertFilter(BaseModel):
+    """
+    Which alerts to acknowledge: explicit `ids` and/or filters, combined
+    with AND. At least one must be given.
+    """
+    ids: Optional[List[int]] = None
+    object_id: Optional[str] = None
+    zone_id: Optional[int] = None
+    alert_type: Optional[List[AlertType]] = None
+    until: Optional[datetime] = None
+
+def _conditions(object_id: Optional[str] = None, zone_id: Optional[int] = None,
+                alert_type: Optional[List[AlertType]] = None, ack: Optional[bool] = None) -> list:
+    conditions = []
+    if object_id is not None:
+        conditions.append(AlertEvent.object_id == object_id)
+    if zone_id is not None:
+        conditions.append(AlertEvent.zone_id == zone_id)
+    if alert_type:
+        conditions.append(AlertEvent.alert_type.in_(alert_type))
+    if ack is not None:
+        # Literal, so SQLite can match the partial unacknowledged index
+        conditions.append(AlertEvent.ack == (true() if ack else false()))
+    return conditions
+
+def _naive_utc(ts: datetime) -> datetime:
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+def _encode_cursor(alert: AlertEvent) -> str:
+    return base64.urlsafe_b64encode(f"{alert.ts.isoformat()}|{alert.id}".encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        ts, alert_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(ts), int(alert_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 @router.get("/", response_model=List[AlertEvent])
 def list_alerts(
-    limit: int = Query(50, ge=1, le=100),
-    offset: int = 0,
-    session: Session = Depends(get_session)
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    object_id: Optional[str] = None,
+    zone_id: Optional[int] = None,
+    alert_type: Optional[List[AlertType]] = Query(None),
+    ack: Optional[bool] = None,
+    offset: int = Query(0, ge=0, deprecated=True),
+    session: Session = Depends(get_read_session)
 ):
     """
-    Retrieve a list of alerts, sorted by timestamp descending.
+    Retrieve alerts newest first, optionally filtered by object, zone,
+    type(s) and acknowledgement.
+
+    Pages are keyset-paginated on (ts, id): when there may be more, the
+    X-Next-Cursor response header holds the cursor for the next page, so
+    deep pages cost the same as the first. `offset` still works but scans
+    every skipped row.
     """
-    statement = select(AlertEvent).order_by(desc(AlertEvent.ts)).offset(offset).limit(limit)
-    return session.exec(statement).all()
+    conditions = _conditions(object_id, zone_id, alert_type, ack)
+    if cursor:
+        conditions.append(tuple_(AlertEvent.ts, AlertEvent.id) < tuple_(*_decode_cursor(cursor)))
+    statement = (
+        select(AlertEvent).where(*conditions)
+        .order_by(desc(AlertEvent.ts), desc(AlertEvent.id)).offset(offset).limit(limit)
+    )
+    alerts = session.exec(statement).all()
+    if len(alerts) == limit:
+        response.headers["X-Next-Cursor"] = _encode_cursor(alerts[-1])
+    return alerts
+
+@router.get("/unacked/count")
+def count_unacked(
+    cap: Optional[int] = Query(None, ge=1, description="Stop counting here (e.g. for a '999+' badge)"),
+    session: Session = Depends(get_read_session)
+):
+    """
+    Number of unacknowledged alerts, counted from a partial index over
+    unacknowledged alerts only.
+    """
+    unacked = select(AlertEvent.id).where(AlertEvent.ack == false())
+    if cap is not None:
+        unacked = unacked.limit(cap)
+    count = session.exec(select(func.count()).select_from(unacked.subquery())).one()
+    return {"unacked": count, "capped": cap is not None and count >= cap}
+
+@router.post("/ack")
+def acknowledge_alerts(selection: AlertFilter, session: Session = Depends(get_session)):
+    """
+    Acknowledge every unacknowledged alert matching `selection` with a
+    single UPDATE.
+    """
+    conditions = _conditions(selection.object_id, selection.zone_id, selection.alert_type)
+    if selection.ids is not None:
+        conditions.append(AlertEvent.id.in_(selection.ids))
+    if selection.until is not None:
+        conditions.append(AlertEvent.ts <= _naive_utc(selection.until))
+    if not conditions:
+        raise HTTPException(status_code=422, detail="Give ids or at least one filter")
+
+    def ack(s: Session) -> List[int]:
+        return s.execute(
+            update(AlertEvent).where(AlertEvent.ack == false(), *conditions)
+            .values(ack=True).returning(AlertEvent.id)
+        ).scalars().all()
+
+    acked = run_write(ack, session)
+    _close(set(acked))
+    return {"acknowledged": len(acked)}
 
 @router.post("/{alert_id}/ack")
 def acknowledge_alert(alert_id: int, session: Session = Depends(get_session)):
     """
     Mark an alert as acknowledged.
     """
-    alert = session.get(AlertEvent, alert_id)
-    if not alert:
+    def ack(s: Session) -> bool:
+        alert = s.get(AlertEvent, alert_id)
+        if not alert:
+            return False
+        alert.ack = True
+        s.add(alert)
+        return True
+
+    if not run_write(ack, session):
         return {"error": "Alert not found"}
-    alert.ack = True
-    session.add(alert)
-    session.commit()
+    # Later repeats start a new alert instead of counting into an acknowledged one
+    _close({alert_id})
     return {"status": "ok"}
+
+def _close(alert_ids: Set[int]):
+    with state_store.lock:
+        alert_suppressor.close(alert_ids)
+    shards = get_ingest_shards()
+    if shards is not None:
+        shards.close_alerts(alert_ids)
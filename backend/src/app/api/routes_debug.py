@@ -0,0 +1,46 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from src.app.config import settings
+from src.app.services.profiler import profiler
+
+router = APIRouter(prefix="/api/debug", tags=["debug"])
+
+def _check_enabled():
+    if not settings.profiler_endpoints_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+@router.post("/profiler/start")
+def start_profiler(
+    interval_ms: float = Query(5.0, ge=1.0, le=1000.0),
+    duration_s: Optional[float] = Query(30.0, gt=0),
+):
+    """
+    Start the sampling profiler. It stops by itself after `duration_s`
+    (capped at profiler_max_duration_s); earlier results are discarded.
+    """
+    _check_enabled()
+    duration_s = min(duration_s or settings.profiler_max_duration_s, settings.profiler_max_duration_s)
+    if not profiler.start(interval_ms / 1000, duration_s):
+        raise HTTPException(status_code=409, detail="Profiler already running")
+    return profiler.status()
+
+@router.post("/profiler/stop")
+def stop_profiler():
+    _check_enabled()
+    profiler.stop()
+    return profiler.status()
+
+@router.get("/profiler")
+def profiler_status():
+    _check_enabled()
+    return profiler.status()
+
+@router.get("/profiler/collapsed", response_class=PlainTextResponse)
+def profiler_collapsed():
+    """
+    Samples so far in collapsed-stack format, e.g. for
+    `flamegraph.pl profile.txt > profile.svg` or speedscope.
+    """
+    _check_enabled()
+    return profiler.collapsed()
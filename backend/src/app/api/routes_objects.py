@@ -1,22 +1,134 @@
-from typing import List
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select
+from datetime import datetime
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel
+from sqlmodel import Session
 from src.app.db.models import TrackedObject, TelemetryRecord
-from src.app.db.session import get_session
+from src.app.db.session import get_read_session
+from src.app.services.downsample import downsample_track
+from src.app.services.history import history_records
+from src.app.services.state_store import state_store
+from src.app.services.stream import in_bbox, parse_bbox
+from src.app.services.trails import trail_buffer, windowed_trails
 
 router = APIRouter(prefix="/api/objects", tags=["objects"])
 
-@router.get("/", response_model=List[TrackedObject])
-def list_objects(session: Session = Depends(get_session)):
-    return session.exec(select(TrackedObject)).all()
+class ObjectChanges(BaseModel):
+    cursor: str
+    reset: bool
+    objects: List[TrackedObject]
+    # Deleted objects, or (with bbox) changed objects now outside the viewport
+    removed: List[str]
+
+@router.get("/", response_model=Union[List[TrackedObject], ObjectChanges])
+def list_objects(
+    request: Request,
+    response: Response,
+    since: Optional[str] = Query(None, description="Cursor from a previous response; '0' for a full listing"),
+    bbox: Optional[str] = Query(None, description="Viewport as min_lon,min_lat,max_lon,max_lat, as for /ws/stream"),
+    session: Session = Depends(get_read_session)
+):
+    """
+    List tracked objects, optionally only those inside `bbox`.
+
+    Without `since` this is the full list. With `since` the response is
+    `{cursor, reset, objects, removed}` holding only objects changed after
+    that cursor, found from the state store's change sequence rather than
+    by scanning. Pass the returned `cursor` as the next `since`. An invalid
+    or outdated cursor (e.g. from before a restart) gives `reset: true` and
+    a full listing.
+
+    Every response carries an ETag derived from the change sequence, so a
+    request with a matching If-None-Match gets a 304 while nothing changed.
+    """
+    try:
+        area = parse_bbox(bbox)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    # The state store is authoritative; the table lags it by up to one flush
+    state_store.ensure_loaded(session)
+    with state_store.lock:
+        etag = f'W/"{state_store.cursor}"'
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        response.headers["X-Change-Cursor"] = state_store.cursor
+
+        changed = state_store.changed_since(since) if since and since != "0" else None
+        if changed is None:
+            objects = [obj for obj in state_store.objects.values() if in_bbox(area, obj.last_lat, obj.last_lon)]
+            if since is None:
+                return [obj.to_model() for obj in objects]
+            return ObjectChanges(cursor=state_store.cursor, reset=since != "0",
+                                 objects=[obj.to_model() for obj in objects], removed=[])
+
+        objects, removed = [], []
+        for object_id in changed:
+            obj = state_store.objects.get(object_id)
+            if obj is not None and in_bbox(area, obj.last_lat, obj.last_lon):
+                objects.append(obj.to_model())
+            else:
+                removed.append(object_id)
+        return ObjectChanges(cursor=state_store.cursor, reset=False, objects=objects, removed=removed)
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    # If-None-Match uses weak comparison
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+@router.get("/trails")
+def get_trails(
+    n: int = Query(30, ge=1, le=1000),
+    since: Optional[str] = None,
+    ids: Optional[str] = Query(None, description="Comma-separated object ids (default: all)"),
+    session: Session = Depends(get_read_session)
+):
+    """
+    Get the last N telemetry points for every object (or the `ids` subset)
+    in one response, oldest first per object.
+
+    Pass the returned `cursor` back as `since` to receive only points added
+    after it, which may include late points older than ones already
+    returned: merge them by `ts`. If the cursor is no longer valid (e.g. after a restart),
+    `reset` is true and full trails are returned.
+    """
+    object_ids = [i for i in ids.split(",") if i] if ids else None
+    if n > trail_buffer.capacity:
+        # Deeper than the ring buffer keeps: one windowed query instead
+        return {"cursor": None, "reset": False, "trails": windowed_trails(session, n, object_ids)}
+    trail_buffer.ensure_loaded(session)
+    trails, cursor, reset = trail_buffer.trails(n, since, object_ids)
+    return {"cursor": cursor, "reset": reset, "trails": trails}
 
 @router.get("/{object_id}/history", response_model=List[TelemetryRecord])
-def get_object_history(object_id: str, limit: int = 50, session: Session = Depends(get_session)):
-    """Get the last N telemetry records for an object."""
-    statement = (
-        select(TelemetryRecord)
-        .where(TelemetryRecord.object_id == object_id)
-        .order_by(TelemetryRecord.ts.desc())
-        .limit(limit)
-    )
-    return session.exec(statement).all()
+def get_object_history(
+    object_id: str,
+    limit: Optional[int] = Query(None, ge=1),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    max_points: Optional[int] = Query(None, ge=2),
+    session: Session = Depends(get_read_session)
+):
+    """
+    Get telemetry records for an object, newest first.
+
+    Without `start`/`end` this is the last `limit` (default 50) records.
+    With a time range every record in [start, end] is returned unless
+    `limit` is also given. If more than `max_points` records match, the
+    track is downsampled (LTTB over lon/lat) to `max_points`, keeping its
+    shape and both endpoints.
+
+    Parts of the range older than the raw retention window come from the
+    columnar archive where it has them, otherwise from the rolled-up tiers
+    at one point per bucket.
+    """
+    if limit is None and start is None and end is None:
+        limit = 50
+    records = history_records(session, object_id, start, end, limit)
+
+    if max_points is not None and len(records) > max_points:
+        # Downsample in time order, then return newest first like the raw query
+        records = downsample_track(records[::-1], max_points)[::-1]
+    return records
@@ -0,0 +1,108 @@
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from src.app.config import settings
+from src.app.services.state_store import state_store
+from src.app.services.stream import StreamClient, object_payload, parse_bbox, stream_hub
+
+router = APIRouter(tags=["stream"])
+
+@router.websocket("/ws/stream")
+async def stream(websocket: WebSocket, max_fps: Optional[float] = None, bbox: Optional[str] = None,
+                 topics: str = "objects,alerts"):
+    """
+    Push object updates and new alerts as ingest produces them.
+
+    Query parameters (both can also be changed later by sending
+    `{"max_fps": n}` or `{"bbox": [min_lon, min_lat, max_lon, max_lat] | null}`):
+    - max_fps: frames per second cap for this client (server max applies)
+    - bbox: "min_lon,min_lat,max_lon,max_lat" viewport filter for objects
+    - topics: comma-separated subset of "objects,alerts"
+
+    The first frame is a `snapshot` of every visible object; after that each
+    `update` frame carries the latest state of objects that changed, ids that
+    left the viewport, new alerts, stored alerts whose occurrence count or
+    last_ts changed (`alert_updates`), and how many pending entries were
+    dropped because the client fell behind. Objects have the same shape as
+    in GET /api/objects.
+    """
+    await websocket.accept()
+    wanted = {topic.strip() for topic in topics.split(",")}
+    try:
+        viewport = parse_bbox(bbox)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+
+    client = StreamClient(
+        asyncio.get_running_loop(),
+        _clamp_fps(max_fps),
+        viewport,
+        settings.stream_max_pending,
+        objects="objects" in wanted,
+        alerts="alerts" in wanted,
+    )
+    stream_hub.add(client)
+    try:
+        await websocket.send_json(client.snapshot_frame(await _all_objects()))
+        sender = asyncio.create_task(_send_frames(websocket, client))
+        try:
+            await _receive_controls(websocket, client)
+        finally:
+            sender.cancel()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stream_hub.remove(client)
+
+async def _send_frames(websocket: WebSocket, client: StreamClient):
+    while True:
+        await client.wake.wait()
+        client.wake.clear()
+        frame = client.take_frame()
+        if frame is not None:
+            await websocket.send_json(frame)
+            stream_hub.frames_sent += 1
+        # Everything that arrives during this pause is coalesced into the next frame
+        await asyncio.sleep(1.0 / client.max_fps)
+
+async def _receive_controls(websocket: WebSocket, client: StreamClient):
+    while True:
+        frame = await websocket.receive()
+        if frame["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(frame.get("code", 1000))
+        try:
+            message = json.loads(frame.get("text") or frame.get("bytes") or "")
+        except ValueError:
+            # Not JSON: ignore the frame rather than drop the connection
+            continue
+        if not isinstance(message, dict):
+            continue
+        if "max_fps" in message:
+            client.max_fps = _clamp_fps(message["max_fps"])
+        if "bbox" in message:
+            value = message["bbox"]
+            try:
+                client.set_bbox(parse_bbox(",".join(map(str, value)) if value else None))
+            except (TypeError, ValueError) as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            await websocket.send_json(client.snapshot_frame(await _all_objects()))
+
+async def _all_objects():
+    # state_store.lock can be held by ingest for a whole batch; wait for it
+    # on a worker thread, not on the event loop
+    return await run_in_threadpool(_snapshot_objects)
+
+def _snapshot_objects():
+    with state_store.lock:
+        return [object_payload(obj) for obj in state_store.objects.values()]
+
+def _clamp_fps(value) -> float:
+    try:
+        fps = float(value) if value is not None else settings.stream_max_fps
+    except (TypeError, ValueError):
+        fps = settings.stream_max_fps
+    return min(max(fps, 0.1), settings.stream_max_fps)
@@ -1,18 +1,206 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlmodel import Session, select
 from src.app.db.models import TelemetryPoint, TrackedObject
-from src.app.services.ingestion import process_telemetry
 from src.app.db.session import get_session
+from src.app.config import settings
+from src.app.services import metrics
+from src.app.services.codec import DECODERS, NDJSON_CONTENT_TYPES
+from src.app.services.ingest_queue import get_ingest_queue
+from src.app.services.sharding import ingest
 
 router = APIRouter(prefix="/api/telemetry", tags=["telemetry"])
 
-@router.post("/", status_code=201)
-def post_telemetry(point: TelemetryPoint, session: Session = Depends(get_session)):
+@router.post("/", status_code=201, openapi_extra={
+    "requestBody": {"required": True, "content": {"application/json": {"schema": TelemetryPoint.model_json_schema()}}},
+})
+async def post_telemetry(request: Request, response: Response, session: Session = Depends(get_session)):
     """
     Ingest a single telemetry point.
+
+    With the ingest queue enabled the point is only validated and queued,
+    and the endpoint answers 202 (or 503 with Retry-After when full).
     """
+    # Validated here rather than by FastAPI so the validate stage is timed
+    # on this route too
+    body = await request.body()
+    with metrics.stage("validate"):
+        try:
+            point = TelemetryPoint.model_validate_json(body)
+        except ValidationError as e:
+            metrics.points_rejected.inc()
+            raise RequestValidationError(
+                [dict(error, loc=("body", *error["loc"])) for error in e.errors(include_url=False)], body=body
+            )
+
+    ingest_queue = get_ingest_queue()
+    if ingest_queue is not None:
+        if not ingest_queue.offer(point):
+            raise _queue_full()
+        response.status_code = 202
+        return {"status": "queued", "object_id": point.object_id}
+
     try:
-        process_telemetry(point, session)
+        await run_in_threadpool(ingest, [point], session)
         return {"status": "accepted", "object_id": point.object_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/batch")
+async def post_telemetry_batch(request: Request, response: Response, session: Session = Depends(get_session)):
+    """
+    Ingest many telemetry points in one request and one transaction.
+
+    Accepts a JSON array of points, a `{"points": [...]}` object, or an NDJSON
+    body (one point per line). Each point is validated on its own; invalid
+    points are rejected without affecting the rest of the batch. With the
+    ingest queue enabled, points are queued (202) until the queue is full.
+    """
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        items = _parse_batch_body(body, content_type)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    results = []
+    points = []
+    with metrics.stage("validate"):
+        for index, item in enumerate(items):
+            try:
+                point = TelemetryPoint.model_validate(item)
+            except ValidationError as e:
+                results.append({"index": index, "status": "rejected", "error": e.errors(include_url=False, include_context=False)})
+                continue
+            points.append(point)
+            results.append({"index": index, "status": "accepted", "object_id": point.object_id})
+    if len(points) < len(items):
+        metrics.points_rejected.inc(len(items) - len(points))
+
+    ingest_queue = get_ingest_queue()
+    if ingest_queue is not None:
+        accepted = 0
+        valid_results = [result for result in results if result["status"] == "accepted"]
+        for result, point in zip(valid_results, points):
+            if ingest_queue.offer(point):
+                accepted += 1
+            else:
+                result.update(status="rejected", error="ingest queue full")
+        if points and not accepted:
+            raise _queue_full()
+        response.status_code = 202
+        return {
+            "accepted": accepted,
+            "rejected": len(results) - accepted,
+            "results": results,
+        }
+
+    try:
+        await run_in_threadpool(ingest, points, session)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    accepted = len(points)
+    return {
+        "accepted": accepted,
+        "rejected": len(results) - accepted,
+        "results": results,
+    }
+
+@router.post("/records")
+async def post_telemetry_records(request: Request, response: Response, session: Session = Depends(get_session)):
+    """
+    Fast-path batch ingest that skips the pydantic models.
+
+    The body is a fixed-layout binary record stream
+    (application/vnd.geofence.telemetry), a MessagePack array of records
+    (application/msgpack, needs the optional msgpack package) or NDJSON in
+    the JSON point shape; see services/codec.py for the layouts. Records are
+    decoded straight into flat records with the same range checks as the
+    JSON models (NDJSON records they do not cover, e.g. numbers sent as
+    strings, are validated by the JSON model itself) and run through the
+    same pipeline as /batch. Only rejected
+    records are listed, by index, to keep the response small.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    decode = DECODERS.get(content_type)
+    if decode is None:
+        raise HTTPException(status_code=415, detail=f"Unsupported content type; use one of {', '.join(DECODERS)}")
+    body = await request.body()
+    try:
+        with metrics.stage("decode"):
+            points, errors = decode(body)
+    except ImportError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if errors:
+        metrics.points_rejected.inc(len(errors))
+    rejected = [{"index": index, "error": error} for index, error in errors]
+
+    ingest_queue = get_ingest_queue()
+    if ingest_queue is not None:
+        accepted = 0
+        failed = {index for index, _ in errors}
+        indexes = (index for index in range(len(points) + len(errors)) if index not in failed)
+        for index, point in zip(indexes, points):
+            if ingest_queue.offer(point):
+                accepted += 1
+            else:
+                rejected.append({"index": index, "error": "ingest queue full"})
+        if points and not accepted:
+            raise _queue_full()
+        response.status_code = 202
+        rejected.sort(key=lambda error: error["index"])
+        return {"accepted": accepted, "rejected": len(rejected), "errors": rejected}
+
+    try:
+        await run_in_threadpool(ingest, points, session)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"accepted": len(points), "rejected": len(rejected), "errors": rejected}
+
+@router.get("/queue")
+def get_queue_stats():
+    """
+    Depth, throughput and lag of the asynchronous ingest queue.
+    """
+    ingest_queue = get_ingest_queue()
+    if ingest_queue is None:
+        return {"enabled": False}
+    return ingest_queue.stats()
+
+def _queue_full() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Ingest queue is full, retry later",
+        headers={"Retry-After": str(settings.ingest_retry_after_s)},
+    )
+
+def _parse_batch_body(body: bytes, content_type: str) -> list:
+    """
+    Split a batch request body into raw (unvalidated) point payloads.
+    """
+    if content_type in NDJSON_CONTENT_TYPES:
+        items = []
+        for line_no, line in enumerate(body.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {line_no}: {e.msg}")
+        return items
+
+    try:
+        payload = json.loads(body or b"null")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON body: {e.msg}")
+    if isinstance(payload, dict) and isinstance(payload.get("points"), list):
+        return payload["points"]
+    if isinstance(payload, list):
+        return payload
+    raise ValueError("Expected a JSON array of telemetry points, {\"points\": [...]}, or NDJSON")
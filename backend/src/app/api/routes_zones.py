@@ -1,20 +1,103 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select, delete
-from src.app.db.models import Zone, ObjectZoneState
-from src.app.db.session import get_session
+from src.app.db.models import Zone, ZoneUpdate, ObjectZoneState
+from src.app.db.session import get_session, get_read_session
+from src.app.db.writer import run_write
+from src.app.services.replay import replay_history
+from src.app.services.sharding import get_ingest_shards
+from src.app.services.state_store import state_store
+from src.app.services.zone_update import GEOMETRY_FIELDS, reevaluate_zone
+from src.app.services.zone_registry import zone_registry
 
 router = APIRouter(prefix="/api/zones", tags=["zones"])
 
 @router.get("/", response_model=List[Zone])
-def list_zones(session: Session = Depends(get_session)):
+def list_zones(session: Session = Depends(get_read_session)):
     return session.exec(select(Zone)).all()
 
 @router.post("/", response_model=Zone, status_code=201)
-def create_zone(zone: Zone, session: Session = Depends(get_session)):
-    session.add(zone)
-    session.commit()
-    session.refresh(zone)
+def create_zone(
+    zone: Zone,
+    backfill_minutes: int = Query(0, ge=0, description="Replay this many minutes of history against the new zone"),
+    session: Session = Depends(get_session)
+):
+    def create(s: Session) -> Zone:
+        s.add(zone)
+        s.flush()
+        # Detach so the returned zone stays usable after the writer's session closes
+        s.expunge(zone)
+        return zone
+
+    zone = run_write(create, session)
+    zone_registry.upsert(zone)
+    _notify_shards(lambda shards: shards.zones_changed())
+    if backfill_minutes:
+        end = datetime.now(timezone.utc)
+        replay_history(session, [zone], end - timedelta(minutes=backfill_minutes), end, commit=True)
+    return zone
+
+@router.post("/{zone_id}/replay")
+def replay_zone(
+    zone_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    commit: bool = False,
+    session: Session = Depends(get_session)
+):
+    """
+    Replay stored telemetry in [start, end] (default: the last hour) against
+    one zone and report which objects end up inside it and which ENTER/EXIT
+    alerts they would have raised. With commit=true the alerts are stored
+    and the zone states applied.
+    """
+    zone = session.get(Zone, zone_id)
+    if not zone:
+        raise HTTPException(status_code=404, detail="Zone not found")
+    end = _as_utc(end) if end else datetime.now(timezone.utc)
+    start = _as_utc(start) if start else end - timedelta(hours=1)
+    if start > end:
+        raise HTTPException(status_code=422, detail="start must not be after end")
+    return replay_history(session, [zone], start, end, commit=commit).to_dict()
+
+@router.put("/{zone_id}", response_model=Zone)
+def replace_zone(zone_id: int, zone: Zone, session: Session = Depends(get_session)):
+    return _update_zone(zone_id, zone.model_dump(exclude={"id", "created_at"}), session)
+
+@router.patch("/{zone_id}", response_model=Zone)
+def update_zone(zone_id: int, changes: ZoneUpdate, session: Session = Depends(get_session)):
+    """
+    Change some of a zone's fields, e.g. {"enabled": false}.
+    """
+    return _update_zone(zone_id, changes.model_dump(exclude_unset=True), session)
+
+def _update_zone(zone_id: int, changes: dict, session: Session) -> Zone:
+    """
+    Apply `changes` to the zone and, if its geometry or enabled flag
+    changed, re-evaluate every tracked object against it in place; its
+    object states are kept, so objects that stay on their side raise
+    nothing.
+    """
+    def update(s: Session):
+        zone = s.get(Zone, zone_id)
+        if zone is None:
+            return None, False
+        moved = any(field in changes and changes[field] != getattr(zone, field) for field in GEOMETRY_FIELDS)
+        for field, value in changes.items():
+            setattr(zone, field, value)
+        s.add(zone)
+        s.flush()
+        s.expunge(zone)
+        return zone, moved
+
+    zone, moved = run_write(update, session)
+    if zone is None:
+        raise HTTPException(status_code=404, detail="Zone not found")
+    zone_registry.upsert(zone)
+    _notify_shards(lambda shards: shards.zones_changed())
+    if moved:
+        reevaluate_zone(session, zone)
     return zone
 
 @router.delete("/{zone_id}")
@@ -24,8 +107,20 @@ def delete_zone(zone_id: int, session: Session = Depends(get_session)):
         raise HTTPException(status_code=404, detail="Zone not found")
     
     # Cleanup states for this zone
-    session.exec(delete(ObjectZoneState).where(ObjectZoneState.zone_id == zone_id))
+    state_store.remove_zone(zone_id)
+    def remove(s: Session):
+        s.exec(delete(ObjectZoneState).where(ObjectZoneState.zone_id == zone_id))
+        s.exec(delete(Zone).where(Zone.id == zone_id))
     
-    session.delete(zone)
-    session.commit()
+    run_write(remove, session)
+    zone_registry.remove(zone_id)
+    _notify_shards(lambda shards: shards.zone_removed(zone_id))
     return {"status": "deleted", "id": zone_id}
+
+def _notify_shards(notify):
+    shards = get_ingest_shards()
+    if shards is not None:
+        notify(shards)
+
+def _as_utc(ts: datetime) -> datetime:
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts
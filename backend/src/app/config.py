@@ -0,0 +1,112 @@
+from typing import Dict, List, Tuple
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+class Settings(BaseSettings):
+    """
+    Runtime configuration. Every field can be overridden with a
+    GEOFENCE_<FIELD_NAME> environment variable.
+    """
+    model_config = SettingsConfigDict(env_prefix="GEOFENCE_")
+
+    # SQLite storage
+    database_path: str = "database_v2.db"
+    sqlite_synchronous: str = "NORMAL"  # safe with WAL; FULL fsyncs every commit
+    sqlite_cache_size_kib: int = 65536
+    sqlite_busy_timeout_ms: int = 5000
+    read_pool_size: int = 8
+
+    # Group commit: every write goes through one writer thread that commits
+    # up to db_group_commit_max_batch jobs at once, waiting at most
+    # db_group_commit_max_delay_ms for more work after the first job arrives
+    db_group_commit_max_batch: int = 256
+    db_group_commit_max_delay_ms: float = 5.0
+
+    # Write-behind flushing of in-memory object/zone state
+    state_flush_interval_s: float = 1.0
+    state_flush_max_dirty: int = 5000
+
+    # Asynchronous ingest: POST /api/telemetry/ enqueues and returns 202
+    ingest_queue_enabled: bool = False
+    ingest_queue_max_size: int = 10000
+    ingest_batch_max: int = 500
+    ingest_retry_after_s: int = 1
+
+    # Sharded ingest: with ingest_shards > 0, zone evaluation runs in that
+    # many worker processes, each owning the objects whose object_id hashes
+    # to it; this process merges their results and does every database write
+    ingest_shards: int = 0
+
+    # WebSocket push stream (/ws/stream)
+    stream_max_fps: float = 4.0
+    stream_max_pending: int = 5000
+
+    # Points kept per object for GET /api/objects/trails
+    trail_buffer_size: int = 120
+
+    # Telemetry retention: raw points are kept for retention_raw_days, then
+    # rolled up into each (bucket seconds, kept until age in days) tier in
+    # turn and finally deleted. Runs every retention_interval_s, moving at
+    # most retention_batch_rows rows per transaction. Off unless enabled,
+    # since it deletes raw history.
+    retention_enabled: bool = False
+    retention_raw_days: float = 7.0
+    retention_tiers: List[Tuple[int, float]] = [(10, 30.0), (60, 365.0)]
+    retention_interval_s: float = 300.0
+    retention_batch_rows: int = 5000
+
+    # Columnar archive: once an archive_window_s window is archive_grace_s
+    # in the past, every object's points in it are written to a
+    # memory-mappable segment file under archive_path
+    archive_enabled: bool = False
+    archive_path: str = "archive"
+    archive_window_s: int = 3600
+    archive_grace_s: float = 300.0
+    archive_interval_s: float = 300.0
+    # Segment files kept open (memory-mapped) for reads, least recently used evicted
+    archive_open_segments: int = 256
+
+    # Historical replay / zone backfill: replays of at least
+    # replay_parallel_min_points points are split into tasks of about
+    # replay_task_points and spread over replay_workers processes (0 = one
+    # per CPU)
+    replay_workers: int = 0
+    replay_task_points: int = 250000
+    replay_parallel_min_points: int = 200000
+
+    # Alert suppression: within alert_cooldowns_s[type] seconds of an alert,
+    # repeats for the same (object, zone, type) are folded into it (an
+    # occurrence count and first/last timestamps) instead of new rows. With
+    # alert_hysteresis_s > 0 a zone boundary crossing only counts once the
+    # object has stayed on the new side that long
+    alert_cooldowns_s: Dict[str, float] = {"LOW_CONFIDENCE": 300.0}
+    alert_hysteresis_s: float = 0.0
+
+    # Stale detection: an object that has not reported for its timeout raises
+    # one STALE alert. The timeout is stale_timeouts_by_category[category]
+    # (e.g. {"BEACON": 3600}) or stale_timeout_s, lowered by the
+    # stale_timeout_s of any zone the object is inside
+    stale_enabled: bool = True
+    stale_timeout_s: float = 300.0
+    stale_timeouts_by_category: Dict[str, float] = {}
+    stale_check_interval_s: float = 1.0
+
+    # Segment crossings: test the path from each object's previous position
+    # to its new one, not just the new point, so zones crossed between
+    # reports still raise an ENTER/EXIT pair at the interpolated crossing
+    # times. Lets trackers report less often without missing zones
+    segment_crossings_enabled: bool = False
+
+    # Polygon zones with at least this many vertices are compiled into a
+    # PolygonGrid, so most point tests are a cell lookup instead of a walk
+    # over every edge. Below about 10k vertices prepared Shapely geometry is
+    # as fast or faster (python -m benchmarks.suite --only polygon_grid)
+    polygon_grid_min_vertices: int = 10000
+
+    # Observability: alert log lines are written by a background thread;
+    # /api/debug/profiler/* starts and reads the sampling profiler at runtime
+    # (off unless enabled: it is unauthenticated and costs CPU while running)
+    alert_log_enabled: bool = True
+    profiler_endpoints_enabled: bool = False
+    profiler_max_duration_s: float = 300.0
+
+settings = Settings()
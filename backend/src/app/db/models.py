@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel, Field, field_validator
+from sqlalchemy import Index, UniqueConstraint, text
 from sqlmodel import SQLModel, Field as SQLField
 from enum import Enum
 
@@ -62,12 +63,17 @@ class TrackedObject(SQLModel, table=True):
     speed_mps: Optional[float] = None
     heading_deg: Optional[float] = None
     battery_pct: Optional[float] = None
+    # Last ObjectCategory reported in `inference`, if any
+    category: Optional[str] = None
     
     # Store JSON blob for full details if needed, or keep simple for MVP
 
 class TelemetryRecord(SQLModel, table=True):
+    # History is always read per object over a time range
+    __table_args__ = (Index("ix_telemetryrecord_object_id_ts", "object_id", "ts"),)
+
     id: Optional[int] = SQLField(default=None, primary_key=True)
-    object_id: str = SQLField(index=True)
+    object_id: str
     ts: datetime = SQLField(index=True)
     lat: float
     lon: float
@@ -76,6 +82,51 @@ class TelemetryRecord(SQLModel, table=True):
     heading_deg: Optional[float] = None
     battery_pct: Optional[float] = None
 
+class TelemetryRollup(SQLModel, table=True):
+    """
+    One representative point per object per `tier_s`-second bucket, for
+    history older than the raw retention window. The point is the latest
+    sample in its bucket; `samples` counts the raw points it stands for.
+    """
+    __table_args__ = (
+        Index("ix_telemetryrollup_object_id_ts", "object_id", "ts"),
+        Index("ix_telemetryrollup_tier_s_ts", "tier_s", "ts"),
+    )
+
+    tier_s: int = SQLField(primary_key=True)
+    object_id: str = SQLField(primary_key=True)
+    bucket_ts: datetime = SQLField(primary_key=True)
+    ts: datetime
+    lat: float
+    lon: float
+    alt_m: Optional[float] = None
+    speed_mps: Optional[float] = None
+    heading_deg: Optional[float] = None
+    battery_pct: Optional[float] = None
+    samples: int = 1
+
+class ArchiveSegment(SQLModel, table=True):
+    """
+    One columnar segment file holding an object's telemetry for one closed
+    archive window. `path` is relative to the archive root.
+    """
+    __table_args__ = (
+        UniqueConstraint("object_id", "window_start"),
+        Index("ix_archivesegment_object_id_ts_min", "object_id", "ts_min"),
+    )
+
+    id: Optional[int] = SQLField(default=None, primary_key=True)
+    object_id: str
+    window_start: datetime
+    window_end: datetime
+    ts_min: datetime
+    ts_max: datetime
+    count: int
+    path: str
+    # Highest TelemetryRecord id the archive had covered when this segment
+    # was written; rows above it in an archived window arrived late
+    last_record_id: Optional[int] = None
+
 
 class Zone(SQLModel, table=True):
     id: Optional[int] = SQLField(default=None, primary_key=True)
@@ -92,8 +143,30 @@ class Zone(SQLModel, table=True):
     
     enabled: bool = True
     color: str = SQLField(default="#06b6d4")
+    # Objects inside this zone raise STALE after this many seconds of silence
+    stale_timeout_s: Optional[float] = None
     created_at: Optional[datetime] = SQLField(default_factory=datetime.utcnow)
 
+# PATCH /api/zones/{id} body: only the fields that are sent are changed
+class ZoneUpdate(SQLModel):
+    name: Optional[str] = None
+    min_lat: Optional[float] = None
+    min_lon: Optional[float] = None
+    max_lat: Optional[float] = None
+    max_lon: Optional[float] = None
+    is_polygon: Optional[bool] = None
+    polygon_coords: Optional[str] = None
+    enabled: Optional[bool] = None
+    color: Optional[str] = None
+    stale_timeout_s: Optional[float] = None
+
+    @field_validator("name", "is_polygon", "enabled", "color")
+    def not_null(cls, v):
+        # Omit a field to leave it unchanged; these columns cannot be cleared
+        if v is None:
+            raise ValueError("may be omitted but not null")
+        return v
+
 class ObjectZoneState(SQLModel, table=True):
     object_id: str = SQLField(primary_key=True)
     zone_id: int = SQLField(primary_key=True)
@@ -101,10 +174,25 @@ class ObjectZoneState(SQLModel, table=True):
     last_updated: datetime = SQLField(default_factory=datetime.utcnow)
 
 class AlertEvent(SQLModel, table=True):
+    # Alerts are listed newest first, (ts, id) descending, optionally filtered.
+    # SQLite appends the rowid (id) to every index, so (column, ts) indexes
+    # serve keyset pages directly; the partial index keeps unacknowledged
+    # counts proportional to the unacknowledged alerts only.
+    __table_args__ = (
+        Index("ix_alertevent_object_id_ts", "object_id", "ts"),
+        Index("ix_alertevent_zone_id_ts", "zone_id", "ts"),
+        Index("ix_alertevent_alert_type_ts", "alert_type", "ts"),
+        Index("ix_alertevent_unacked_ts", "ts", sqlite_where=text("ack = 0")),
+    )
+
     id: Optional[int] = SQLField(default=None, primary_key=True)
     ts: datetime = SQLField(default_factory=datetime.utcnow, index=True)
-    object_id: str = SQLField(index=True)
-    zone_id: Optional[int] = SQLField(index=True)
+    object_id: str
+    zone_id: Optional[int] = None
     alert_type: AlertType
     message: str
     ack: bool = False
+    # Repeats coalesced into this alert, and when the first and last happened
+    occurrences: int = SQLField(default=1, sa_column_kwargs={"server_default": "1"})
+    first_ts: Optional[datetime] = None
+    last_ts: Optional[datetime] = None
@@ -1,14 +1,103 @@
+from typing import Callable, List
+from sqlalchemy import event, inspect
+from sqlalchemy.schema import CreateColumn
 from sqlmodel import SQLModel, create_engine, Session
+from src.app.config import settings
 
-sqlite_file_name = "database_v2.db"
+sqlite_file_name = settings.database_path
 sqlite_url = f"sqlite:///{sqlite_file_name}"
 
 connect_args = {"check_same_thread": False}
 engine = create_engine(sqlite_url, connect_args=connect_args)
 
-def create_db_and_tables():
+# Readers get their own pool so they never queue behind the writer's connection
+read_engine = create_engine(
+    sqlite_url,
+    connect_args=connect_args,
+    pool_size=settings.read_pool_size,
+    max_overflow=settings.read_pool_size,
+)
+
+def configure_sqlite(engine, read_only: bool = False):
+    """
+    Tune every new connection of `engine` for concurrent read/write.
+    """
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        # Let SQLAlchemy issue BEGIN itself so SAVEPOINTs work with pysqlite
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers run concurrently with the single writer
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_size_kib}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def _on_begin(connection):
+        connection.exec_driver_sql("BEGIN")
+
+configure_sqlite(engine)
+configure_sqlite(read_engine, read_only=True)
+
+def create_db_and_tables(engine=engine):
     SQLModel.metadata.create_all(engine)
+    # create_all skips tables that already exist; add any (nullable) columns
+    # and indexes introduced since
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
 
 def get_session():
     with Session(engine) as session:
         yield session
+
+def get_read_session():
+    """
+    Session on the read-only pool, for endpoints that never write.
+    """
+    with Session(read_engine) as session:
+        yield session
+
+def after_commit(session: Session, callback: Callable[[], None]):
+    """
+    Run `callback` once the work done in `session` so far has been
+    committed, whether the caller commits itself or the group-commit writer
+    commits on its behalf.
+    """
+    session.info.setdefault("after_commit", []).append(callback)
+
+def after_rollback(session: Session, callback: Callable[[], None]):
+    """
+    Run `callback` if the work done in `session` so far is rolled back
+    instead: its job fails inside the group-commit writer, or the commit
+    itself fails.
+    """
+    session.info.setdefault("after_rollback", []).append(callback)
+
+def run_after_commit(session: Session):
+    session.info.pop("after_rollback", None)
+    run_callbacks(session.info.pop("after_commit", []), "after_commit")
+
+def run_after_rollback(session: Session):
+    session.info.pop("after_commit", None)
+    run_callbacks(session.info.pop("after_rollback", []), "after_rollback")
+
+def run_callbacks(callbacks: List[Callable[[], None]], kind: str):
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception as e:
+            print(f"{kind} callback failed: {e}")
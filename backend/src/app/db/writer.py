@@ -0,0 +1,168 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Tuple, TypeVar
+from sqlmodel import Session
+from src.app.db.session import run_after_commit, run_after_rollback, run_callbacks
+from src.app.services import metrics
+
+T = TypeVar("T")
+
+class GroupCommitWriter:
+    """
+    Single database writer that commits work from many callers together.
+
+    Callers submit functions that take a Session and must not commit. The
+    writer thread picks up the first pending job, keeps collecting jobs for
+    up to `max_delay_s` (or until `max_batch` are pending), runs each inside
+    its own SAVEPOINT so one failing job does not undo the others, and then
+    commits once. Every caller's future resolves after that commit, so one
+    fsync is shared by the whole group and there is never more than one
+    writer contending for SQLite's write lock.
+    """
+
+    def __init__(self, engine, max_batch: int = 256, max_delay_s: float = 0.005):
+        self.engine = engine
+        self.max_batch = max_batch
+        self.max_delay_s = max_delay_s
+        self._jobs: "queue.Queue[Optional[Tuple[Callable, Future]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self.commits = 0
+        self.jobs_committed = 0
+
+    def submit(self, fn: Callable[[Session], T]) -> "Future[T]":
+        if self._thread is None:
+            raise RuntimeError("GroupCommitWriter is not running")
+        future: "Future[T]" = Future()
+        self._jobs.put((fn, future))
+        return future
+
+    @property
+    def backlog(self) -> int:
+        return self._jobs.qsize()
+
+    def run(self, fn: Callable[[Session], T]) -> T:
+        """
+        Submit `fn` and block until its group has been committed.
+        """
+        return self.submit(fn).result()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Commit everything already submitted, then stop the writer thread.
+        """
+        if self._thread is None:
+            return
+        self._jobs.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _collect(self) -> Tuple[List[Tuple[Callable, Future]], bool]:
+        first = self._jobs.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay_s
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                job = self._jobs.get(timeout=timeout) if timeout > 0 else self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                return batch, True
+            batch.append(job)
+        return batch, False
+
+    def _run(self):
+        while True:
+            batch, stopping = self._collect()
+            if batch:
+                self._commit_group(batch)
+            if stopping:
+                return
+
+    def _commit_group(self, batch: List[Tuple[Callable, Future]]):
+        results = []
+        metrics.db_commit_jobs.observe(len(batch))
+        with Session(self.engine) as session:
+            for fn, future in batch:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                hooks = session.info.setdefault("after_commit", [])
+                undo = session.info.setdefault("after_rollback", [])
+                mark, undo_mark = len(hooks), len(undo)
+                savepoint = session.begin_nested()
+                try:
+                    result = fn(session)
+                    savepoint.commit()
+                    results.append((future, result, None))
+                except Exception as e:
+                    savepoint.rollback()
+                    # The job's writes are gone, so are its post-commit
+                    # callbacks; its rollback callbacks run now
+                    del hooks[mark:]
+                    failed = undo[undo_mark:]
+                    del undo[undo_mark:]
+                    run_callbacks(failed, "after_rollback")
+                    results.append((future, None, e))
+            try:
+                started = time.perf_counter()
+                session.commit()
+                metrics.db_commit_seconds.observe(time.perf_counter() - started)
+            except Exception as e:
+                session.rollback()
+                run_after_rollback(session)
+                for future, _, _ in results:
+                    future.set_exception(e)
+                return
+            run_after_commit(session)
+        self.commits += 1
+        self.jobs_committed += sum(1 for _, _, error in results if error is None)
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+writer: Optional[GroupCommitWriter] = None
+
+def get_writer() -> Optional[GroupCommitWriter]:
+    return writer
+
+def start_writer(engine, max_batch: int, max_delay_s: float) -> GroupCommitWriter:
+    global writer
+    writer = GroupCommitWriter(engine, max_batch, max_delay_s)
+    writer.start()
+    return writer
+
+def stop_writer():
+    global writer
+    if writer is not None:
+        writer.stop()
+        writer = None
+
+def run_write(fn: Callable[[Session], T], session: Session) -> T:
+    """
+    Run a write through the group-commit writer when it is running,
+    otherwise directly in `session` with its own commit.
+    """
+    current = writer
+    if current is not None:
+        return current.run(fn)
+    try:
+        result = fn(session)
+        session.commit()
+    except Exception:
+        session.rollback()
+        run_after_rollback(session)
+        raise
+    run_after_commit(session)
+    return result
@@ -1,13 +1,62 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from src.app.db.session import create_db_and_tables
-from src.app.api import routes_telemetry, routes_zones, routes_objects, routes_alerts
+from sqlmodel import Session
+from src.app.db.session import create_db_and_tables, engine, sqlite_url
+from src.app.db.writer import get_writer, start_writer, stop_writer
+from src.app.api import routes_telemetry, routes_zones, routes_objects, routes_alerts, routes_stream, routes_debug
+from src.app.config import settings
+from src.app.services import metrics
+from src.app.services.alert_log import start_alert_log, stop_alert_log
+from src.app.services.alert_policy import alert_suppressor
+from src.app.services.archive import archive
+from src.app.services.ingest_queue import get_ingest_queue, start_ingest_queue, stop_ingest_queue
+from src.app.services.profiler import profiler
+from src.app.services.replay import shutdown_pool as shutdown_replay_pool
+from src.app.services.retention import retention
+from src.app.services.sharding import get_ingest_shards, start_ingest_shards, stop_ingest_shards
+from src.app.services.staleness import stale_monitor
+from src.app.services.state_store import state_store
+from src.app.services.stream import stream_hub
+from src.app.services.trails import trail_buffer
+from src.app.services.zone_registry import zone_registry
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    if settings.alert_log_enabled:
+        start_alert_log()
     create_db_and_tables()
+    start_writer(engine, settings.db_group_commit_max_batch, settings.db_group_commit_max_delay_ms / 1000)
+    with Session(engine) as session:
+        zone_registry.load(session)
+        state_store.load(session)
+        trail_buffer.load(session)
+        stale_monitor.load(session)
+    state_store.start_flusher(engine, settings.state_flush_interval_s)
+    if settings.ingest_shards > 0:
+        start_ingest_shards(settings.ingest_shards, sqlite_url)
+    if settings.stale_enabled:
+        stale_monitor.start(engine, settings.stale_check_interval_s)
+    if settings.ingest_queue_enabled:
+        start_ingest_queue(engine, settings.ingest_queue_max_size, settings.ingest_batch_max)
+    if settings.retention_enabled:
+        retention.start(engine, settings.retention_interval_s)
+    if settings.archive_enabled:
+        archive.start(engine, settings.archive_interval_s)
     yield
+    stale_monitor.stop()
+    archive.stop()
+    retention.stop()
+    # Drain queued telemetry before the final state flush
+    stop_ingest_queue()
+    stop_ingest_shards()
+    # Write out any object/zone state still pending
+    state_store.stop_flusher(engine)
+    stop_writer()
+    shutdown_replay_pool()
+    profiler.stop()
+    stop_alert_log()
 
 app = FastAPI(title="Arctic Corridor Geofence Tracker", lifespan=lifespan)
 
@@ -18,12 +67,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Change-Cursor", "X-Next-Cursor"],
 )
 
 app.include_router(routes_telemetry.router)
 app.include_router(routes_zones.router)
 app.include_router(routes_objects.router)
 app.include_router(routes_alerts.router)
+app.include_router(routes_stream.router)
+app.include_router(routes_debug.router)
+
+# Gauges are read when /metrics is scraped
+def _queue_depth():
+    ingest_queue = get_ingest_queue()
+    return ingest_queue.depth if ingest_queue is not None else None
+
+def _shards_alive():
+    shards = get_ingest_shards()
+    return shards.stats()["alive"] if shards is not None else None
+
+def _writer_backlog():
+    writer = get_writer()
+    return writer.backlog if writer is not None else None
+
+metrics.registry.gauge("geofence_objects_tracked", "Objects in the state store", lambda: len(state_store.objects))
+metrics.registry.gauge("geofence_state_dirty_entries", "Object/zone states waiting to be flushed",
+                       lambda: state_store.dirty_count)
+metrics.registry.gauge("geofence_zones_loaded", "Enabled zones in the registry", lambda: zone_registry.enabled_count)
+metrics.registry.gauge("geofence_ingest_queue_depth", "Points waiting in the ingest queue", _queue_depth)
+metrics.registry.gauge("geofence_ingest_shards_alive", "Running ingest shard worker processes", _shards_alive)
+metrics.registry.gauge("geofence_db_writer_backlog", "Jobs waiting for the group-commit writer", _writer_backlog)
+metrics.registry.gauge("geofence_alerts_open_for_coalescing", "Alerts still in their cooldown",
+                       lambda: alert_suppressor.open_count)
+metrics.registry.gauge("geofence_stream_clients", "Connected WebSocket stream clients",
+                       lambda: stream_hub.client_count)
 
 @app.get("/")
 def read_root():
@@ -32,3 +109,10 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """
+    Counters, histograms and gauges in the Prometheus text format.
+    """
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
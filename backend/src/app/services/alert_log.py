@@ -0,0 +1,42 @@
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Optional
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[logging.Handler] = None
+
+def start_alert_log(stream=None):
+    """
+    Print alert log lines from a background thread. The ingest path only
+    appends the record to an in-memory queue, so a slow or blocked stdout
+    never holds up a commit.
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return
+    records: queue.Queue = queue.Queue()
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(logging.Formatter("[%(asctime)s] %(message)s"))
+    _handler = logging.handlers.QueueHandler(records)
+    logger = logging.getLogger("geofence.alerts")
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+
+def stop_alert_log():
+    """
+    Write out queued lines and detach the handler.
+    """
+    global _listener, _handler
+    if _listener is None:
+        return
+    logger = logging.getLogger("geofence.alerts")
+    logger.removeHandler(_handler)
+    logger.propagate = True
+    _listener.stop()
+    _listener = None
+    _handler = None
@@ -0,0 +1,220 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from src.app.config import settings
+from src.app.db.models import AlertType
+from src.app.services.metrics import alerts_suppressed
+
+Key = Tuple[str, Optional[int], AlertType]
+
+class _Open:
+    """
+    The latest alert raised for a key, while repeats can still be folded into it.
+    """
+    __slots__ = ("row", "first_ts", "last_ts", "occurrences")
+
+    def __init__(self, row: dict, ts: datetime):
+        self.row = row
+        self.first_ts = ts
+        self.last_ts = ts
+        self.occurrences = 1
+
+class AlertSuppressor:
+    """
+    In-memory suppression layer between zone evaluation and AlertEvent
+    inserts, keyed by (object, zone, alert type).
+
+    Cooldown: within `cooldowns[type]` seconds (point time) of an alert
+    being raised, further alerts for the same key are coalesced into it,
+    bumping its occurrence count and last_ts, instead of inserting new rows.
+
+    Hysteresis: with `hysteresis_s` > 0 an object only changes sides of a
+    zone boundary once the new side has held for that long; a point back on
+    the old side before then cancels the change, so edge jitter raises no
+    ENTER/EXIT at all. Live ingest then no longer matches a plain replay.
+
+    Callers hold state_store.lock.
+    """
+
+    def __init__(self, cooldowns: Dict[str, float], hysteresis_s: float):
+        self.cooldowns = {AlertType(name): seconds for name, seconds in cooldowns.items()}
+        self.hysteresis_s = hysteresis_s
+        self._open: Dict[Key, _Open] = {}
+        self._dirty: Dict[int, _Open] = {}
+        # Updates taken by a batch whose write failed, to be taken again
+        self._requeued: Dict[int, dict] = {}
+        # (object_id, zone_id) -> (side waiting to be confirmed, since)
+        self._pending: Dict[Tuple[str, int], Tuple[bool, datetime]] = {}
+        self._pending_zones: Dict[str, Set[int]] = {}
+        self._prune_at = 10000
+
+    # --- Hysteresis ---
+
+    def pending_zones(self, object_id: str) -> Set[int]:
+        """
+        Zones with an unconfirmed change for `object_id`; they must be
+        evaluated even when the point is outside their bounding box.
+        """
+        return self._pending_zones.get(object_id, set())
+
+    def confirm(self, object_id: str, zone_id: int, inside: bool, ts: datetime) -> bool:
+        """
+        The point is on the other side of the zone than the object's state.
+        Returns True once that has held for `hysteresis_s`.
+        """
+        if self.hysteresis_s <= 0:
+            return True
+        key = (object_id, zone_id)
+        pending = self._pending.get(key)
+        if pending is None or pending[0] != inside:
+            self._pending[key] = pending = (inside, ts)
+            self._pending_zones.setdefault(object_id, set()).add(zone_id)
+        if (ts - pending[1]).total_seconds() < self.hysteresis_s:
+            return False
+        self._clear_pending(key)
+        return True
+
+    def hold(self, object_id: str, zone_id: int):
+        """
+        The point is on the same side as the object's state; drop any
+        change that was waiting to be confirmed.
+        """
+        key = (object_id, zone_id)
+        pending = self._pending.get(key)
+        if pending is not None:
+            alerts_suppressed.inc(1, (AlertType.ENTER if pending[0] else AlertType.EXIT).value, "hysteresis")
+            self._clear_pending(key)
+
+    def _clear_pending(self, key: Tuple[str, int]):
+        del self._pending[key]
+        zones = self._pending_zones.get(key[0])
+        if zones is not None:
+            zones.discard(key[1])
+            if not zones:
+                del self._pending_zones[key[0]]
+
+    # --- Cooldowns / coalescing ---
+
+    def coalesce(self, object_id: str, zone_id: Optional[int], alert_type: AlertType, ts: datetime) -> bool:
+        """
+        Fold this occurrence into the key's open alert if it is still in
+        its cooldown. Returns False when a new alert should be raised.
+        """
+        cooldown = self.cooldowns.get(alert_type)
+        if not cooldown:
+            return False
+        entry = self._open.get((object_id, zone_id, alert_type))
+        if entry is None or (ts - entry.first_ts).total_seconds() >= cooldown:
+            return False
+        entry.occurrences += 1
+        entry.last_ts = max(entry.last_ts, ts)
+        alert_id = entry.row.get("id")
+        if alert_id is None:
+            # Not inserted yet (same batch): update the row itself
+            entry.row["occurrences"] = entry.occurrences
+            entry.row["last_ts"] = entry.last_ts
+        else:
+            self._dirty[alert_id] = entry
+        alerts_suppressed.inc(1, alert_type.value, "cooldown")
+        return True
+
+    def opened(self, row: dict, ts: datetime):
+        """
+        Remember a newly raised alert row so repeats can be folded into it.
+        """
+        alert_type = row["alert_type"]
+        if not self.cooldowns.get(alert_type):
+            return
+        self._open[(row["object_id"], row["zone_id"], alert_type)] = _Open(row, ts)
+        if len(self._open) > self._prune_at:
+            self._prune(ts)
+
+    def take_updates(self) -> List[dict]:
+        """
+        Occurrence counts of already stored alerts changed since the last
+        call, as rows for a bulk UPDATE by primary key.
+        """
+        updates = self._requeued
+        self._requeued = {}
+        for alert_id, entry in self._dirty.items():
+            updates[alert_id] = dict(id=alert_id, occurrences=entry.occurrences, last_ts=entry.last_ts)
+        self._dirty.clear()
+        return list(updates.values())
+
+    # --- Undo for batches whose write fails ---
+
+    def requeue(self, updates: List[dict]):
+        """
+        Occurrence updates taken by a batch whose write failed; the next
+        take_updates() returns them again unless the alert changed since.
+        """
+        for update in updates:
+            self._requeued[update["id"]] = update
+
+    def save(self, object_id: str, zone_id: Optional[int]) -> tuple:
+        """
+        Everything held for (object_id, zone_id), for restore().
+        """
+        opened = []
+        for alert_type in self.cooldowns:
+            entry = self._open.get((object_id, zone_id, alert_type))
+            if entry is not None:
+                opened.append((alert_type, entry, entry.occurrences, entry.last_ts))
+        return opened, self._pending.get((object_id, zone_id))
+
+    def restore(self, object_id: str, zone_id: Optional[int], saved: tuple):
+        """
+        Put (object_id, zone_id) back as save() found it, after the batch
+        that changed it failed to write.
+        """
+        opened, pending = saved
+        before = {alert_type: (entry, occurrences, last_ts) for alert_type, entry, occurrences, last_ts in opened}
+        for alert_type in self.cooldowns:
+            key = (object_id, zone_id, alert_type)
+            if alert_type not in before:
+                # Opened by the failed batch
+                self._open.pop(key, None)
+                continue
+            entry, occurrences, last_ts = before[alert_type]
+            self._open[key] = entry
+            if (entry.occurrences, entry.last_ts) == (occurrences, last_ts):
+                continue
+            entry.occurrences, entry.last_ts = occurrences, last_ts
+            alert_id = entry.row.get("id")
+            if alert_id is None:
+                entry.row["occurrences"] = occurrences
+                entry.row["last_ts"] = last_ts
+            else:
+                self._dirty[alert_id] = entry
+        key = (object_id, zone_id)
+        if pending is not None:
+            self._pending[key] = pending
+            self._pending_zones.setdefault(object_id, set()).add(zone_id)
+        elif key in self._pending:
+            self._clear_pending(key)
+
+    def close(self, alert_ids: Set[int]):
+        """
+        Stop coalescing into these alerts, e.g. once acknowledged.
+        """
+        for key, entry in list(self._open.items()):
+            if entry.row.get("id") in alert_ids:
+                del self._open[key]
+
+    def _prune(self, now: datetime):
+        longest = max(self.cooldowns.values(), default=0)
+        self._open = {key: entry for key, entry in self._open.items()
+                      if (now - entry.first_ts).total_seconds() < longest}
+        self._prune_at = max(10000, 2 * len(self._open))
+
+    @property
+    def open_count(self) -> int:
+        return len(self._open)
+
+    def reset(self):
+        self._open.clear()
+        self._dirty.clear()
+        self._requeued.clear()
+        self._pending.clear()
+        self._pending_zones.clear()
+
+alert_suppressor = AlertSuppressor(settings.alert_cooldowns_s, settings.alert_hysteresis_s)
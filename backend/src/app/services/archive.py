@@ -0,0 +1,358 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+import numpy as np
+from sqlalchemy import func, select
+from sqlmodel import Session
+from src.app.config import settings
+from src.app.db.models import ArchiveSegment, TelemetryRecord
+from src.app.db.writer import run_write
+
+# Column name -> on-disk dtype. ts is microseconds since the Unix epoch (UTC);
+# values stay float64 so archived history reads back exactly as ingested, and
+# missing optional values are stored as NaN.
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("ts", "<i8"),
+    ("lat", "<f8"),
+    ("lon", "<f8"),
+    ("alt_m", "<f8"),
+    ("speed_mps", "<f8"),
+    ("heading_deg", "<f8"),
+    ("battery_pct", "<f8"),
+)
+MAGIC = b"GFSEG001"
+ALIGN = 64
+
+def _naive_utc(ts: datetime) -> datetime:
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+def to_us(ts: datetime) -> int:
+    return int(np.datetime64(_naive_utc(ts), "us").astype(np.int64))
+
+def from_us(values: np.ndarray) -> List[datetime]:
+    return np.asarray(values, dtype=np.int64).astype("datetime64[us]").tolist()
+
+def _aligned(n: int) -> int:
+    return -(-n // ALIGN) * ALIGN
+
+def write_segment(path: Path, object_id: str, columns: Dict[str, np.ndarray]):
+    """
+    Write one segment file: MAGIC, a little-endian uint32 header length, a
+    JSON header (object id, row count, per-column dtype and offset), then
+    every column as a contiguous array. Column offsets are relative to the
+    data region, which starts at the first 64-byte boundary after the
+    header; every column is 64-byte aligned. Rows must already be sorted
+    by ts.
+
+    The file is written next to its final name and renamed into place, so
+    readers never see a partial segment.
+    """
+    count = len(columns["ts"])
+    arrays = [np.ascontiguousarray(columns[name], dtype=dtype) for name, dtype in COLUMNS]
+    layout = []
+    offset = 0
+    for (name, dtype), array in zip(COLUMNS, arrays):
+        layout.append({"name": name, "dtype": dtype, "offset": offset})
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({"object_id": object_id, "count": count, "columns": layout}).encode()
+    data_start = _aligned(len(MAGIC) + 4 + len(header))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(4, "little"))
+        f.write(header)
+        for entry, array in zip(layout, arrays):
+            f.seek(data_start + entry["offset"])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class Segment:
+    """
+    A segment file opened with memory mapping. Columns are read-only
+    np.memmap views; nothing is read from disk until it is accessed.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a telemetry segment")
+            header_len = int.from_bytes(f.read(4), "little")
+            header = json.loads(f.read(header_len))
+        data_start = _aligned(len(MAGIC) + 4 + header_len)
+        self.object_id: str = header["object_id"]
+        self.count: int = header["count"]
+        self.columns: Dict[str, np.ndarray] = {}
+        for entry in header["columns"]:
+            if self.count == 0:
+                self.columns[entry["name"]] = np.empty(0, dtype=entry["dtype"])
+                continue
+            self.columns[entry["name"]] = np.memmap(
+                path, dtype=entry["dtype"], mode="r", offset=data_start + entry["offset"], shape=(self.count,)
+            )
+
+    def slice(self, start_us: Optional[int] = None, end_us: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Views of every column for start_us <= ts <= end_us (no copy).
+        """
+        ts = self.columns["ts"]
+        lo = 0 if start_us is None else int(np.searchsorted(ts, start_us, side="left"))
+        hi = self.count if end_us is None else int(np.searchsorted(ts, end_us, side="right"))
+        return {name: column[lo:hi] for name, column in self.columns.items()}
+
+def open_segment(path) -> Segment:
+    return Segment(Path(path))
+
+class Archive:
+    """
+    Columnar archive of closed telemetry windows.
+
+    The database stays the hot store; once a `window_s` window has been
+    over for `grace_s`, the archive job copies every object's points in it
+    into one segment file per object and records it as an ArchiveSegment.
+    Raw rows are left for retention to roll up later, so the archive keeps
+    full resolution for as long as the files are kept.
+
+    Every run covers the telemetry rows up to the highest id committed when
+    it started, and records that id on the segments it writes. Rows with a
+    higher id that fall in an already archived window arrived late; the
+    next run merges them into that window's segments.
+
+    Up to `max_open` segments stay open for reads; the least recently used
+    are dropped beyond that.
+    """
+
+    def __init__(self, root: str, window_s: int, grace_s: float, max_open: int = 256):
+        self.root = Path(root)
+        self.window_s = window_s
+        self.grace_s = grace_s
+        self.max_open = max_open
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._segments: "OrderedDict[str, Segment]" = OrderedDict()
+        self._segments_lock = threading.Lock()
+
+    def _floor(self, ts: datetime) -> datetime:
+        epoch = datetime(1970, 1, 1)
+        return epoch + timedelta(seconds=(ts - epoch).total_seconds() // self.window_s * self.window_s)
+
+    # --- Writing ---
+
+    def archive_closed_windows(self, engine, now: Optional[datetime] = None) -> int:
+        """
+        Archive every closed window not yet archived, and merge rows that
+        arrived late into windows archived before. Returns the number of
+        segments written.
+        """
+        now = _naive_utc(now or datetime.now(timezone.utc))
+        closed_before = now - timedelta(seconds=self.grace_s)
+        written = 0
+        with Session(engine) as session:
+            archived_until, archived_id = session.execute(
+                select(func.max(ArchiveSegment.window_end), func.max(ArchiveSegment.last_record_id))
+            ).one()
+            # Rows are committed in id order, so everything up to last_id is visible from here on
+            last_id = session.execute(select(func.max(TelemetryRecord.id))).scalar()
+            if last_id is None:
+                return 0
+            if archived_until is not None and archived_id is not None and last_id > archived_id:
+                written += self._archive_late(session, archived_id, last_id, archived_until)
+            while True:
+                # Jump straight to the next window that has any data
+                statement = select(func.min(TelemetryRecord.ts)).where(TelemetryRecord.id <= last_id)
+                if archived_until is not None:
+                    statement = statement.where(TelemetryRecord.ts >= archived_until)
+                first = session.execute(statement).scalar()
+                if first is None:
+                    break
+                window_start = self._floor(first)
+                window_end = window_start + timedelta(seconds=self.window_s)
+                if window_end > closed_before:
+                    break
+                written += self._archive_window(session, window_start, window_end, last_id)
+                archived_until = window_end
+        return written
+
+    def _archive_window(self, session: Session, window_start: datetime, window_end: datetime, last_id: int) -> int:
+        rows = self._rows(session, TelemetryRecord.ts >= window_start, TelemetryRecord.ts < window_end,
+                          TelemetryRecord.id <= last_id)
+        segments = []
+        for object_id, columns in rows:
+            relative = self._relative(window_start, object_id)
+            write_segment(self.root / relative, object_id, columns)
+            segments.append(self._describe(ArchiveSegment(object_id=object_id, path=relative), window_start,
+                                           columns, last_id))
+
+        def record(s: Session):
+            for segment in segments:
+                s.add(segment)
+        if segments:
+            run_write(record, session)
+        return len(segments)
+
+    def _archive_late(self, session: Session, archived_id: int, last_id: int, archived_until: datetime) -> int:
+        """
+        Merge rows with archived_id < id <= last_id whose window was already
+        archived into that window's segment for their object (or a new one).
+        """
+        rows = self._rows(session, TelemetryRecord.id > archived_id, TelemetryRecord.id <= last_id,
+                          TelemetryRecord.ts < archived_until)
+        window_us = self.window_s * 1_000_000
+        segments = []
+        for object_id, columns in rows:
+            windows = columns["ts"] // window_us * window_us
+            bounds = np.flatnonzero(windows[1:] != windows[:-1]) + 1
+            for lo, hi in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [len(windows)]))):
+                window_start = from_us(windows[lo:lo + 1])[0]
+                late = {name: column[lo:hi] for name, column in columns.items()}
+                segment = session.execute(select(ArchiveSegment).where(
+                    ArchiveSegment.object_id == object_id, ArchiveSegment.window_start == window_start
+                )).scalar_one_or_none()
+                if segment is not None:
+                    session.expunge(segment)
+                session.rollback()
+                if segment is None:
+                    segment = ArchiveSegment(object_id=object_id, path=self._relative(window_start, object_id))
+                else:
+                    # Copy out of the old file before it is replaced
+                    stored = open_segment(self.root / segment.path).columns
+                    merged = {name: np.concatenate((np.array(stored[name]), late[name])) for name, _ in COLUMNS}
+                    order = np.argsort(merged["ts"], kind="stable")
+                    late = {name: column[order] for name, column in merged.items()}
+                write_segment(self.root / segment.path, object_id, late)
+                segments.append(self._describe(segment, window_start, late, last_id))
+
+        def record(s: Session):
+            for segment in segments:
+                s.merge(segment)
+        if segments:
+            run_write(record, session)
+            with self._segments_lock:
+                for segment in segments:
+                    self._segments.pop(segment.path, None)
+        return len(segments)
+
+    def _rows(self, session: Session, *where):
+        """
+        (object_id, columns) for every object with telemetry rows matching
+        `where`, columns sorted by ts.
+        """
+        fields = [getattr(TelemetryRecord, name) for name, _ in COLUMNS]
+        rows = session.execute(
+            select(TelemetryRecord.object_id, *fields).where(*where)
+            .order_by(TelemetryRecord.object_id, TelemetryRecord.ts)
+        ).all()
+        session.rollback()  # end the read transaction before the writes that follow
+        if not rows:
+            return []
+
+        object_ids = np.array([row[0] for row in rows], dtype=object)
+        values = {name: np.array([row[i + 1] for row in rows], dtype=dtype)
+                  for i, (name, dtype) in enumerate(COLUMNS) if name != "ts"}
+        values["ts"] = np.array([row[1] for row in rows], dtype="datetime64[us]").astype(np.int64)
+        # Rows are sorted by object; split them into one run per object
+        bounds = np.flatnonzero(object_ids[1:] != object_ids[:-1]) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [len(rows)]))
+        return [(object_ids[lo], {name: column[lo:hi] for name, column in values.items()})
+                for lo, hi in zip(starts, ends)]
+
+    def _relative(self, window_start: datetime, object_id: str) -> str:
+        return f"{window_start.strftime('%Y%m%dT%H%M%S')}/{quote(object_id, safe='')}.seg"
+
+    def _describe(self, segment: ArchiveSegment, window_start: datetime, columns: Dict[str, np.ndarray],
+                  last_id: int) -> ArchiveSegment:
+        ts = columns["ts"]
+        segment.window_start = window_start
+        segment.window_end = window_start + timedelta(seconds=self.window_s)
+        segment.ts_min = from_us(ts[:1])[0]
+        segment.ts_max = from_us(ts[-1:])[0]
+        segment.count = len(ts)
+        segment.last_record_id = last_id
+        return segment
+
+    # --- Reading ---
+
+    def coverage(self, session: Session) -> Optional[Tuple[datetime, datetime]]:
+        """
+        [start, end) of the archived windows, or None if nothing is archived.
+        """
+        lo, hi = session.execute(
+            select(func.min(ArchiveSegment.window_start), func.max(ArchiveSegment.window_end))
+        ).one()
+        return None if lo is None else (lo, hi)
+
+    def open(self, relative: str) -> Segment:
+        with self._segments_lock:
+            segment = self._segments.get(relative)
+            if segment is not None:
+                self._segments.move_to_end(relative)
+                return segment
+            segment = self._segments[relative] = open_segment(self.root / relative)
+            # Dropping a segment unmaps it once no caller holds its columns
+            while len(self._segments) > self.max_open:
+                self._segments.popitem(last=False)
+            return segment
+
+    def read(self, session: Session, object_id: str, start: Optional[datetime] = None,
+             end: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+        """
+        Columns of every archived point of `object_id` with start <= ts <= end,
+        sorted by ts. A range inside one segment is returned as memmap views
+        without copying; ranges spanning segments are concatenated.
+        """
+        statement = select(ArchiveSegment.path).where(ArchiveSegment.object_id == object_id)
+        if start is not None:
+            statement = statement.where(ArchiveSegment.ts_max >= _naive_utc(start))
+        if end is not None:
+            statement = statement.where(ArchiveSegment.ts_min <= _naive_utc(end))
+        paths = session.execute(statement.order_by(ArchiveSegment.ts_min)).scalars().all()
+        start_us = None if start is None else to_us(start)
+        end_us = None if end is None else to_us(end)
+        parts = [self.open(path).slice(start_us, end_us) for path in paths]
+        if len(parts) == 1:
+            return parts[0]
+        return {
+            name: np.concatenate([part[name] for part in parts]) if parts else np.empty(0, dtype=dtype)
+            for name, dtype in COLUMNS
+        }
+
+    # --- Background job ---
+
+    def start(self, engine, interval_s: float):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(engine, interval_s), name="archive", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self, engine, interval_s: float):
+        while True:
+            try:
+                self.archive_closed_windows(engine)
+            except Exception as e:
+                print(f"Archive run failed: {e}")
+            if self._stop.wait(timeout=interval_s):
+                return
+
+archive = Archive(settings.archive_path, settings.archive_window_s, settings.archive_grace_s,
+                  settings.archive_open_segments)
@@ -0,0 +1,256 @@
+import json
+import math
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Tuple
+from pydantic import TypeAdapter, ValidationError
+from pydantic_core import from_json
+from src.app.db.models import ObjectCategory, TelemetryPoint
+
+try:
+    import msgpack
+except ImportError:  # optional; only needed for application/msgpack bodies
+    msgpack = None
+
+BINARY_CONTENT_TYPE = "application/vnd.geofence.telemetry"
+MSGPACK_CONTENT_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+# Category code in binary/msgpack records; 0 means "no inference"
+CATEGORIES = (None,) + tuple(category.value for category in ObjectCategory)
+CATEGORY_CODES = {category: code for code, category in enumerate(CATEGORIES)}
+
+# Binary record: uint16 object_id length, the UTF-8 object_id, then
+# ts (int64 microseconds since the Unix epoch, UTC), lat, lon, alt_m,
+# confidence, speed_mps, heading_deg, battery_pct (float64; NaN for a
+# missing alt_m/battery_pct) and the uint8 category code. Little-endian,
+# records back to back with no framing.
+_ID_LENGTH = struct.Struct("<H")
+_RECORD = struct.Struct("<qdddddddB")
+
+class FlatPoint:
+    """
+    One telemetry point with only the fields ingest uses, flattened out of
+    TelemetryPoint's Position/TelemetryData/ObjectInference. The fast
+    codecs decode straight into these, and process_batch flattens JSON
+    points into them, so both feed the same pipeline.
+    """
+
+    __slots__ = ("object_id", "ts", "lat", "lon", "alt_m", "confidence",
+                 "speed_mps", "heading_deg", "battery_pct", "category")
+
+    def __init__(self, object_id: str, ts: datetime, lat: float, lon: float, alt_m: Optional[float],
+                 confidence: float, speed_mps: float, heading_deg: float, battery_pct: Optional[float],
+                 category: Optional[str] = None):
+        self.object_id = object_id
+        self.ts = ts
+        self.lat = lat
+        self.lon = lon
+        self.alt_m = alt_m
+        self.confidence = confidence
+        self.speed_mps = speed_mps
+        self.heading_deg = heading_deg
+        self.battery_pct = battery_pct
+        self.category = category
+
+    @classmethod
+    def from_model(cls, point: TelemetryPoint) -> "FlatPoint":
+        position, telemetry = point.position, point.telemetry
+        return cls(
+            point.object_id, point.ts, position.lat, position.lon, position.alt_m, point.confidence,
+            telemetry.speed_mps, telemetry.heading_deg, telemetry.battery_pct,
+            point.inference.category.value if point.inference is not None else None,
+        )
+
+def checked(object_id, ts, lat, lon, alt_m, confidence, speed_mps, heading_deg, battery_pct,
+            category=None) -> FlatPoint:
+    """
+    Build a FlatPoint, applying the same constraints as the TelemetryPoint
+    fields. Raises ValueError naming the first field that fails. NaN fails
+    every range check, as it does in pydantic.
+    """
+    try:
+        # Chained comparisons also reject non-numbers (TypeError) in one pass
+        valid = (type(object_id) is str and object_id != "" and isinstance(ts, datetime) and ts.tzinfo is not None
+                 and -90 <= lat <= 90 and -180 <= lon <= 180 and 0 <= confidence <= 1 and speed_mps >= 0
+                 and 0 <= heading_deg <= 360 and (battery_pct is None or 0 <= battery_pct <= 100)
+                 and (alt_m is None or isinstance(alt_m, (int, float)))
+                 and (category is None or category in CATEGORY_CODES))
+    except TypeError:
+        valid = False
+    if not valid:
+        raise ValueError(_reason(object_id, ts, lat, lon, alt_m, confidence, speed_mps, heading_deg,
+                                 battery_pct, category))
+    return FlatPoint(object_id, ts, lat, lon, alt_m, confidence, speed_mps, heading_deg, battery_pct, category)
+
+def _reason(object_id, ts, lat, lon, alt_m, confidence, speed_mps, heading_deg, battery_pct, category) -> str:
+    """
+    Why `checked` refused a record; off the hot path.
+    """
+    if not isinstance(object_id, str) or not object_id:
+        return "object_id: must be a non-empty string"
+    if not isinstance(ts, datetime) or ts.tzinfo is None:
+        return "ts: must be timezone-aware (UTC)"
+    for name, value, low, high in (("lat", lat, -90, 90), ("lon", lon, -180, 180), ("confidence", confidence, 0, 1),
+                                   ("speed_mps", speed_mps, 0, None), ("heading_deg", heading_deg, 0, 360),
+                                   ("battery_pct", battery_pct, 0, 100), ("alt_m", alt_m, None, None)):
+        if value is None and name in ("battery_pct", "alt_m"):
+            continue
+        if not isinstance(value, (int, float)):
+            return f"{name}: must be a number"
+        if not ((low is None or value >= low) and (high is None or value <= high)):
+            return f"{name}: must be >= {low}" if high is None else f"{name}: must be between {low} and {high}"
+    return f"category: must be one of {', '.join(CATEGORIES[1:])}"
+
+# Timestamps are parsed as the JSON models parse them (ISO 8601 with "Z",
+# Unix seconds or milliseconds, ...) whatever the Python version
+_DATETIME = TypeAdapter(datetime)
+
+def _timestamp(value) -> datetime:
+    return _DATETIME.validate_python(value)
+
+def _micros(value) -> datetime:
+    if isinstance(value, int) and not isinstance(value, bool):
+        return EPOCH + timedelta(microseconds=value)
+    return value
+
+# --- Decoders ---
+# Each returns (points, errors) where errors are (index, message) for records
+# that failed validation; a body that cannot be split into records at all
+# raises ValueError.
+
+def decode_binary(body: bytes) -> Tuple[List[FlatPoint], List[Tuple[int, str]]]:
+    points: List[FlatPoint] = []
+    errors: List[Tuple[int, str]] = []
+    unpack_length, unpack_record, record_size = _ID_LENGTH.unpack_from, _RECORD.unpack_from, _RECORD.size
+    offset, end, index = 0, len(body), 0
+    while offset < end:
+        if offset + _ID_LENGTH.size > end:
+            raise ValueError(f"Truncated record {index} at byte {offset}")
+        (length,) = unpack_length(body, offset)
+        offset += _ID_LENGTH.size
+        if offset + length + record_size > end:
+            raise ValueError(f"Truncated record {index} at byte {offset - _ID_LENGTH.size}")
+        object_id = body[offset:offset + length]
+        ts, lat, lon, alt_m, confidence, speed, heading, battery, code = unpack_record(body, offset + length)
+        offset += length + record_size
+        try:
+            if code >= len(CATEGORIES):
+                raise ValueError(f"category: unknown code {code}")
+            points.append(checked(
+                object_id.decode("utf-8"), EPOCH + timedelta(microseconds=ts), lat, lon,
+                None if math.isnan(alt_m) else alt_m, confidence, speed, heading,
+                None if math.isnan(battery) else battery, CATEGORIES[code],
+            ))
+        except (ValueError, OverflowError) as e:
+            errors.append((index, str(e)))
+        index += 1
+    return points, errors
+
+def encode_binary(points: Iterable[FlatPoint]) -> bytes:
+    """
+    Inverse of decode_binary, for clients, tests and benchmarks.
+    """
+    nan = float("nan")
+    chunks = []
+    for point in points:
+        object_id = point.object_id.encode("utf-8")
+        micros = (point.ts - EPOCH) // timedelta(microseconds=1)
+        chunks.append(_ID_LENGTH.pack(len(object_id)) + object_id + _RECORD.pack(
+            micros, point.lat, point.lon, nan if point.alt_m is None else point.alt_m, point.confidence,
+            point.speed_mps, point.heading_deg, nan if point.battery_pct is None else point.battery_pct,
+            CATEGORY_CODES[point.category],
+        ))
+    return b"".join(chunks)
+
+def decode_msgpack(body: bytes) -> Tuple[List[FlatPoint], List[Tuple[int, str]]]:
+    """
+    A MessagePack array of records, each an array in binary-record order:
+    [object_id, ts, lat, lon, alt_m, confidence, speed_mps, heading_deg,
+    battery_pct, category]. ts is integer microseconds since the Unix epoch
+    or a MessagePack timestamp; alt_m, battery_pct and category may be nil
+    and trailing nils may be left out. category is the name or the code.
+    """
+    if msgpack is None:
+        raise ImportError("MessagePack bodies need the optional msgpack package")
+    try:
+        records = msgpack.unpackb(body, raw=False, timestamp=3)
+    except Exception as e:
+        raise ValueError(f"Invalid MessagePack body: {e}")
+    if not isinstance(records, list):
+        raise ValueError("Expected a MessagePack array of records")
+    points: List[FlatPoint] = []
+    errors: List[Tuple[int, str]] = []
+    for index, record in enumerate(records):
+        try:
+            if not isinstance(record, list) or not 8 <= len(record) <= 10:
+                raise ValueError("record: expected an array of 8 to 10 fields")
+            object_id, ts, lat, lon, alt_m, confidence, speed, heading, *rest = record
+            battery = rest[0] if rest else None
+            category = rest[1] if len(rest) > 1 else None
+            if isinstance(category, int) and not isinstance(category, bool):
+                category = CATEGORIES[category] if 0 <= category < len(CATEGORIES) else f"code {category}"
+            points.append(checked(object_id, _micros(ts), lat, lon, alt_m, confidence, speed, heading,
+                                  battery, category))
+        except (ValueError, OverflowError) as e:
+            errors.append((index, str(e)))
+    return points, errors
+
+def decode_ndjson(body: bytes) -> Tuple[List[FlatPoint], List[Tuple[int, str]]]:
+    """
+    One JSON point per line in the same nested shape as the JSON endpoints,
+    flattened by hand instead of through the pydantic models. A record the
+    fast path does not take as it is (e.g. numbers sent as strings) goes
+    through TelemetryPoint instead, so every record gets the same verdict
+    as it would from /batch.
+    """
+    lines = [line for line in body.splitlines() if line.strip()]
+    try:
+        # One parse of the whole stream is far cheaper than one per line
+        items = from_json(b"[" + b",".join(lines) + b"]")
+    except ValueError:
+        for line_no, line in enumerate(body.splitlines(), start=1):
+            try:
+                json.loads(line) if line.strip() else None
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {line_no}: {e.msg}")
+        raise ValueError("Invalid NDJSON body")
+    points: List[FlatPoint] = []
+    errors: List[Tuple[int, str]] = []
+    for index, item in enumerate(items):
+        try:
+            points.append(_flat_json(item))
+        except (KeyError, TypeError, AttributeError, ValueError, OverflowError):
+            try:
+                points.append(FlatPoint.from_model(TelemetryPoint.model_validate(item)))
+            except ValidationError as e:
+                error = e.errors(include_url=False)[0]
+                errors.append((index, f"{'.'.join(map(str, error['loc'])) or 'point'}: {error['msg']}"))
+    return points, errors
+
+def _flat_json(item) -> FlatPoint:
+    """
+    The fast path for one NDJSON record. Fields ingest does not use
+    (rssi_dbm, source, meta, class_confidence) are only checked as far as
+    needed to refuse what the model would refuse; anything unusual raises
+    and is left to the model.
+    """
+    position, telemetry, inference = item["position"], item["telemetry"], item.get("inference")
+    category = None
+    if inference is not None:
+        category = inference["category"]
+        if not 0 <= inference["class_confidence"] <= 1:
+            raise ValueError("inference.class_confidence")
+    rssi, source, meta = telemetry.get("rssi_dbm"), telemetry.get("source"), item.get("meta")
+    if ((rssi is not None and not isinstance(rssi, (int, float))) or (source is not None and type(source) is not str)
+            or (meta is not None and type(meta) is not dict)):
+        raise TypeError("unusual optional field")
+    return checked(
+        item["object_id"], _timestamp(item["ts"]), position["lat"], position["lon"], position.get("alt_m"),
+        item["confidence"], telemetry["speed_mps"], telemetry["heading_deg"], telemetry.get("battery_pct"), category,
+    )
+
+DECODERS = {BINARY_CONTENT_TYPE: decode_binary}
+DECODERS.update((content_type, decode_msgpack) for content_type in MSGPACK_CONTENT_TYPES)
+DECODERS.update((content_type, decode_ndjson) for content_type in NDJSON_CONTENT_TYPES)
@@ -0,0 +1,51 @@
+from typing import List, Sequence
+import numpy as np
+
+def lttb_indices(xs: Sequence[float], ys: Sequence[float], max_points: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling of a 2D polyline.
+
+    Returns the sorted indices of at most `max_points` vertices to keep. The
+    first and last vertices are always kept; every bucket in between keeps
+    the vertex forming the largest triangle with the previously kept vertex
+    and the centroid of the next bucket. Run on (lon, lat) this keeps the
+    corners of a track rather than its most extreme values over time.
+    """
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    n = xs.size
+    if max_points >= n or n <= 2:
+        return np.arange(n)
+    if max_points < 3:
+        return np.array([0, n - 1])
+
+    # Interior vertices split into max_points - 2 buckets
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    prev = 0
+    for b in range(max_points - 2):
+        lo, hi = edges[b], max(edges[b + 1], edges[b] + 1)
+        if b + 1 < max_points - 2:
+            next_lo, next_hi = edges[b + 1], max(edges[b + 2], edges[b + 1] + 1)
+            cx, cy = xs[next_lo:next_hi].mean(), ys[next_lo:next_hi].mean()
+        else:
+            cx, cy = xs[-1], ys[-1]
+        ax, ay = xs[prev], ys[prev]
+        # Twice the triangle area; the constant factor does not change the argmax
+        areas = np.abs((ax - cx) * (ys[lo:hi] - ay) - (ax - xs[lo:hi]) * (cy - ay))
+        prev = lo + int(np.argmax(areas))
+        keep[b + 1] = prev
+    return keep
+
+def downsample_track(records: List, max_points: int, lat_attr: str = "lat", lon_attr: str = "lon") -> List:
+    """
+    Reduce a time-ordered list of records to at most `max_points` while
+    preserving the shape of the track.
+    """
+    if len(records) <= max_points:
+        return records
+    xs = [getattr(r, lon_attr) for r in records]
+    ys = [getattr(r, lat_attr) for r in records]
+    return [records[i] for i in lttb_indices(xs, ys, max_points)]
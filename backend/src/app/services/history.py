@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+import numpy as np
+from sqlalchemy import or_, select
+from sqlmodel import Session
+from src.app.db.models import TelemetryRecord, TelemetryRollup
+from src.app.services import archive as archive_module
+from src.app.services import retention as retention_module
+from src.app.services.archive import COLUMNS, from_us, to_us
+from src.app.services.retention import ROLLUP_FIELDS
+
+def _naive_utc(ts: datetime) -> datetime:
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+def history_records(session: Session, object_id: str, start: Optional[datetime], end: Optional[datetime],
+                    limit: Optional[int], now: Optional[datetime] = None) -> List[TelemetryRecord]:
+    """
+    History for one object in [start, end], newest first, at the finest
+    resolution still kept for each part of the range.
+
+    Recent data comes from the raw table. Older data comes from the
+    columnar archive where it covers the range, and from the rolled-up
+    retention tiers elsewhere. Archived and rolled-up points are returned
+    as TelemetryRecord without an id. Neither is queried for ranges that
+    start inside the raw window.
+    """
+    start = _naive_utc(start) if start is not None else None
+    end = _naive_utc(end) if end is not None else None
+
+    def bounded(model, statement):
+        statement = statement.where(model.object_id == object_id)
+        if start is not None:
+            statement = statement.where(model.ts >= start)
+        if end is not None:
+            statement = statement.where(model.ts <= end)
+        statement = statement.order_by(model.ts.desc())
+        return statement.limit(limit) if limit is not None else statement
+
+    records = list(session.execute(bounded(TelemetryRecord, select(TelemetryRecord))).scalars())
+    now = _naive_utc(now or datetime.now(timezone.utc))
+    raw_from = now - timedelta(days=retention_module.retention.raw_days)
+    if start is not None and start >= raw_from:
+        return records
+    if limit is not None and len(records) == limit and records[-1].ts >= raw_from:
+        # Everything archived or rolled up is older than the oldest one we already have
+        return records
+
+    older = []
+    rollups = bounded(TelemetryRollup, select(TelemetryRollup))
+    covered = archive_module.archive.coverage(session)
+    if covered is not None:
+        columns = archive_module.archive.read(session, object_id, start, end)
+        lo = max(0, len(columns["ts"]) - limit) if limit is not None else 0
+        ts = columns["ts"][lo:]
+        # Raw rows are only deleted once retention gets to them
+        keep = ~np.isin(ts, [to_us(r.ts) for r in records])
+        times = from_us(ts[keep])
+        values = {name: _as_optional(columns[name][lo:][keep]) for name, _ in COLUMNS if name != "ts"}
+        older.extend(
+            TelemetryRecord(object_id=object_id, ts=t, **{name: values[name][i] for name in values})
+            for i, t in enumerate(times)
+        )
+        rollups = rollups.where(or_(TelemetryRollup.ts < covered[0], TelemetryRollup.ts >= covered[1]))
+
+    older.extend(
+        TelemetryRecord(object_id=r.object_id, ts=r.ts, **{name: getattr(r, name) for name in ROLLUP_FIELDS})
+        for r in session.execute(rollups).scalars()
+    )
+    records.extend(older)
+    records.sort(key=lambda r: r.ts, reverse=True)
+    return records[:limit] if limit is not None else records
+
+def _as_optional(column: np.ndarray) -> list:
+    # NaN marks a missing optional value in the archive
+    return [None if v != v else v for v in column.tolist()]
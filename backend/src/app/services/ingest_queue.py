@@ -0,0 +1,163 @@
+import queue
+import threading
+import time
+from typing import List, Optional, Union
+from sqlmodel import Session
+from src.app.db.models import TelemetryPoint
+from src.app.services import metrics
+from src.app.services.codec import FlatPoint
+from src.app.services.sharding import ingest
+
+class IngestQueue:
+    """
+    Bounded queue between the telemetry endpoint and a background worker.
+
+    The endpoint only validates and enqueues; the worker drains the queue in
+    micro-batches of up to `batch_max` points and ingests them the same way
+    as the synchronous endpoints (sharding.ingest). When the queue is full,
+    `offer` refuses the point so the endpoint can push back instead of
+    buffering without limit. A batch that cannot be stored is dropped, not
+    retried, and its points are counted in `failed` and the
+    points_rejected metric.
+    """
+
+    def __init__(self, max_size: int, batch_max: int):
+        self.max_size = max_size
+        self.batch_max = batch_max
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_size)
+        self._stop = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self.enqueued = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_lag_s = 0.0
+        self.max_lag_s = 0.0
+        self._rate_window_start = time.monotonic()
+        self._rate_window_count = 0
+        self.drain_rate = 0.0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None
+
+    def offer(self, point: Union[TelemetryPoint, FlatPoint]) -> bool:
+        """
+        Enqueue a validated point. Returns False if the queue is full.
+        """
+        try:
+            self._queue.put_nowait((time.monotonic(), point))
+        except queue.Full:
+            with self._stats_lock:
+                self.rejected += 1
+            return False
+        with self._stats_lock:
+            self.enqueued += 1
+        return True
+
+    def start(self, engine):
+        if self._worker is not None:
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run, args=(engine,), name="ingest-worker", daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        """
+        Stop the worker after it has drained everything already queued.
+        """
+        if self._worker is None:
+            return
+        self._stop.set()
+        self._worker.join()
+        self._worker = None
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "enabled": self.running,
+                "depth": self.depth,
+                "capacity": self.max_size,
+                "enqueued": self.enqueued,
+                "rejected": self.rejected,
+                "processed": self.processed,
+                "failed": self.failed,
+                "batches": self.batches,
+                "drain_rate_pps": round(self.drain_rate, 1),
+                "last_lag_s": round(self.last_lag_s, 4),
+                "max_lag_s": round(self.max_lag_s, 4),
+            }
+
+    def _take_batch(self) -> List[tuple]:
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_max:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, engine):
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                if self._stop.is_set():
+                    return
+                continue
+            ok = True
+            points = [point for _, point in batch]
+            try:
+                with Session(engine) as session:
+                    ingest(points, session)
+            except Exception as e:
+                ok = False
+                metrics.points_rejected.inc(len(batch))
+                print(f"Ingest batch of {len(batch)} failed: {e}")
+            self._record(batch, ok)
+
+    def _record(self, batch: List[tuple], ok: bool):
+        now = time.monotonic()
+        lag = now - batch[0][0]  # oldest point in the batch
+        with self._stats_lock:
+            self.batches += 1
+            if ok:
+                self.processed += len(batch)
+            else:
+                self.failed += len(batch)
+            self.last_lag_s = lag
+            self.max_lag_s = max(self.max_lag_s, lag)
+            self._rate_window_count += len(batch)
+            elapsed = now - self._rate_window_start
+            if elapsed >= 1.0:
+                self.drain_rate = self._rate_window_count / elapsed
+                self._rate_window_start = now
+                self._rate_window_count = 0
+
+ingest_queue: Optional[IngestQueue] = None
+
+def get_ingest_queue() -> Optional[IngestQueue]:
+    """
+    The running ingest queue, or None when synchronous ingest is configured.
+    """
+    return ingest_queue
+
+def start_ingest_queue(engine, max_size: int, batch_max: int) -> IngestQueue:
+    global ingest_queue
+    ingest_queue = IngestQueue(max_size, batch_max)
+    ingest_queue.start(engine)
+    return ingest_queue
+
+def stop_ingest_queue():
+    global ingest_queue
+    if ingest_queue is not None:
+        ingest_queue.stop()
+        ingest_queue = None
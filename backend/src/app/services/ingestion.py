@@ -1,120 +1,518 @@
+import logging
+from collections import defaultdict
+from concurrent.futures import Future
 from datetime import datetime, timezone
-from typing import List, Optional
-from sqlmodel import Session, select
-from src.app.db.models import TelemetryPoint, TrackedObject, Zone, TelemetryRecord, ObjectZoneState, AlertEvent, AlertType
-from src.app.services.zone_eval import is_point_in_zone
+from typing import Dict, List, Optional, Tuple, Union
+from sqlalchemy import insert, select, update
+from sqlmodel import Session
+from src.app.config import settings
+from src.app.db.session import after_commit, after_rollback, run_after_commit, run_after_rollback
+from src.app.db.models import TelemetryPoint, TelemetryRecord, AlertEvent, AlertType
+from src.app.services import metrics
+from src.app.services.alert_policy import alert_suppressor
+from src.app.services.codec import FlatPoint
+from src.app.services.staleness import stale_monitor
+from src.app.services.state_store import ObjectState, ZoneState, state_store
+from src.app.services.stream import stream_hub
+from src.app.services.trails import trail_buffer
+from src.app.services.zone_eval import CompiledZone
+from src.app.services.zone_registry import ZoneSnapshot, zone_registry
 
 # Thresholds
 CONFIDENCE_THRESHOLD = 0.5
 
-def process_telemetry(point: TelemetryPoint, session: Session):
+# Written off the ingest path by the QueueListener set up in alert_log
+alert_log = logging.getLogger("geofence.alerts")
+
+def process_telemetry(point: TelemetryPoint, session: Session, commit: bool = True):
     """
     Ingest a telemetry point:
-    1. Update/Create TrackedObject in DB
+    1. Update/Create the object's state
     2. Check Zone Rules and detect Transitions
     3. Log Alerts to DB
     """
-    
-    # 1. Update Object State
-    statement = select(TrackedObject).where(TrackedObject.id == point.object_id)
-    obj = session.exec(statement).first()
-    
-    if not obj:
-        obj = TrackedObject(
-            id=point.object_id,
-            last_seen=point.ts,
-            last_lat=point.position.lat,
-            last_lon=point.position.lon,
-            last_confidence=point.confidence
-        )
-    else:
-        last_seen_aware = obj.last_seen
-        if last_seen_aware.tzinfo is None:
-            last_seen_aware = last_seen_aware.replace(tzinfo=timezone.utc)
-
-        if point.ts >= last_seen_aware:
-            obj.last_seen = point.ts
-            obj.last_lat = point.position.lat
-            obj.last_lon = point.position.lon
-            obj.last_confidence = point.confidence
-            
-    obj.speed_mps = point.telemetry.speed_mps
-    obj.heading_deg = point.telemetry.heading_deg
-    obj.battery_pct = point.telemetry.battery_pct
-    
-    session.add(obj)
-
-    # history record
-    record = TelemetryRecord(
-        object_id=point.object_id,
-        ts=point.ts,
-        lat=point.position.lat,
-        lon=point.position.lon,
-        alt_m=point.position.alt_m,
-        speed_mps=point.telemetry.speed_mps,
-        heading_deg=point.telemetry.heading_deg,
-        battery_pct=point.telemetry.battery_pct
-    )
-    session.add(record)
-    
-    # 2. Check Zones
-    zones = session.exec(select(Zone).where(Zone.enabled == True)).all()
-    
-    for zone in zones:
-        is_now_inside = is_point_in_zone(point, zone)
-        
-        # Get existing state
-        state_stmt = select(ObjectZoneState).where(
-            ObjectZoneState.object_id == point.object_id,
-            ObjectZoneState.zone_id == zone.id
-        )
-        state = session.exec(state_stmt).first()
-        
-        if not state:
-            state = ObjectZoneState(
-                object_id=point.object_id,
-                zone_id=zone.id,
-                is_inside=is_now_inside,
-                last_updated=point.ts
-            )
-            session.add(state)
-            # If it's the first time and it's inside, trigger an ENTER alert
-            if is_now_inside:
-                trigger_alert(session, point.object_id, zone.id, AlertType.ENTER, f"Object {point.object_id} entered zone {zone.name}")
-        else:
-            # Transitions
-            if is_now_inside and not state.is_inside:
-                trigger_alert(session, point.object_id, zone.id, AlertType.ENTER, f"Object {point.object_id} entered zone {zone.name}")
-            elif not is_now_inside and state.is_inside:
-                trigger_alert(session, point.object_id, zone.id, AlertType.EXIT, f"Object {point.object_id} exited zone {zone.name}")
-            
-            # Low Confidence Alert (while inside)
-            if is_now_inside and point.confidence < CONFIDENCE_THRESHOLD:
-                # To prevent alert spam, we could check last alert TS, 
-                # but for MVP we'll just trigger if it's a significant drop or always
-                # Let's check if the previous point was high confidence to avoid spamming every second
-                trigger_alert(session, point.object_id, zone.id, AlertType.LOW_CONFIDENCE, 
-                              f"Object {point.object_id} confidence dropped to {point.confidence:.2f} inside {zone.name}")
-
-            state.is_inside = is_now_inside
-            state.last_updated = point.ts
-            session.add(state)
-            
-    session.commit()
-    session.refresh(obj)
-    return obj
+    objects = process_batch([point], session, commit=commit)
+    return objects[point.object_id]
+
+def process_batch(points: List[Union[TelemetryPoint, FlatPoint]], session: Session,
+                  commit: bool = True) -> Dict[str, ObjectState]:
+    """
+    Ingest a batch of telemetry points in a single transaction.
+
+    Points are grouped by object_id and applied in timestamp order per object,
+    so transitions are detected exactly as if the points had been posted one
+    at a time. Object and zone state live in the in-memory state store and
+    zones come from the compiled zone registry, so nothing is read from the
+    database; history records and alerts are written with bulk inserts before
+    a single commit, and state rows are flushed write-behind. Pass
+    commit=False when the caller (e.g. the group-commit writer) commits.
+
+    Points may be TelemetryPoint models or FlatPoint records from the fast
+    ingest codecs; models are flattened first.
+
+    Each point is only tested against zones whose bounding box contains it
+    plus the zones the object is currently inside. Zone state is only kept
+    for zones an object has actually been a candidate for; a missing entry
+    for a known object means "outside".
+
+    With settings.segment_crossings_enabled the path from an object's
+    previous position to each new point is tested instead, against the
+    zones whose bbox meets the path's envelope, so a zone crossed between
+    reports still raises an ENTER/EXIT pair at the interpolated times.
+
+    If the batch's write or commit fails, the in-memory object, zone and
+    alert suppression state it changed is put back (see BatchUndo).
+    """
+    if not points:
+        return {}
+
+    clock = metrics.StageClock()
+    state_store.ensure_loaded(session)
+    # One consistent zone set for the whole batch
+    zones = zone_registry.snapshot(session)
+    clock.lap("lookup")
+    result = evaluate_batch(points, zones, clock)
+    with state_store.lock:
+        rearm_stale(result.touched, zones)
+    clock.lap("stale")
+    write_batch(result, session, commit, clock)
+    return result.touched
+
+def evaluate_and_submit(points: List[Union[TelemetryPoint, FlatPoint]], session: Session,
+                        writer) -> Tuple[Dict[str, ObjectState], Future]:
+    """
+    process_batch for callers outside the group-commit writer: zones are
+    evaluated on the calling thread and only the writes are queued on
+    `writer`, so the writer thread never evaluates zones and one request
+    evaluates while earlier ones commit. Returns the touched objects and
+    the writer's future, which resolves once the batch is committed.
+    """
+    if not points:
+        done: Future = Future()
+        done.set_result(None)
+        return {}, done
+
+    clock = metrics.StageClock()
+    state_store.ensure_loaded(session)
+    zones = zone_registry.snapshot(session)
+    clock.lap("lookup")
+    # Queue the write before releasing the lock, so the writer runs batches
+    # in the order they were evaluated
+    with state_store.lock:
+        result = evaluate_batch(points, zones, clock)
+        rearm_stale(result.touched, zones)
+        clock.lap("stale")
+        committed = writer.submit(lambda s: _write_queued(result, s, clock))
+    return result.touched, committed
+
+class BatchUndo:
+    """
+    The in-memory state a batch changed, as it was before, so it can be put
+    back if the batch's write or commit fails.
+
+    Until then the batch holds its objects in the state store, so flushes
+    do not persist their state ahead of the rows it came from. An object a
+    later batch has changed since keeps that batch's state.
+    """
+    __slots__ = ("zones", "objects", "zone_states", "seqs", "updates")
+
+    def __init__(self, zones: ZoneSnapshot):
+        self.zones = zones
+        # object_id -> copy of its state before the batch, None if it is new
+        self.objects: Dict[str, Optional[ObjectState]] = {}
+        # (object_id, zone_id) -> (copy of its zone state or None, alert_suppressor.save())
+        self.zone_states: Dict[Tuple[str, int], Tuple[Optional[ZoneState], tuple]] = {}
+        self.seqs: Dict[str, Optional[int]] = {}
+        self.updates: List[dict] = []
+
+    def save_object(self, object_id: str, obj: Optional[ObjectState]):
+        if object_id not in self.objects:
+            self.objects[object_id] = None if obj is None else ObjectState(**obj.to_row())
+
+    def save_zone(self, object_id: str, zone_id: int, state: Optional[ZoneState]):
+        key = (object_id, zone_id)
+        if key not in self.zone_states:
+            prior = None if state is None else ZoneState(**state.to_row())
+            self.zone_states[key] = (prior, alert_suppressor.save(object_id, zone_id))
+
+    def settle(self, updates: List[dict]):
+        """
+        End of evaluation (under state_store.lock): hold the objects.
+        """
+        self.seqs = {object_id: state_store.change_seq(object_id) for object_id in self.objects}
+        self.updates = updates
+        state_store.hold(self.objects)
+
+    def committed(self):
+        state_store.release(self.objects)
+
+    def rollback(self):
+        by_object: Dict[str, List[Tuple[int, Optional[ZoneState], tuple]]] = defaultdict(list)
+        for (object_id, zone_id), (prior, saved) in self.zone_states.items():
+            by_object[object_id].append((zone_id, prior, saved))
+        restored: Dict[str, ObjectState] = {}
+        with state_store.lock:
+            alert_suppressor.requeue(self.updates)
+            for object_id, prior in self.objects.items():
+                if state_store.change_seq(object_id) != self.seqs[object_id]:
+                    continue
+                for zone_id, zone_prior, saved in by_object[object_id]:
+                    state_store.restore_zone_state(object_id, zone_id, zone_prior)
+                    alert_suppressor.restore(object_id, zone_id, saved)
+                state_store.restore_object(object_id, prior)
+                if prior is None:
+                    stale_monitor.forget(object_id)
+                else:
+                    restored[object_id] = prior
+            rearm_stale(restored, self.zones)
+            state_store.release(self.objects)
+
+class BatchResult:
+    """
+    Everything evaluating a batch produced, before any of it is written:
+    history rows, new alert rows, occurrence updates for stored alerts, the
+    objects the batch touched, the zones tested per point and how to undo
+    it in this process's state store.
+    """
+    __slots__ = ("records", "alerts", "alert_updates", "touched", "zones_per_point", "undo")
+
+    def __init__(self, records: List[dict], alerts: List[dict], alert_updates: List[dict],
+                 touched: Dict[str, ObjectState], zones_per_point: List[int], undo: Optional[BatchUndo] = None):
+        self.records = records
+        self.alerts = alerts
+        self.alert_updates = alert_updates
+        self.touched = touched
+        self.zones_per_point = zones_per_point
+        self.undo = undo
+
+def evaluate_batch(points: List[Union[TelemetryPoint, FlatPoint]], zones: ZoneSnapshot,
+                   clock: metrics.StageClock) -> BatchResult:
+    """
+    Apply `points` to the state store and detect zone transitions against
+    `zones`, without touching the database. Runs in-process from
+    process_batch, or in an ingest shard's worker process on that shard's
+    own state, which keeps the BatchUndo until the coordinator reports
+    whether the round was stored.
+    """
+    by_object: Dict[str, List[FlatPoint]] = defaultdict(list)
+    for point in points:
+        if not isinstance(point, FlatPoint):
+            point = FlatPoint.from_model(point)
+        by_object[point.object_id].append(point)
+    for group in by_object.values():
+        group.sort(key=lambda p: p.ts)
+
+    records: List[dict] = []
+    alerts: List[dict] = []
+    touched: Dict[str, ObjectState] = {}
+    zones_per_point: List[int] = []
+    hysteresis = alert_suppressor.hysteresis_s > 0
+    segments = settings.segment_crossings_enabled
+    undo = BatchUndo(zones)
+
+    with state_store.lock:
+        for object_id, group in by_object.items():
+            for point in group:
+                # 1. Update Object State
+                obj = state_store.objects.get(object_id)
+                is_new_object = obj is None
+                undo.save_object(object_id, obj)
+                # (lat, lon, ts) of the previous report, for segment crossings
+                segment: Optional[Tuple[float, float, datetime]] = None
+                if not obj:
+                    obj = ObjectState(
+                        id=point.object_id,
+                        last_seen=point.ts,
+                        last_lat=point.lat,
+                        last_lon=point.lon,
+                        last_confidence=point.confidence
+                    )
+                    state_store.put_object(obj)
+                elif point.ts >= obj.last_seen:
+                    if segments and (obj.last_lat, obj.last_lon) != (point.lat, point.lon):
+                        segment = (obj.last_lat, obj.last_lon, obj.last_seen)
+                    obj.last_seen = point.ts
+                    obj.last_lat = point.lat
+                    obj.last_lon = point.lon
+                    obj.last_confidence = point.confidence
+
+                obj.speed_mps = point.speed_mps
+                obj.heading_deg = point.heading_deg
+                obj.battery_pct = point.battery_pct
+                if point.category is not None:
+                    obj.category = point.category
+                state_store.mark_object_dirty(object_id)
+                touched[object_id] = obj
+
+                # history record
+                records.append(dict(
+                    object_id=point.object_id,
+                    ts=point.ts,
+                    lat=point.lat,
+                    lon=point.lon,
+                    alt_m=point.alt_m,
+                    speed_mps=point.speed_mps,
+                    heading_deg=point.heading_deg,
+                    battery_pct=point.battery_pct
+                ))
+                clock.lap("state")
+
+                # 2. Check Zones
+                # Only zones whose bbox contains the point can be entered, and only
+                # zones the object is currently inside can be exited.
+                lat, lon = point.lat, point.lon
+                also = state_store.inside.get(object_id, ())
+                if hysteresis and alert_suppressor.pending_zones(object_id):
+                    also = set(also) | alert_suppressor.pending_zones(object_id)
+                if segment is None:
+                    candidates = zones.candidates(lat, lon, also=also)
+                else:
+                    candidates = zones.segment_candidates(segment[0], segment[1], lat, lon, also=also)
+                evaluated = 0
+                for zone in candidates:
+                    evaluated += 1
+                    is_now_inside = zone.contains(lat, lon)
+                    state = state_store.zone_states.get((object_id, zone.id))
+                    undo.save_zone(object_id, zone.id, state)
+
+                    if not state and is_new_object:
+                        # If it's the first time and it's inside, trigger an ENTER alert
+                        if is_now_inside:
+                            _raise(alerts, point, zone.id, AlertType.ENTER, f"Object {point.object_id} entered zone {zone.name}")
+                        state_store.set_zone_state(object_id, zone.id, is_now_inside, point.ts)
+                        continue
+
+                    # A known object that has never been inside this zone was outside it
+                    was_inside = state.is_inside if state else False
+
+                    # Crossings between the previous report and this one
+                    crossed_ts = None
+                    if segment is not None:
+                        crossed_ts = _raise_crossings(alerts, point, zone, segment, was_inside, is_now_inside)
+
+                    # A crossing only counts once it has held for the hysteresis period
+                    if is_now_inside != was_inside:
+                        if not alert_suppressor.confirm(object_id, zone.id, is_now_inside, point.ts):
+                            is_now_inside = was_inside
+                    elif hysteresis:
+                        alert_suppressor.hold(object_id, zone.id)
+
+                    # Transitions
+                    if is_now_inside and not was_inside:
+                        _raise(alerts, point, zone.id, AlertType.ENTER, f"Object {point.object_id} entered zone {zone.name}",
+                               ts=crossed_ts)
+                    elif not is_now_inside and was_inside:
+                        _raise(alerts, point, zone.id, AlertType.EXIT, f"Object {point.object_id} exited zone {zone.name}",
+                               ts=crossed_ts)
+
+                    # Low Confidence Alert (while inside); repeats within the
+                    # cooldown are coalesced into one alert
+                    if is_now_inside and point.confidence < CONFIDENCE_THRESHOLD:
+                        _raise(alerts, point, zone.id, AlertType.LOW_CONFIDENCE,
+                               f"Object {point.object_id} confidence dropped to {point.confidence:.2f} inside {zone.name}")
+
+                    state_store.set_zone_state(object_id, zone.id, is_now_inside, point.ts)
+                zones_per_point.append(evaluated)
+                clock.lap("zones")
+
+        alert_updates = alert_suppressor.take_updates()
+        undo.settle(alert_updates)
+    return BatchResult(records, alerts, alert_updates, touched, zones_per_point, undo)
+
+def rearm_stale(touched: Dict[str, ObjectState], zones: ZoneSnapshot):
+    """
+    Re-arm stale detection with each touched object's latest report.
+    Callers hold state_store.lock.
+    """
+    for object_id, obj in touched.items():
+        inside = [zones.by_id[zone_id] for zone_id in state_store.inside.get(object_id, ()) if zone_id in zones.by_id]
+        stale_monitor.touch(object_id, obj.last_seen, *stale_monitor.timeout_for(obj.category, inside))
+
+def write_batch(result: BatchResult, session: Session, commit: bool = True,
+                clock: Optional[metrics.StageClock] = None):
+    """
+    Bulk write history and alerts, then commit once for the whole batch
+    (or leave the commit to the caller with commit=False). New alert rows
+    get their ids filled in.
+
+    A later batch may be evaluated while this one is being written and fold
+    repeats into these alert rows before they have ids; those changes are
+    picked up here and written as updates.
+
+    The batch's BatchUndo runs if the write or its commit fails, and its
+    stage timings (up to the commit) are recorded once it is committed,
+    whoever commits.
+    """
+    clock = clock or metrics.StageClock()
+    if result.undo is not None:
+        after_commit(session, result.undo.committed)
+        after_rollback(session, result.undo.rollback)
+    after_commit(session, lambda: _record_committed(clock))
+    if not commit:
+        _write_rows(result, session, clock)
+        return
+    try:
+        _write_rows(result, session, clock)
+        session.commit()
+    except Exception:
+        session.rollback()
+        run_after_rollback(session)
+        raise
+    run_after_commit(session)
+
+def _record_committed(clock: metrics.StageClock):
+    clock.lap("commit")
+    clock.record()
+
+def _write_queued(result: BatchResult, session: Session, clock: metrics.StageClock):
+    clock.lap("queue")
+    write_batch(result, session, commit=False, clock=clock)
+
+def _write_rows(result: BatchResult, session: Session, clock: metrics.StageClock):
+    records, alerts, alert_updates, touched = result.records, result.alerts, result.alert_updates, result.touched
+    updated = []
+    if records:
+        session.execute(insert(TelemetryRecord), records)
+        clock.lap("history_insert")
+    if alerts:
+        inserted = [dict(alert) for alert in alerts]
+        ids = session.execute(
+            insert(AlertEvent).returning(AlertEvent.id, sort_by_parameter_order=True), inserted
+        ).scalars().all()
+        late = []
+        # Under the lock coalescing runs under: once a row has its id,
+        # later repeats go to alert_suppressor.take_updates instead
+        with state_store.lock:
+            for alert, row, alert_id in zip(alerts, inserted, ids):
+                alert["id"] = alert_id
+                if alert["occurrences"] != row["occurrences"] or alert["last_ts"] != row["last_ts"]:
+                    late.append(dict(id=alert_id, occurrences=alert["occurrences"], last_ts=alert["last_ts"]))
+        alert_updates = alert_updates + late
+    if alert_updates:
+        # Occurrences coalesced into alerts stored by earlier batches
+        session.execute(update(AlertEvent), alert_updates)
+        if stream_hub.client_count and result.alert_updates:
+            # Whole rows for stream clients; this batch's own rows go out as inserts
+            table = AlertEvent.__table__
+            ids = [row["id"] for row in result.alert_updates]
+            updated = [dict(row) for row in session.execute(select(table).where(table.c.id.in_(ids))).mappings()]
+    if alerts or alert_updates:
+        clock.lap("alert_insert")
+    after_commit(session, lambda: _publish(records, touched, alerts, updated))
+    metrics.zones_per_point.observe_many(result.zones_per_point)
+    metrics.zones_evaluated.inc(sum(result.zones_per_point))
+
+def _publish(records: List[dict], touched: Dict[str, ObjectState], alerts: List[dict],
+             updated_alerts: List[dict] = ()):
+    """
+    Hand committed results to the in-memory readers and count them.
+    """
+    metrics.points_ingested.inc(len(records))
+    for alert in alerts:
+        _log_alert(alert["message"], alert["alert_type"])
+    if trail_buffer.loaded:
+        trail_buffer.append(records)
+    stream_hub.publish(touched.values(), alerts, updated_alerts)
+    if state_store.dirty_count >= settings.state_flush_max_dirty:
+        state_store.request_flush()
+
+def _log_alert(message: str, alert_type: AlertType):
+    metrics.alerts_raised.inc(1, alert_type.value)
+    alert_log.info("ALERT: %s (%s)", message, alert_type.value)
 
 def trigger_alert(session: Session, object_id: str, zone_id: int, alert_type: AlertType, message: str):
     """
     Create an AlertEvent in the database.
     """
-    # Optional: Deduplication logic here
-    alert = AlertEvent(
+    alert = AlertEvent(**_alert_row(object_id, zone_id, alert_type, message))
+    session.add(alert)
+    after_commit(session, lambda: _log_alert(message, alert_type))
+
+def _raise_crossings(alerts: List[dict], point: FlatPoint, zone: CompiledZone,
+                     segment: Tuple[float, float, datetime], was_inside: bool, is_now_inside: bool) -> Optional[datetime]:
+    """
+    Raise an ENTER/EXIT pair for every visit to (or excursion from) `zone`
+    between the previous report `segment` and `point`, timed by linear
+    interpolation along the path. With hysteresis, visits shorter than the
+    hysteresis period are ignored.
+
+    Returns the interpolated time of the crossing that leaves the object on
+    the side `is_now_inside` says, if the path crosses the boundary; the
+    caller raises that alert itself.
+    """
+    lat0, lon0, ts0 = segment
+    span = point.ts - ts0
+    # Boundary crossings as (fraction along the path, entering), alternating
+    # from the object's stored side
+    crossings: List[Tuple[float, bool]] = []
+    side = was_inside
+    for start, end in zone.segment_intervals(lat0, lon0, point.lat, point.lon):
+        if start > 0 and not side:
+            crossings.append((start, True))
+            side = True
+        if end < 1 and side:
+            crossings.append((end, False))
+            side = False
+    # Rounding at the end of the path (e.g. a point on the boundary, which
+    # `contains` excludes) can leave a dangling crossing
+    if side != is_now_inside and crossings:
+        crossings.pop()
+    last = None
+    if was_inside != is_now_inside and crossings:
+        last = ts0 + span * crossings.pop()[0]
+
+    # What is left comes in pairs that cancel out
+    for first, second in zip(crossings[::2], crossings[1::2]):
+        if (second[0] - first[0]) * span.total_seconds() < alert_suppressor.hysteresis_s:
+            continue
+        for t, entering in (first, second):
+            if entering:
+                _raise(alerts, point, zone.id, AlertType.ENTER, f"Object {point.object_id} entered zone {zone.name}",
+                       ts=ts0 + span * t)
+            else:
+                _raise(alerts, point, zone.id, AlertType.EXIT, f"Object {point.object_id} exited zone {zone.name}",
+                       ts=ts0 + span * t)
+    return last
+
+def _raise(alerts: List[dict], point: FlatPoint, zone_id: int, alert_type: AlertType, message: str,
+           ts: Optional[datetime] = None):
+    """
+    Add an alert for `point` (at `ts` if given, e.g. an interpolated
+    crossing time), unless the suppression layer folds it into an alert
+    that is still in its cooldown. A crossing alert is stamped with the
+    crossing time, as replay stamps the alerts it rebuilds.
+    """
+    raise_alert(alerts, point.object_id, zone_id, alert_type, message, ts or point.ts, crossing=ts is not None)
+
+def raise_alert(alerts: List[dict], object_id: str, zone_id: Optional[int], alert_type: AlertType, message: str,
+                ts: datetime, crossing: bool = False):
+    """
+    Add an alert row for an event at `ts` to `alerts`, through the same
+    suppression policy as ingest. The row's own ts is the time it is raised,
+    or `ts` itself for a `crossing` timed along the path. Callers hold
+    state_store.lock and write the rows with write_batch.
+    """
+    if alert_suppressor.coalesce(object_id, zone_id, alert_type, ts):
+        return
+    row = _alert_row(object_id, zone_id, alert_type, message, event_ts=ts, ts=ts if crossing else None)
+    alerts.append(row)
+    alert_suppressor.opened(row, ts)
+
+def _alert_row(object_id: str, zone_id: Optional[int], alert_type: AlertType, message: str,
+               event_ts: Optional[datetime] = None, ts: Optional[datetime] = None) -> dict:
+    """
+    Build the column values for an AlertEvent, stamped `ts` or now. It is
+    logged once committed.
+    """
+    ts = ts or datetime.now(timezone.utc)
+    return dict(
         object_id=object_id,
         zone_id=zone_id,
         alert_type=alert_type,
         message=message,
-        ts=datetime.now(timezone.utc)
+        ts=ts,
+        ack=False,
+        occurrences=1,
+        first_ts=event_ts,
+        last_ts=event_ts,
     )
-    session.add(alert)
-    print(f"[{alert.ts}] ALERT: {message} ({alert_type})")
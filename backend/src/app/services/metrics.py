@@ -0,0 +1,217 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; covers a sub-microsecond zone test up to a slow fsync
+LATENCY_BUCKETS = (0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """
+    Monotonic counter, optionally split by label values.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, *label_values: str):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.labels:
+            values = [((), 0)]
+        for label_values, value in values:
+            yield f"{self.name}_total{_labels(self.labels, label_values)} {_number(value)}"
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus sense. `observe_many`
+    takes one lock for a whole batch of observations.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                 labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def _series_for(self, label_values: Tuple[str, ...]) -> list:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        return series
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series_for(label_values)
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def observe_many(self, values: Iterable[float], *label_values: str):
+        buckets = self.buckets
+        with self._lock:
+            series = self._series_for(label_values)
+            counts = series[0]
+            for value in values:
+                counts[bisect_left(buckets, value)] += 1
+                series[1] += value
+                series[2] += 1
+
+    def count(self, *label_values: str) -> int:
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            series = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._series.items())
+        for label_values, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="' + _number(bound) + '"'
+                yield f"{self.name}_bucket{_labels(self.labels, label_values, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, label_values)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labels, label_values)} {count}"
+
+class Gauge:
+    """
+    Value read from a callback at scrape time, so the hot path pays nothing.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, read: Callable[[], Optional[float]]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def samples(self) -> Iterable[str]:
+        value = self.read()
+        if value is not None:
+            yield f"{self.name} {_number(value)}"
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                  labels: Sequence[str] = ()) -> Histogram:
+        return self.register(Histogram(name, help, buckets, labels))
+
+    def gauge(self, name: str, help: str, read: Callable[[], Optional[float]]) -> Gauge:
+        return self.register(Gauge(name, help, read))
+
+    def render(self) -> str:
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in self._metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception as e:
+                print(f"Metric {metric.name} failed: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# --- Ingest hot path ---
+
+ingest_stage_seconds = registry.histogram(
+    "geofence_ingest_stage_seconds", "Time spent in each ingest stage per batch", labels=("stage",))
+points_ingested = registry.counter("geofence_points_ingested", "Telemetry points ingested")
+points_rejected = registry.counter("geofence_points_rejected",
+                                   "Telemetry points that failed validation, or queued points that could not be stored")
+alerts_raised = registry.counter("geofence_alerts", "Alerts raised by type", labels=("type",))
+alerts_suppressed = registry.counter(
+    "geofence_alerts_suppressed", "Alerts folded into an open alert (cooldown) or never raised (hysteresis)",
+    labels=("type", "reason"))
+zones_evaluated = registry.counter("geofence_zones_evaluated", "Point-in-zone tests performed")
+zones_per_point = registry.histogram(
+    "geofence_zones_evaluated_per_point", "Candidate zones tested per ingested point", buckets=COUNT_BUCKETS)
+
+# --- Database writer ---
+
+db_commit_seconds = registry.histogram("geofence_db_commit_seconds", "Group commit duration")
+db_commit_jobs = registry.histogram("geofence_db_commit_jobs", "Jobs per group commit", buckets=COUNT_BUCKETS)
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a block into geofence_ingest_stage_seconds{stage=name}.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        ingest_stage_seconds.observe(time.perf_counter() - started, name)
+
+class StageClock:
+    """
+    Accumulates time per stage across an interleaved loop (e.g. state
+    update and zone evaluation alternate per point) and records one
+    observation per stage at the end, instead of one per point.
+    """
+
+    __slots__ = ("_totals", "_last")
+
+    def __init__(self):
+        self._totals: Dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def lap(self, name: str):
+        now = time.perf_counter()
+        self._totals[name] = self._totals.get(name, 0.0) + now - self._last
+        self._last = now
+
+    def record(self):
+        for name, total in self._totals.items():
+            ingest_stage_seconds.observe(total, name)
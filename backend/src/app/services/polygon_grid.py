@@ -0,0 +1,467 @@
+import hashlib
+import math
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from fractions import Fraction
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import shapely
+from shapely.geometry import Polygon
+
+# Cells whose outline touches no edge are wholly inside or outside. Base
+# cells crossed by more than REFINE_EDGES edges are split again into a
+# SUBDIVISIONS x SUBDIVISIONS grid.
+REFINE_EDGES = 24
+SUBDIVISIONS = 8
+MIN_RESOLUTION = 8
+MAX_RESOLUTION = 512
+
+# Build budget, per polygon edge: edge references binned into cells across
+# all levels, and edge references kept by boundary cells. Polygons whose
+# boundary is too tangled for a grid to help (e.g. long spikes crossing
+# most cells) blow through these early and raise GridTooCostly, so the
+# caller keeps the prepared geometry instead. MAX_DEPTH is the number of
+# grid levels, base grid included.
+MAX_BINNED_EDGES_PER_EDGE = 16
+MAX_STORED_EDGES_PER_EDGE = 8
+MAX_DEPTH = 2
+
+# Cell codes; codes >= 0 index the boundary leaves, codes <= _REFINED
+# index the sub-grids (as _REFINED - code)
+_OUTSIDE = -1
+_INSIDE = -2
+_REFINED = -3
+
+# Shewchuk's error bound for the floating-point orient2d determinant
+_ORIENT_ERROR = (3.0 + 16.0 * 2.0 ** -53) * 2.0 ** -53
+
+Edge = Tuple[float, float, float, float]
+# (vertical, stop, stop_inside, edges); see PolygonGrid
+Leaf = Tuple[bool, float, bool, Tuple[Edge, ...]]
+
+class GridTooCostly(ValueError):
+    """
+    The polygon's grid would exceed its build budget.
+    """
+
+def _orientation(x1: float, y1: float, x2: float, y2: float, x: float, y: float) -> int:
+    """
+    Exact sign of the orientation of (x, y) relative to the segment
+    (x1, y1) -> (x2, y2): 1 to the left, -1 to the right, 0 collinear.
+    """
+    left = (x2 - x1) * (y - y1)
+    right = (y2 - y1) * (x - x1)
+    det = left - right
+    if abs(det) > _ORIENT_ERROR * (abs(left) + abs(right)):
+        return 1 if det > 0 else -1
+    exact = ((Fraction(x2) - Fraction(x1)) * (Fraction(y) - Fraction(y1)) -
+             (Fraction(y2) - Fraction(y1)) * (Fraction(x) - Fraction(x1)))
+    return (exact > 0) - (exact < 0)
+
+def _locate(leaf: Leaf, x: float, y: float) -> bool:
+    """
+    Whether (x, y), which lies in the leaf's cell, is in the polygon's
+    interior.
+
+    This is GEOS's ray-crossing test (the one behind Shapely `contains`)
+    applied to the point and to a reference point q on the same line
+    whose side is known. Every edge that can count differently for the two
+    crosses the segment between them and so is one of the leaf's edges;
+    the others add the same count to both, so the point is inside iff q is
+    and the leaf's edges count an odd number of crossings between them.
+    """
+    vertical, stop, inside, edges = leaf
+    if vertical:
+        x, y = y, x
+    for x1, y1, x2, y2 in edges:
+        if (y1 > y) != (y2 > y):
+            sign = _orientation(x1, y1, x2, y2, x, y)
+            if sign == 0:
+                return False  # on the boundary
+            if y2 < y1:
+                sign = -sign
+            if sign > 0:
+                inside = not inside
+            sign = _orientation(x1, y1, x2, y2, stop, y)
+            if y2 < y1:
+                sign = -sign
+            if sign > 0:
+                inside = not inside
+        elif (x == x1 and y == y1) or (x == x2 and y == y2):
+            return False
+        elif y1 == y2 == y and min(x1, x2) <= x <= max(x1, x2):
+            return False
+    return inside
+
+def _expand(counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    For groups of the given sizes: each element's group, and its offset
+    within the group.
+    """
+    group = np.repeat(np.arange(counts.size), counts)
+    starts = np.cumsum(counts) - counts
+    return group, np.arange(group.size) - starts[group]
+
+def _bin_edges(edges: np.ndarray, xs: np.ndarray, ys: np.ndarray, budget: int) -> List[np.ndarray]:
+    """
+    The edges (rows of x1, y1, x2, y2) touching each closed cell of the grid
+    with lines `xs` and `ys`, by row-major cell. Conservative: an edge may
+    be listed in a cell it only comes within rounding distance of, but never
+    left out of one it touches. Raises GridTooCostly rather than list more
+    than `budget` (edge, cell) pairs.
+    """
+    nx, ny = xs.size - 1, ys.size - 1
+    x1, y1, x2, y2 = edges.T
+    ex0, ex1 = np.minimum(x1, x2), np.maximum(x1, x2)
+    ey0, ey1 = np.minimum(y1, y2), np.maximum(y1, y2)
+    ids = np.flatnonzero((ex1 >= xs[0]) & (ex0 <= xs[-1]) & (ey1 >= ys[0]) & (ey0 <= ys[-1]))
+
+    lo_x = np.clip(np.searchsorted(xs, ex0[ids], "left") - 1, 0, nx - 1)
+    hi_x = np.clip(np.searchsorted(xs, ex1[ids], "right") - 1, 0, nx - 1)
+    lo_y = np.clip(np.searchsorted(ys, ey0[ids], "left") - 1, 0, ny - 1)
+    hi_y = np.clip(np.searchsorted(ys, ey1[ids], "right") - 1, 0, ny - 1)
+
+    # Every row an edge's bbox covers, then the columns the edge spans
+    # within that row's band, widened by a cell against rounding
+    rows_spanned = hi_y - lo_y + 1
+    if rows_spanned.sum() > budget:
+        raise GridTooCostly("too many edge/cell pairs")
+    k, offset = _expand(rows_spanned)
+    row = lo_y[k] + offset
+    e = ids[k]
+    ya = np.maximum(ys[row], ey0[e])
+    yb = np.minimum(ys[row + 1], ey1[e])
+    dy = y2[e] - y1[e]
+    flat = dy == 0
+    slope = np.divide(x2[e] - x1[e], dy, out=np.zeros_like(dy), where=~flat)
+    xa = np.where(flat, ex0[e], x1[e] + (ya - y1[e]) * slope)
+    xb = np.where(flat, ex1[e], x1[e] + (yb - y1[e]) * slope)
+    c_lo = np.maximum(np.searchsorted(xs, np.minimum(xa, xb), "left") - 2, lo_x[k])
+    c_hi = np.minimum(np.searchsorted(xs, np.maximum(xa, xb), "right"), hi_x[k])
+
+    cells_spanned = np.maximum(c_hi - c_lo + 1, 0)
+    if cells_spanned.sum() > budget:
+        raise GridTooCostly("too many edge/cell pairs")
+    j, offset = _expand(cells_spanned)
+    cells = row[j] * nx + c_lo[j] + offset
+    owners = e[j]
+    order = np.argsort(cells, kind="stable")
+    cells, owners = cells[order], owners[order]
+    bounds = np.searchsorted(cells, np.arange(nx * ny + 1))
+    return [owners[bounds[c]:bounds[c + 1]] for c in range(nx * ny)]
+
+def _run_samples(known: np.ndarray, xs: np.ndarray, ys: np.ndarray):
+    """
+    Cells touching no edge that share a side are on the same side of the
+    polygon, so each horizontal run of them needs one sample point. Returns
+    the run id of every cell (-1 for boundary cells) and each run's sample.
+    """
+    starts = known.copy()
+    starts[:, 1:] &= ~known[:, :-1]
+    run = np.where(known, np.cumsum(starts).reshape(known.shape) - 1, -1)
+    rows, cols = np.nonzero(starts)
+    sample_x = (xs[cols] + xs[cols + 1]) / 2
+    sample_y = (ys[rows] + ys[rows + 1]) / 2
+    return run, sample_x, sample_y
+
+class _Level:
+    """
+    One grid level: its lines, the edges in each cell and each cell's
+    side (None for boundary cells).
+    """
+
+    def __init__(self, edges: np.ndarray, xs: np.ndarray, ys: np.ndarray, budget: int):
+        self.xs = xs
+        self.ys = ys
+        self.nx = xs.size - 1
+        self.ny = ys.size - 1
+        self.cell_edges = _bin_edges(edges, xs, ys, budget)
+        self.binned = sum(ids.size for ids in self.cell_edges)
+        counts = np.array([ids.size for ids in self.cell_edges]).reshape(self.ny, self.nx)
+        self.counts = counts.tolist()
+        self.run, self.sample_x, self.sample_y = _run_samples(counts == 0, xs, ys)
+        self.sides: List[List[Optional[bool]]] = []
+
+    def resolve(self, inside: np.ndarray):
+        """
+        Set cell sides from the sides of the run samples.
+        """
+        self.sides = [[None if run < 0 else bool(inside[run]) for run in row] for row in self.run.tolist()]
+
+    def walks(self, row: int, col: int):
+        """
+        From a boundary cell, the straight walks right, left, up and down
+        to the nearest cell with a known side: (cost in edges, vertical,
+        cells walked, stop coordinate, stop side). A walk off the grid stops
+        beyond it with side None.
+        """
+        for d_row, d_col in ((0, 1), (0, -1), (1, 0), (-1, 0)):
+            r, c = row, col
+            cost, path = 0, []
+            while 0 <= r < self.ny and 0 <= c < self.nx and self.sides[r][c] is None:
+                cost += self.counts[r][c]
+                path.append((r, c))
+                r, c = r + d_row, c + d_col
+            if not (0 <= r < self.ny and 0 <= c < self.nx):
+                lines = self.ys if d_row else self.xs
+                beyond = lines[-1] - lines[0]
+                stop = float(lines[-1] + beyond if d_row + d_col > 0 else lines[0] - beyond)
+                yield cost, d_row != 0, path, stop, None
+                continue
+            # The stop is on the side of the reached cell facing the walk
+            if d_col:
+                stop = float(self.xs[c] if d_col > 0 else self.xs[c + 1])
+            else:
+                stop = float(self.ys[r] if d_row > 0 else self.ys[r + 1])
+            yield cost, d_row != 0, path, stop, self.sides[r][c]
+
+    def edges_of(self, path) -> set:
+        found = set()
+        for r, c in path:
+            found.update(self.cell_edges[r * self.nx + c].tolist())
+        return found
+
+class PolygonGrid:
+    """
+    Point-in-polygon index for polygons with many vertices.
+
+    The polygon's bounding box is cut into a grid, and each cell is either
+    wholly inside, wholly outside, or touched by the boundary. Boundary
+    cells crossed by many edges are cut again into a finer grid. A point in
+    an inside or outside cell is answered by the lookup alone. A point in a
+    boundary cell is tested against only the edges near it: each boundary
+    cell keeps the edges on its cheapest straight walk to a cell whose side
+    is known, plus that side (see _locate). The result is exactly Shapely's
+    `contains` (points on the boundary are not contained), including its
+    even-odd answer for self-intersecting rings.
+
+    Building is bounded by the MAX_*_PER_EDGE budgets and MAX_DEPTH levels;
+    a polygon that would exceed them raises GridTooCostly part way through.
+
+    Coordinates are (x, y) as Shapely has them, i.e. (lon, lat).
+    """
+
+    def __init__(self, polygon: Polygon, resolution: Optional[int] = None, max_depth: int = MAX_DEPTH,
+                 max_binned_per_edge: int = MAX_BINNED_EDGES_PER_EDGE,
+                 max_stored_per_edge: int = MAX_STORED_EDGES_PER_EDGE):
+        if max_depth not in (1, 2):
+            raise ValueError("max_depth must be 1 or 2")
+        rings = [polygon.exterior, *polygon.interiors]
+        edges = np.concatenate([
+            np.hstack([coords[:-1], coords[1:]])
+            for coords in (np.asarray(ring.coords, dtype=np.float64)[:, :2] for ring in rings)
+        ])
+        self.edges = edges.shape[0]
+        min_x, min_y, max_x, max_y = polygon.bounds
+        if resolution is None:
+            resolution = int(np.clip(math.isqrt(self.edges), MIN_RESOLUTION, MAX_RESOLUTION))
+        xs = np.linspace(min_x, max_x, resolution + 1)
+        ys = np.linspace(min_y, max_y, resolution + 1)
+        if not (np.all(np.diff(xs) > 0) and np.all(np.diff(ys) > 0)):
+            raise ValueError("Polygon is too thin to grid")
+
+        binned = max_binned_per_edge * self.edges
+        self._stored_budget = max_stored_per_edge * self.edges
+        self._stored = 0
+
+        base = _Level(edges, xs, ys, binned)
+        binned -= base.binned
+        refine = [(r, c) for r in range(base.ny) for c in range(base.nx)
+                  if base.counts[r][c] > REFINE_EDGES] if max_depth > 1 else []
+        subs = {}
+        for r, c in refine:
+            sub_xs = np.linspace(xs[c], xs[c + 1], SUBDIVISIONS + 1)
+            sub_ys = np.linspace(ys[r], ys[r + 1], SUBDIVISIONS + 1)
+            if np.all(np.diff(sub_xs) > 0) and np.all(np.diff(sub_ys) > 0):
+                sub = _Level(edges[base.cell_edges[r * base.nx + c]], sub_xs, sub_ys, binned)
+                binned -= sub.binned
+                subs[(r, c)] = sub
+
+        # One Shapely call decides the side of every run of every level
+        levels = [base, *subs.values()]
+        inside = shapely.contains_xy(polygon, np.concatenate([level.sample_x for level in levels]),
+                                     np.concatenate([level.sample_y for level in levels]))
+        offset = 0
+        for level in levels:
+            level.resolve(inside[offset:offset + level.sample_x.size])
+            offset += level.sample_x.size
+
+        self._leaves: List[Leaf] = []
+        self._sub_index = {}
+        cells = [[_OUTSIDE if side is False else _INSIDE for side in row] for row in base.sides]
+        base_walks = {}
+        for r in range(base.ny):
+            for c in range(base.nx):
+                if base.sides[r][c] is not None:
+                    continue
+                walks = list(base.walks(r, c))
+                base_walks[(r, c)] = walks
+                if (r, c) in subs:
+                    continue
+                cost, vertical, path, stop, side = min(walks, key=lambda walk: walk[0])
+                cells[r][c] = self._leaf(edges, base.edges_of(path), vertical, stop, side)
+
+        self._sub_lines: List[Tuple[List[float], List[float]]] = []
+        self._sub_cells: List[List[List[int]]] = []
+        for (r, c), sub in subs.items():
+            parent = base_walks[(r, c)]
+            sub_cells = [[_OUTSIDE if side is False else _INSIDE for side in row] for row in sub.sides]
+            for sr in range(sub.ny):
+                for sc in range(sub.nx):
+                    if sub.sides[sr][sc] is not None:
+                        continue
+                    options = []
+                    for (cost, vertical, path, stop, side), parent_walk in zip(sub.walks(sr, sc), parent):
+                        if side is None:
+                            # Off the sub-grid: carry on with the parent's
+                            # walk in the same direction, from the parent
+                            # cell's full edge list
+                            cost, vertical, path, stop, side = parent_walk
+                            options.append((cost, vertical, None, path, stop, side))
+                        else:
+                            options.append((cost, vertical, path, None, stop, side))
+                    cost, vertical, sub_path, path, stop, side = min(options, key=lambda option: option[0])
+                    found = sub.edges_of(sub_path) if sub_path is not None else base.edges_of(path)
+                    # A sub-grid cell's edges are numbered within its parent's list
+                    if sub_path is not None:
+                        found = set(base.cell_edges[r * base.nx + c][list(found)].tolist())
+                    sub_cells[sr][sc] = self._leaf(edges, found, vertical, stop, side)
+            cells[r][c] = _REFINED - len(self._sub_cells)
+            self._sub_lines.append((sub.xs.tolist(), sub.ys.tolist()))
+            self._sub_cells.append(sub_cells)
+
+        self._xs = xs.tolist()
+        self._ys = ys.tolist()
+        self._cells = cells
+        # Array copies for contains_xy
+        self._xs_array = xs
+        self._ys_array = ys
+        self._cells_array = np.array(cells, dtype=np.int64)
+        self._sub_xs_array = np.array([lines[0] for lines in self._sub_lines]).reshape(-1, SUBDIVISIONS + 1)
+        self._sub_ys_array = np.array([lines[1] for lines in self._sub_lines]).reshape(-1, SUBDIVISIONS + 1)
+        self._sub_cells_array = np.array(self._sub_cells, dtype=np.int64).reshape(-1, SUBDIVISIONS, SUBDIVISIONS)
+
+    def _leaf(self, edges: np.ndarray, ids: set, vertical: bool, stop: float, side: Optional[bool]) -> int:
+        if side is None:
+            side = False  # walked off the base grid, i.e. past the bounding box
+        self._stored += len(ids)
+        if self._stored > self._stored_budget:
+            raise GridTooCostly("boundary cells would keep too many edges")
+        chosen = edges[sorted(ids)]
+        if vertical:
+            chosen = chosen[:, [1, 0, 3, 2]]
+        self._leaves.append((vertical, stop, side, tuple(map(tuple, chosen.tolist()))))
+        return len(self._leaves) - 1
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "edges": self.edges,
+            "cells": len(self._cells) * len(self._cells[0]) + len(self._sub_cells) * SUBDIVISIONS ** 2,
+            "refined_cells": len(self._sub_cells),
+            "boundary_cells": len(self._leaves),
+            "stored_edges": sum(len(leaf[3]) for leaf in self._leaves),
+        }
+
+    def contains(self, x: float, y: float) -> bool:
+        """
+        Shapely `contains` for one point inside the polygon's bounding box.
+        """
+        xs, ys = self._xs, self._ys
+        col = min(bisect_right(xs, x) - 1, len(xs) - 2)
+        row = min(bisect_right(ys, y) - 1, len(ys) - 2)
+        code = self._cells[row][col]
+        if code <= _REFINED:
+            k = _REFINED - code
+            xs, ys = self._sub_lines[k]
+            col = min(bisect_right(xs, x) - 1, SUBDIVISIONS - 1)
+            row = min(bisect_right(ys, y) - 1, SUBDIVISIONS - 1)
+            code = self._sub_cells[k][row][col]
+        if code == _INSIDE:
+            return True
+        if code == _OUTSIDE:
+            return False
+        return _locate(self._leaves[code], x, y)
+
+    def contains_xy(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Vectorized `contains` for points inside the polygon's bounding box.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        cols = np.minimum(np.searchsorted(self._xs_array, x, "right") - 1, len(self._xs) - 2)
+        rows = np.minimum(np.searchsorted(self._ys_array, y, "right") - 1, len(self._ys) - 2)
+        codes = self._cells_array[rows, cols]
+        refined = np.flatnonzero(codes <= _REFINED)
+        if refined.size:
+            k = _REFINED - codes[refined]
+            sub_cols = np.minimum((self._sub_xs_array[k] <= x[refined, None]).sum(axis=1) - 1, SUBDIVISIONS - 1)
+            sub_rows = np.minimum((self._sub_ys_array[k] <= y[refined, None]).sum(axis=1) - 1, SUBDIVISIONS - 1)
+            codes[refined] = self._sub_cells_array[k, sub_rows, sub_cols]
+        result = codes == _INSIDE
+        leaves = self._leaves
+        for i in np.flatnonzero(codes >= 0).tolist():
+            result[i] = _locate(leaves[codes[i]], float(x[i]), float(y[i]))
+        return result
+
+class GridCache:
+    """
+    PolygonGrids by polygon content, least recently used first out.
+
+    A polygon is gridded once per process however many CompiledZones,
+    registry reloads and replays use it. The process that built a grid
+    hands it to ingest shards and replay workers with `export`, and they
+    `seed` their own cache with it instead of building again. Polygons too
+    costly to grid are cached as None, so they are not tried again.
+    """
+
+    def __init__(self, size: int = 64):
+        self.size = size
+        self._lock = threading.Lock()
+        self._grids: "OrderedDict[bytes, Optional[PolygonGrid]]" = OrderedDict()
+
+    @staticmethod
+    def key(polygon: Polygon) -> bytes:
+        return hashlib.blake2b(shapely.to_wkb(polygon), digest_size=16).digest()
+
+    def get(self, polygon: Polygon) -> Optional[PolygonGrid]:
+        """
+        The polygon's grid, built on first use; None if it is too costly.
+        """
+        key = self.key(polygon)
+        with self._lock:
+            if key in self._grids:
+                self._grids.move_to_end(key)
+                return self._grids[key]
+        try:
+            grid = PolygonGrid(polygon)
+        except ValueError:
+            # Too costly (GridTooCostly) or too thin to grid
+            grid = None
+        self.seed({key: grid})
+        return grid
+
+    def export(self, polygons: Optional[Iterable[Polygon]] = None) -> Dict[bytes, Optional[PolygonGrid]]:
+        """
+        Cached grids of `polygons` (default: all), keyed for `seed`.
+        """
+        with self._lock:
+            if polygons is None:
+                return dict(self._grids)
+            keys = [self.key(polygon) for polygon in polygons]
+            return {key: self._grids[key] for key in keys if key in self._grids}
+
+    def seed(self, grids: Dict[bytes, Optional[PolygonGrid]]):
+        with self._lock:
+            for key, grid in grids.items():
+                self._grids[key] = grid
+                self._grids.move_to_end(key)
+            while len(self._grids) > self.size:
+                self._grids.popitem(last=False)
+
+    def reset(self):
+        with self._lock:
+            self._grids.clear()
+
+grid_cache = GridCache()
@@ -0,0 +1,101 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional, Tuple
+
+class SamplingProfiler:
+    """
+    Statistical profiler that can be switched on in a running server.
+
+    A daemon thread snapshots every thread's Python stack with
+    sys._current_frames() every `interval_s` and counts identical stacks.
+    Nothing is hooked into the interpreter, so the cost is one stack walk
+    per thread per sample and zero while stopped. Results are exported in
+    the collapsed-stack format used by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stacks: Counter = Counter()
+        self.samples = 0
+        self.interval_s = 0.0
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_s: float = 0.005, duration_s: Optional[float] = 30.0) -> bool:
+        """
+        Start sampling, discarding earlier results. Stops by itself after
+        `duration_s` (None: until stop()). Returns False if already running.
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self._stacks = Counter()
+            self.samples = 0
+            self.interval_s = interval_s
+            self.started_at = time.time()
+            self.stopped_at = None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(interval_s, duration_s),
+                                            name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop.set()
+        thread.join()
+
+    def collapsed(self) -> str:
+        """
+        One `thread;outer;...;inner count` line per distinct stack.
+        """
+        with self._lock:
+            stacks = self._stacks.most_common()
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in stacks)
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "interval_s": self.interval_s,
+            "samples": self.samples,
+            "distinct_stacks": len(self._stacks),
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+        }
+
+    def _run(self, interval_s: float, duration_s: Optional[float]):
+        own = threading.get_ident()
+        deadline = time.monotonic() + duration_s if duration_s else None
+        while not self._stop.wait(interval_s):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, frame in frames.items():
+                    if ident != own:
+                        self._stacks[(names.get(ident, str(ident)),) + _stack(frame)] += 1
+                self.samples += 1
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+        self.stopped_at = time.time()
+
+def _stack(frame) -> Tuple[str, ...]:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+profiler = SamplingProfiler()
@@ -0,0 +1,317 @@
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence
+import numpy as np
+from sqlalchemy import String, and_, func, insert, or_, select, type_coerce
+from sqlmodel import Session
+from src.app.config import settings
+from src.app.db.models import AlertEvent, AlertType, TelemetryRecord, Zone
+from src.app.db.session import after_commit
+from src.app.db.writer import run_write
+from src.app.services.polygon_grid import grid_cache
+from src.app.services.sharding import get_ingest_shards
+from src.app.services.state_store import state_store
+from src.app.services.stream import stream_hub
+from src.app.services.zone_eval import CompiledZone, points_in_zones
+
+def _naive_utc(ts: datetime) -> datetime:
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+class ReplayResult:
+    """
+    Outcome of replaying history against a zone set: the zone state every
+    object ends up in and the ENTER/EXIT alerts it would have raised.
+    """
+
+    def __init__(self, zone_ids: List[int], start: datetime, end: datetime):
+        self.zone_ids = zone_ids
+        self.start = start
+        self.end = end
+        self.points = 0
+        self.objects = 0
+        self.workers = 0
+        self.elapsed_s = 0.0
+        self.committed = False
+        # Replayed alerts not committed because they had already been raised
+        self.duplicates = 0
+        # dicts shaped like ObjectZoneState / AlertEvent rows
+        self.states: List[dict] = []
+        self.alerts: List[dict] = []
+
+    def to_dict(self) -> dict:
+        return {
+            "zone_ids": self.zone_ids,
+            "start": self.start,
+            "end": self.end,
+            "points": self.points,
+            "objects": self.objects,
+            "workers": self.workers,
+            "elapsed_s": round(self.elapsed_s, 3),
+            "committed": self.committed,
+            "duplicates": self.duplicates,
+            "states": self.states,
+            "alerts": [{k: v for k, v in alert.items() if k != "ack"} for alert in self.alerts],
+        }
+
+def _evaluate(zone_rows: List[dict], grids: dict, codes: np.ndarray, lats: np.ndarray, lons: np.ndarray,
+              initial: np.ndarray):
+    """
+    Replay one task's points (sorted by object, then ts) against the zones,
+    using the polygon grids the caller already built (`grids`, from
+    grid_cache.export) rather than building them again in each worker.
+
+    Each object starts on the side of each zone `initial` (objects x zones,
+    indexed by code) says it was on at the start of the window. Returns
+    (row, zone, entered) for every transition and (last row, zone, inside)
+    for every zone an object was inside at some point, as row/column
+    indices into the task's arrays.
+    """
+    grid_cache.seed(grids)
+    zones = [CompiledZone(Zone(**row)) for row in zone_rows]
+    inside = points_in_zones(lats, lons, zones)
+    first = np.ones(len(codes), dtype=bool)
+    first[1:] = codes[1:] != codes[:-1]
+
+    previous = np.zeros_like(inside)
+    previous[1:] = inside[:-1]
+    previous[first] = initial[codes[first]]
+    rows, cols = np.nonzero(inside != previous)
+    transitions = (rows, cols, inside[rows, cols])
+
+    starts = np.flatnonzero(first)
+    lasts = np.append(starts[1:], len(codes)) - 1
+    ever = np.logical_or.reduceat(inside, starts, axis=0) | initial[codes[starts]]
+    objects, cols = np.nonzero(ever)
+    last_rows = lasts[objects]
+    states = (last_rows, cols, inside[last_rows, cols])
+    return transitions, states
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _workers() -> int:
+    return settings.replay_workers or os.cpu_count() or 1
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs writer/flusher threads is unsafe
+            _pool = ProcessPoolExecutor(max_workers=_workers(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+def _in_range(start: datetime, end: datetime, object_ids: Optional[List[str]]) -> list:
+    in_range = [TelemetryRecord.ts >= start, TelemetryRecord.ts <= end]
+    if object_ids:
+        in_range.append(TelemetryRecord.object_id.in_(object_ids))
+    return in_range
+
+def _candidates(zones: Sequence[CompiledZone], start: datetime, end: datetime, object_ids: Optional[List[str]]):
+    # Objects that never come near any zone cannot enter or leave one
+    near = or_(*[
+        and_(TelemetryRecord.lat.between(z.bbox[0], z.bbox[2]), TelemetryRecord.lon.between(z.bbox[1], z.bbox[3]))
+        for z in zones if z.bbox is not None
+    ])
+    return select(TelemetryRecord.object_id).where(*_in_range(start, end, object_ids), near).distinct()
+
+def _load(session: Session, zones: Sequence[CompiledZone], start: datetime, end: datetime,
+          object_ids: Optional[List[str]]):
+    in_range = _in_range(start, end, object_ids)
+    candidates = _candidates(zones, start, end, object_ids)
+    # Plain Core rows with ts left as SQLite's text: building ORM rows and
+    # datetimes for millions of points costs more than evaluating them
+    rows = session.connection().execute(
+        select(TelemetryRecord.object_id, type_coerce(TelemetryRecord.ts, String), TelemetryRecord.lat, TelemetryRecord.lon)
+        .where(*in_range, TelemetryRecord.object_id.in_(candidates))
+        .order_by(TelemetryRecord.object_id, TelemetryRecord.ts)
+    ).all()
+    if not rows:
+        return [], np.empty(0, dtype=np.int64), np.empty(0, dtype="datetime64[us]"), np.empty(0), np.empty(0)
+    object_ids, times, lats, lons = zip(*rows)
+    # Rows arrive grouped by object, so codes just count the object changes
+    object_ids = np.array(object_ids, dtype=object)
+    changes = np.flatnonzero(object_ids[1:] != object_ids[:-1]) + 1
+    codes = np.zeros(len(rows), dtype=np.int64)
+    codes[changes] = 1
+    names = [object_ids[0]] + list(object_ids[changes])
+    return (names, np.cumsum(codes), np.array(times, dtype="datetime64[us]"),
+            np.array(lats, dtype=np.float64), np.array(lons, dtype=np.float64))
+
+def _initial(session: Session, zones: Sequence[CompiledZone], names: List[str], start: datetime, end: datetime,
+             object_ids: Optional[List[str]]) -> np.ndarray:
+    """
+    objects x zones: whether each of `names` (the objects _load returned)
+    was inside each zone at `start`, going by its last report before the
+    window. Objects with no earlier report start outside, like a first-seen
+    object in live ingest.
+    """
+    initial = np.zeros((len(names), len(zones)), dtype=bool)
+    last = (
+        select(TelemetryRecord.object_id, func.max(TelemetryRecord.ts).label("ts"))
+        .where(TelemetryRecord.ts < start, TelemetryRecord.object_id.in_(_candidates(zones, start, end, object_ids)))
+        .group_by(TelemetryRecord.object_id)
+        .subquery()
+    )
+    rows = session.connection().execute(
+        select(TelemetryRecord.object_id, TelemetryRecord.lat, TelemetryRecord.lon)
+        .join(last, and_(TelemetryRecord.object_id == last.c.object_id, TelemetryRecord.ts == last.c.ts))
+    ).all()
+    if rows:
+        code_of = {name: code for code, name in enumerate(names)}
+        object_ids, lats, lons = zip(*rows)
+        codes = np.array([code_of[object_id] for object_id in object_ids], dtype=np.int64)
+        initial[codes] = points_in_zones(np.array(lats, dtype=np.float64), np.array(lons, dtype=np.float64), zones)
+    return initial
+
+def _tasks(names: List[str], codes: np.ndarray, workers: int, task_points: int) -> List[np.ndarray]:
+    """
+    Shard objects across workers by a stable hash of object_id and split
+    each shard into tasks of roughly `task_points` points. An object's
+    points always stay in one task. Returns the row indices of each task.
+    """
+    shard_of = np.array([zlib.crc32(name.encode()) % workers for name in names], dtype=np.int64)
+    row_shards = shard_of[codes]
+    tasks = []
+    for shard in range(workers):
+        rows = np.flatnonzero(row_shards == shard)
+        if not rows.size:
+            continue
+        # Cut only where the object changes
+        cuts = np.flatnonzero(codes[rows][1:] != codes[rows][:-1]) + 1
+        begin = 0
+        for cut in cuts:
+            if cut - begin >= task_points:
+                tasks.append(rows[begin:cut])
+                begin = cut
+        tasks.append(rows[begin:])
+    return tasks
+
+def replay_history(session: Session, zones: Sequence[Zone], start: datetime, end: datetime,
+                   object_ids: Optional[List[str]] = None, commit: bool = False) -> ReplayResult:
+    """
+    Replay stored telemetry in [start, end] against `zones`.
+
+    Points are evaluated in vectorized batches. Large replays fan out over
+    a process pool, sharded by object_id. With commit=False nothing is
+    written (dry run). Objects start on the side of each zone their last
+    report before `start` puts them, so one that was already inside raises
+    no ENTER at its first replayed point. With commit=True the alerts are inserted with their
+    historical timestamps, skipping any already raised for the same object,
+    zone, type and time, and the final zone states are applied to the
+    state store, except where live ingest has already recorded a newer
+    state for that object and zone.
+    """
+    started = time.perf_counter()
+    start, end = _naive_utc(start), _naive_utc(end)
+    enabled = [zone for zone in zones if zone.enabled]
+    result = ReplayResult([zone.id for zone in enabled], start, end)
+    compiled = [CompiledZone(zone) for zone in enabled]
+    if not any(z.bbox is not None for z in compiled):
+        result.elapsed_s = time.perf_counter() - started
+        return result
+
+    names, codes, times, lats, lons = _load(session, compiled, start, end, object_ids)
+    result.points = len(times)
+    result.objects = len(names)
+    if not result.points:
+        result.elapsed_s = time.perf_counter() - started
+        return result
+    zone_rows = [zone.model_dump() for zone in enabled]
+    initial = _initial(session, compiled, names, start, end, object_ids)
+
+    if result.points < settings.replay_parallel_min_points or _workers() == 1:
+        result.workers = 1
+        outputs = [(np.arange(len(codes)), _evaluate(zone_rows, {}, codes, lats, lons, initial))]
+    else:
+        tasks = _tasks(names, codes, _workers(), settings.replay_task_points)
+        result.workers = min(_workers(), len(tasks))
+        pool = _get_pool()
+        grids = grid_cache.export(z.polygon for z in compiled if z.grid is not None)
+        futures = [pool.submit(_evaluate, zone_rows, grids, codes[rows], lats[rows], lons[rows], initial)
+                   for rows in tasks]
+        outputs = [(rows, future.result()) for rows, future in zip(tasks, futures)]
+
+    for rows, ((t_rows, t_cols, t_enter), (s_rows, s_cols, s_inside)) in outputs:
+        for row, col, entered in zip(rows[t_rows].tolist(), t_cols.tolist(), t_enter.tolist()):
+            zone = enabled[col]
+            object_id = names[codes[row]]
+            alert_type = AlertType.ENTER if entered else AlertType.EXIT
+            verb = "entered" if entered else "exited"
+            result.alerts.append(dict(
+                object_id=object_id, zone_id=zone.id, alert_type=alert_type,
+                message=f"Object {object_id} {verb} zone {zone.name}", ts=times[row].item(), ack=False,
+            ))
+        for row, col, inside in zip(rows[s_rows].tolist(), s_cols.tolist(), s_inside.tolist()):
+            result.states.append(dict(
+                object_id=names[codes[row]], zone_id=enabled[col].id, is_inside=inside, last_updated=times[row].item(),
+            ))
+    result.alerts.sort(key=lambda alert: alert["ts"])
+
+    if commit:
+        _apply(session, result)
+    result.elapsed_s = time.perf_counter() - started
+    return result
+
+def _raised(s: Session, result: ReplayResult) -> dict:
+    """
+    (object_id, zone_id, alert_type) -> [(first, last)] event-time spans of
+    the ENTER/EXIT alerts already stored for the replayed zones and window.
+    Live alerts keep the event time in first_ts/last_ts (a coalesced row
+    spans its repeats); committed replays keep it in ts.
+    """
+    first = func.coalesce(AlertEvent.first_ts, AlertEvent.ts)
+    last = func.coalesce(AlertEvent.last_ts, AlertEvent.first_ts, AlertEvent.ts)
+    rows = s.execute(
+        select(AlertEvent.object_id, AlertEvent.zone_id, AlertEvent.alert_type, first, last).where(
+            AlertEvent.zone_id.in_(result.zone_ids),
+            AlertEvent.alert_type.in_([AlertType.ENTER, AlertType.EXIT]),
+            last >= result.start,
+            first <= result.end,
+        )
+    ).all()
+    spans = {}
+    for object_id, zone_id, alert_type, first_ts, last_ts in rows:
+        spans.setdefault((object_id, zone_id, alert_type), []).append((first_ts, last_ts))
+    return spans
+
+def _apply(session: Session, result: ReplayResult):
+    def write(s: Session):
+        # Checked inside the writer job, so live alerts committed or queued
+        # before this one are seen and not raised a second time
+        spans = _raised(s, result)
+        fresh = [
+            alert for alert in result.alerts
+            if not any(first <= alert["ts"] <= last
+                       for first, last in spans.get((alert["object_id"], alert["zone_id"], alert["alert_type"]), ()))
+        ]
+        result.duplicates = len(result.alerts) - len(fresh)
+        result.alerts = fresh
+        if result.alerts:
+            ids = s.execute(
+                insert(AlertEvent).returning(AlertEvent.id, sort_by_parameter_order=True), result.alerts
+            ).scalars().all()
+            for alert, alert_id in zip(result.alerts, ids):
+                alert["id"] = alert_id
+        after_commit(s, lambda: stream_hub.publish([], result.alerts))
+
+    run_write(write, session)
+    state_store.ensure_loaded(session)
+    state_store.apply_zone_states(result.states)
+    # Sharded ingest keeps its own copy of each shard's zone states
+    shards = get_ingest_shards()
+    if shards is not None:
+        shards.apply_zone_states(result.states)
+    state_store.request_flush()
+    result.committed = True
@@ -0,0 +1,136 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import Integer, case, cast, delete, func, literal, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session
+from src.app.config import settings
+from src.app.db.models import TelemetryRecord, TelemetryRollup
+from src.app.db.writer import run_write
+
+ROLLUP_FIELDS = ("lat", "lon", "alt_m", "speed_mps", "heading_deg", "battery_pct")
+RAW = 0  # source "tier" of the raw TelemetryRecord table
+
+def _naive_utc(ts: datetime) -> datetime:
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+class RetentionJob:
+    """
+    Moves telemetry down a chain of progressively coarser tiers.
+
+    Raw rows older than `raw_days` are rolled up into the first tier (one
+    point per object per bucket) and deleted; rows of each tier older than
+    that tier's age limit are rolled up into the next one; the last tier
+    simply expires. Every step handles at most `batch_rows` source rows per
+    transaction, so ingest never waits long for the write lock, and rolling
+    up and deleting a slice happen in the same transaction, so a row is
+    always in exactly one tier.
+    """
+
+    def __init__(self, raw_days: float, tiers: Sequence[Tuple[int, float]], batch_rows: int):
+        tiers = sorted(tiers)
+        ages = [raw_days] + [days for _, days in tiers]
+        if any(a >= b for a, b in zip(ages, ages[1:])):
+            raise ValueError("Retention tiers must get coarser and older: bucket size and age must both increase")
+        self.raw_days = raw_days
+        self.tiers = [(int(bucket_s), days) for bucket_s, days in tiers]
+        self.batch_rows = batch_rows
+        self.last_run: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def levels(self) -> List[Tuple[int, float, Optional[int]]]:
+        """
+        (source tier, age limit in days, target tier or None) for every step.
+        """
+        sources = [RAW] + [bucket_s for bucket_s, _ in self.tiers]
+        ages = [self.raw_days] + [days for _, days in self.tiers]
+        targets: List[Optional[int]] = sources[1:] + [None]
+        return list(zip(sources, ages, targets))
+
+    def run_once(self, engine, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Apply the policy once. Returns how many rows were rolled up and how
+        many expired.
+        """
+        now = _naive_utc(now or datetime.now(timezone.utc))
+        stats = {"rolled_up": 0, "expired": 0}
+        for source, days, target in self.levels():
+            cutoff = now - timedelta(days=days)
+            while True:
+                with Session(engine) as session:
+                    moved = run_write(lambda s: self._move_slice(s, source, target, cutoff), session)
+                stats["rolled_up" if target is not None else "expired"] += moved
+                if moved < self.batch_rows:
+                    break
+        self.last_run = stats
+        return stats
+
+    def _move_slice(self, session: Session, source: int, target: Optional[int], cutoff: datetime) -> int:
+        model = TelemetryRecord if source == RAW else TelemetryRollup
+        where = [model.ts < cutoff]
+        if source != RAW:
+            where.append(TelemetryRollup.tier_s == source)
+        # Oldest batch_rows rows (plus any sharing the last timestamp)
+        last = session.execute(
+            select(model.ts).where(*where).order_by(model.ts).offset(self.batch_rows - 1).limit(1)
+        ).scalar()
+        if last is not None:
+            where.append(model.ts <= last)
+        if target is not None:
+            session.execute(_rollup(model, source, target, where))
+        return session.execute(delete(model).where(*where)).rowcount
+
+    def start(self, engine, interval_s: float):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(engine, interval_s), name="retention", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self, engine, interval_s: float):
+        while not self._stop.wait(timeout=interval_s):
+            try:
+                self.run_once(engine)
+            except Exception as e:
+                print(f"Retention run failed: {e}")
+
+def _rollup(model, source: int, target: int, where):
+    """
+    INSERT ... SELECT the latest row of every (object, bucket) among the
+    `where` rows into tier `target`, merging into buckets that already
+    exist (e.g. after a backfill of old data).
+    """
+    epoch = cast(func.strftime("%s", model.ts), Integer)
+    bucket_ts = func.strftime("%Y-%m-%d %H:%M:%S.000000", epoch - epoch % target, "unixepoch")
+    samples = func.count() if source == RAW else func.sum(model.samples)
+    # SQLite fills bare columns from the row that produced max(ts)
+    rows = (
+        select(
+            literal(target), model.object_id, bucket_ts, func.max(model.ts),
+            *[getattr(model, name) for name in ROLLUP_FIELDS], samples,
+        )
+        .where(*where)
+        .group_by(model.object_id, bucket_ts)
+    )
+    stmt = sqlite_insert(TelemetryRollup).from_select(
+        ["tier_s", "object_id", "bucket_ts", "ts", *ROLLUP_FIELDS, "samples"], rows
+    )
+    newer = stmt.excluded.ts >= TelemetryRollup.ts
+    set_ = {
+        name: case((newer, stmt.excluded[name]), else_=getattr(TelemetryRollup, name))
+        for name in ("ts",) + ROLLUP_FIELDS
+    }
+    set_["samples"] = TelemetryRollup.samples + stmt.excluded.samples
+    return stmt.on_conflict_do_update(index_elements=["tier_s", "object_id", "bucket_ts"], set_=set_)
+
+retention = RetentionJob(settings.retention_raw_days, settings.retention_tiers, settings.retention_batch_rows)
@@ -0,0 +1,453 @@
+import multiprocessing
+import queue
+import threading
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple, Union
+from sqlmodel import Session, create_engine
+from src.app.db.models import TelemetryPoint
+from src.app.db.session import configure_sqlite
+from src.app.db.writer import get_writer, run_write
+from src.app.services import metrics
+from src.app.services.alert_policy import alert_suppressor
+from src.app.services.codec import FlatPoint
+from src.app.db.session import after_commit, after_rollback
+from src.app.services.ingestion import (BatchResult, BatchUndo, evaluate_and_submit, evaluate_batch, process_batch,
+                                        rearm_stale, write_batch)
+from src.app.services.polygon_grid import grid_cache
+from src.app.services.state_store import ObjectState, state_store
+from src.app.services.zone_registry import zone_registry
+
+def shard_of(object_id: str, shards: int) -> int:
+    """
+    Stable across processes and restarts, unlike hash().
+    """
+    return zlib.crc32(object_id.encode()) % shards
+
+def _shard_main(shard: int, shards: int, database_url: str, inbox, outbox, grids: dict):
+    """
+    Body of one shard's worker process. It owns the state of the objects
+    that hash to `shard`, plus its own zone cache and alert suppressor,
+    and only ever reads the database. Polygon grids come from the
+    coordinator (`grids` and zone change messages) rather than being built
+    again in every worker.
+    """
+    grid_cache.seed(grids)
+    engine = create_engine(database_url, connect_args={"check_same_thread": False})
+    configure_sqlite(engine, read_only=True)
+    with Session(engine) as session:
+        state_store.load(session, keep=lambda object_id: shard_of(object_id, shards) == shard)
+        zone_registry.load(session)
+    shipped = 0
+    # round_id -> how to put back a round that is not stored yet
+    undos: Dict[int, BatchUndo] = {}
+    while True:
+        message = inbox.get()
+        if message is None:
+            break
+        kind = message[0]
+        try:
+            if kind == "batch":
+                _, round_id, points = message
+                with Session(engine) as session:
+                    zones = zone_registry.snapshot(session)
+                result = evaluate_batch(points, zones, metrics.StageClock())
+                # Kept here until the coordinator settles the round. Workers
+                # never flush, so their objects need no holding
+                undos[round_id], result.undo = result.undo, None
+                state_store.release(undos[round_id].objects)
+                # A provisional id, unique across shards and never a real
+                # one, lets later batches coalesce into the alert before
+                # the coordinator has stored it
+                for row in result.alerts:
+                    shipped += 1
+                    row["id"] = -(shipped * shards + shard)
+                # Objects travel in result.touched; zone states go as rows
+                _, zone_state_rows = state_store.take_dirty()
+                outbox.put((round_id, shard, result, zone_state_rows, None))
+            elif kind == "settle":
+                # The round was stored, or must be undone so this shard's
+                # state matches the coordinator's and the database
+                _, round_id, stored = message
+                undo = undos.pop(round_id, None)
+                if undo is not None and not stored:
+                    undo.rollback()
+            elif kind == "zones_changed":
+                grid_cache.seed(message[1])
+                zone_registry.reset()
+            elif kind == "zone_removed":
+                state_store.remove_zone(message[1])
+                zone_registry.reset()
+            elif kind == "zone_states":
+                state_store.apply_zone_states(
+                    [row for row in message[1] if shard_of(row["object_id"], shards) == shard])
+            elif kind == "close_alerts":
+                with state_store.lock:
+                    alert_suppressor.close(message[1])
+        except Exception as e:
+            if kind == "batch":
+                outbox.put((message[1], shard, None, None, f"{type(e).__name__}: {e}"))
+            else:
+                print(f"Ingest shard {shard} failed on {kind}: {e}")
+    engine.dispose()
+
+class _Round:
+    """
+    One round's replies, filled in by the coordinator's collector thread.
+    """
+    __slots__ = ("expected", "replies", "errors", "done")
+
+    def __init__(self, expected: int):
+        self.expected = expected
+        self.replies: Dict[int, tuple] = {}
+        self.errors: List[str] = []
+        self.done = threading.Event()
+
+    def add(self, shard: int, result, rows, error: Optional[str]):
+        if error is not None:
+            self.errors.append(f"shard {shard}: {error}")
+        else:
+            self.replies[shard] = (result, rows)
+        if len(self.replies) + len(self.errors) >= self.expected:
+            self.done.set()
+
+    def fail(self, error: str):
+        self.errors.append(error)
+        self.done.set()
+
+    def wait(self) -> Dict[int, tuple]:
+        self.done.wait()
+        if self.errors:
+            raise RuntimeError("; ".join(self.errors))
+        return self.replies
+
+class IngestShards:
+    """
+    Sharded ingest across worker processes.
+
+    Points are routed by a stable hash of object_id to one of `shards`
+    worker processes. Each worker owns the object and object/zone state of
+    its shard, its own compiled zone cache and alert suppressor, and runs
+    the CPU-bound part of ingest (evaluate_batch) without the GIL of the
+    others. Every object always lands on the same worker and its points are
+    evaluated in order there, so enter/exit semantics are exactly those of
+    in-process ingest.
+
+    This process stays the coordinator: it fans a batch out, merges the
+    shards' results into the main state store (which still serves reads,
+    stale detection and write-behind), and writes history and alerts
+    through the group-commit writer, so SQLite keeps a single writer.
+
+    Rounds are pipelined: every request fans its points out as soon as it
+    arrives, so concurrent requests keep all shards busy, and a collector
+    thread hands each reply to its round by round id. Only the merge and
+    the writer submission take turns, in round order, which keeps each
+    object's state and the writer's job order the same as the order the
+    shards evaluated them in. Shards give new alerts
+    provisional (negative) ids so cooldown coalescing works before the alert
+    is stored; the coordinator maps them to the real ids as it writes. Zone
+    changes, replayed zone states and acknowledgements are broadcast between
+    rounds.
+
+    Each worker keeps a round's BatchUndo until the coordinator settles the
+    round: if the round's write or commit fails (or another shard failed
+    it), the workers and the coordinator's state store put back what it
+    changed, as in-process ingest does.
+    """
+
+    def __init__(self, shards: int, database_url: str):
+        self.shards = shards
+        self.database_url = database_url
+        # Guards round numbering, fan-out and broadcasts, so every shard
+        # sees rounds and zone changes in the same order
+        self._lock = threading.Lock()
+        self._pending: Dict[int, _Round] = {}
+        # Rounds merge and submit their writes in round order
+        self._turn = threading.Condition()
+        self._next_turn = 1
+        self._collector: Optional[threading.Thread] = None
+        self._collecting = threading.Event()
+        self._processes: List[multiprocessing.Process] = []
+        self._inboxes: list = []
+        self._outbox = None
+        self._round = 0
+        # Provisional alert id <-> stored id, for alerts that can still be
+        # coalesced into; only touched from writer jobs, except for lookups
+        self._stored: Dict[int, Tuple[int, datetime]] = {}
+        self._provisional: Dict[int, int] = {}
+        self._prune_at = 10000
+        # Keys of the polygon grids the workers have been sent
+        self._sent_grids: Set[bytes] = set()
+        self.rounds = 0
+        self.points = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._processes)
+
+    def start(self):
+        if self._processes:
+            return
+        # spawn: forking a process that runs writer/flusher threads is unsafe
+        context = multiprocessing.get_context("spawn")
+        self._outbox = context.Queue()
+        grids = grid_cache.export()
+        self._sent_grids = set(grids)
+        for shard in range(self.shards):
+            inbox = context.Queue()
+            process = context.Process(
+                target=_shard_main, args=(shard, self.shards, self.database_url, inbox, self._outbox, grids),
+                name=f"ingest-shard-{shard}", daemon=True,
+            )
+            process.start()
+            self._inboxes.append(inbox)
+            self._processes.append(process)
+        self._collecting.set()
+        self._collector = threading.Thread(target=self._collect, name="ingest-shard-replies", daemon=True)
+        self._collector.start()
+
+    def stop(self, timeout_s: float = 10.0):
+        """
+        Let every worker finish what it was sent, then stop it.
+        """
+        with self._lock:
+            for inbox in self._inboxes:
+                inbox.put(None)
+            processes, self._processes = self._processes, []
+            self._inboxes = []
+        # Outside the lock: the collector takes it to hand out replies, and
+        # keeps draining the outbox so workers can exit
+        for process in processes:
+            process.join(timeout_s)
+            if process.is_alive():
+                process.terminate()
+        self._collecting.clear()
+        if self._collector is not None:
+            self._collector.join()
+            self._collector = None
+        self._outbox = None
+
+    def process_batch(self, points: List[Union[TelemetryPoint, FlatPoint]], session: Session) -> Dict[str, ObjectState]:
+        """
+        Evaluate `points` on their shards, then merge and write the results
+        like process_batch does, returning once they are committed. Must
+        not be called from inside a writer job.
+        """
+        if not points:
+            return {}
+        parts: List[List[FlatPoint]] = [[] for _ in range(self.shards)]
+        for point in points:
+            if not isinstance(point, FlatPoint):
+                point = FlatPoint.from_model(point)
+            parts[shard_of(point.object_id, self.shards)].append(point)
+        busy = [shard for shard, part in enumerate(parts) if part]
+
+        clock = metrics.StageClock()
+        with self._lock:
+            self._round += 1
+            round_id = self._round
+            pending = self._pending[round_id] = _Round(len(busy))
+            for shard in busy:
+                self._inboxes[shard].put(("batch", round_id, parts[shard]))
+        error: Optional[Exception] = None
+        try:
+            replies = pending.wait()
+        except Exception as e:
+            error = e
+        finally:
+            with self._lock:
+                del self._pending[round_id]
+        clock.lap("shards")
+
+        with self._turn:
+            self._turn.wait_for(lambda: self._next_turn == round_id)
+            try:
+                if error is not None:
+                    raise error
+                merged = BatchResult([], [], [], {}, [])
+                zone_state_rows: List[dict] = []
+                for shard in busy:
+                    result, rows = replies[shard]
+                    merged.records.extend(result.records)
+                    merged.alerts.extend(result.alerts)
+                    merged.alert_updates.extend(result.alert_updates)
+                    merged.touched.update(result.touched)
+                    merged.zones_per_point.extend(result.zones_per_point)
+                    zone_state_rows.extend(rows)
+                state_store.ensure_loaded(session)
+                zones = zone_registry.snapshot(session)
+                undo = merged.undo = BatchUndo(zones)
+                with state_store.lock:
+                    for object_id in merged.touched:
+                        undo.save_object(object_id, state_store.objects.get(object_id))
+                    for row in zone_state_rows:
+                        key = (row["object_id"], row["zone_id"])
+                        undo.save_zone(*key, state_store.zone_states.get(key))
+                    state_store.merge(merged.touched.values(), zone_state_rows)
+                    rearm_stale(merged.touched, zones)
+                    undo.settle([])
+                clock.lap("merge")
+                self.rounds += 1
+                self.points += len(points)
+
+                def write(s: Session):
+                    self._write(merged, s, clock, round_id, busy)
+
+                writer = get_writer()
+                if writer is None:
+                    run_write(write, session)
+                    return merged.touched
+                # Writer jobs run in submission order, so every provisional id is
+                # mapped before a later round's updates need it
+                committed = writer.submit(write)
+            except Exception:
+                self._settle(round_id, busy, stored=False)
+                raise
+            finally:
+                self._next_turn += 1
+                self._turn.notify_all()
+        committed.result()
+        return merged.touched
+
+    def _write(self, merged: BatchResult, session: Session, clock: metrics.StageClock, round_id: int,
+               busy: List[int]):
+        clock.lap("queue")
+        after_commit(session, lambda: self._settle(round_id, busy, stored=True))
+        after_rollback(session, lambda: self._settle(round_id, busy, stored=False))
+        provisional = [alert.pop("id") for alert in merged.alerts]
+        merged.alert_updates = [dict(update, id=self._stored[update["id"]][0])
+                                for update in merged.alert_updates if update["id"] in self._stored]
+        write_batch(merged, session, commit=False, clock=clock)
+        mapped = []
+        for temporary, alert in zip(provisional, merged.alerts):
+            if alert_suppressor.cooldowns.get(alert["alert_type"]):
+                self._stored[temporary] = (alert["id"], alert["first_ts"])
+                self._provisional[alert["id"]] = temporary
+                mapped.append(temporary)
+        if mapped:
+            after_rollback(session, lambda: self._unmap(mapped))
+        if merged.alerts and len(self._stored) > self._prune_at:
+            self._prune(max(alert["first_ts"] for alert in merged.alerts))
+
+    def _settle(self, round_id: int, busy: List[int], stored: bool):
+        """
+        Tell the round's shards whether its write was committed; they drop
+        or roll back its undo.
+        """
+        with self._lock:
+            for shard in busy:
+                if shard < len(self._inboxes):
+                    self._inboxes[shard].put(("settle", round_id, stored))
+
+    def _unmap(self, provisional: List[int]):
+        # Ids of alerts whose insert was rolled back
+        for temporary in provisional:
+            alert_id, _ = self._stored.pop(temporary, (None, None))
+            self._provisional.pop(alert_id, None)
+
+    def _prune(self, now: datetime):
+        # Alerts past every cooldown can no longer be coalesced into
+        longest = timedelta(seconds=max(alert_suppressor.cooldowns.values(), default=0))
+        for temporary, (alert_id, first_ts) in list(self._stored.items()):
+            if now - first_ts >= longest:
+                del self._stored[temporary]
+                self._provisional.pop(alert_id, None)
+        self._prune_at = max(10000, 2 * len(self._stored))
+
+    def zones_changed(self):
+        """
+        A zone was created or changed: workers reload zones before their
+        next batch, with any polygon grids built here since they were last
+        sent.
+        """
+        with self._lock:
+            grids = {key: grid for key, grid in grid_cache.export().items() if key not in self._sent_grids}
+            self._sent_grids.update(grids)
+        self._broadcast(("zones_changed", grids))
+
+    def zone_removed(self, zone_id: int):
+        self._broadcast(("zone_removed", zone_id))
+
+    def apply_zone_states(self, rows: List[dict]):
+        """
+        Zone states committed by a replay, for the owning shards.
+        """
+        self._broadcast(("zone_states", rows))
+
+    def close_alerts(self, alert_ids: Set[int]):
+        """
+        Stop coalescing into these (e.g. acknowledged) alerts.
+        """
+        provisional = {self._provisional.get(alert_id) for alert_id in alert_ids} - {None}
+        if provisional:
+            self._broadcast(("close_alerts", provisional))
+
+    def stats(self) -> dict:
+        return {
+            "shards": self.shards,
+            "alive": sum(1 for process in self._processes if process.is_alive()),
+            "rounds": self.rounds,
+            "points": self.points,
+        }
+
+    def _broadcast(self, message: tuple):
+        with self._lock:
+            for inbox in self._inboxes:
+                inbox.put(message)
+
+    def _collect(self):
+        """
+        Collector thread: hand every reply to the round waiting for it, and
+        fail every waiting round if a worker dies.
+        """
+        outbox = self._outbox
+        while self._collecting.is_set():
+            try:
+                round_id, shard, result, rows, error = outbox.get(timeout=0.5)
+            except queue.Empty:
+                dead = [process.name for process in self._processes if not process.is_alive()]
+                if dead and self._collecting.is_set():
+                    with self._lock:
+                        for pending in self._pending.values():
+                            pending.fail(f"Ingest shard process exited: {', '.join(dead)}")
+                continue
+            with self._lock:
+                pending = self._pending.get(round_id)
+            if pending is not None:
+                pending.add(shard, result, rows, error)
+
+ingest_shards: Optional[IngestShards] = None
+
+def get_ingest_shards() -> Optional[IngestShards]:
+    """
+    The running shard coordinator, or None when ingest runs in-process.
+    """
+    return ingest_shards
+
+def start_ingest_shards(shards: int, database_url: str) -> IngestShards:
+    global ingest_shards
+    ingest_shards = IngestShards(shards, database_url)
+    ingest_shards.start()
+    return ingest_shards
+
+def stop_ingest_shards():
+    global ingest_shards
+    if ingest_shards is not None:
+        ingest_shards.stop()
+        ingest_shards = None
+
+def ingest(points: List[Union[TelemetryPoint, FlatPoint]], session: Session) -> Dict[str, ObjectState]:
+    """
+    Ingest and commit `points`: through the shards when sharded ingest is
+    running, otherwise in-process, evaluating zones on the calling thread
+    and queueing only the writes on the group-commit writer.
+    """
+    shards = ingest_shards
+    if shards is not None:
+        return shards.process_batch(points, session)
+    writer = get_writer()
+    if writer is None:
+        return process_batch(points, session)
+    touched, committed = evaluate_and_submit(points, session, writer)
+    committed.result()
+    return touched
@@ -0,0 +1,223 @@
+import heapq
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import false, insert, update
+from sqlmodel import Session, select
+from src.app.config import settings
+from src.app.db.models import AlertEvent, AlertType
+from src.app.db.session import after_commit
+from src.app.db.writer import run_write
+from src.app.services.state_store import state_store
+from src.app.services.zone_eval import CompiledZone
+from src.app.services.zone_registry import zone_registry
+
+class StaleMonitor:
+    """
+    Raises one STALE alert for every object that stops reporting.
+
+    Each object has a deadline, last_seen + its timeout, kept in a min-heap
+    so a check only looks at the objects that are actually due. Ingest
+    re-arms an object by just recording its new deadline; the heap keeps at
+    most one live entry per object, which is pushed back with the current
+    deadline when it surfaces early. Only a deadline that moves earlier
+    (e.g. the object entered a zone with a shorter timeout) costs a push.
+
+    Once an object's STALE alert has been raised it is not raised again
+    until the object reports, at which point its open STALE alerts are
+    acknowledged.
+    """
+
+    def __init__(self, default_timeout_s: float, category_timeouts: Dict[str, float]):
+        self.default_timeout_s = default_timeout_s
+        self.category_timeouts = category_timeouts
+        self._lock = threading.Lock()
+        self._heap: List[Tuple[float, str]] = []
+        # object_id -> (deadline, timeout_s, zone_id, last_seen)
+        self._deadlines: Dict[str, Tuple[float, float, Optional[int], datetime]] = {}
+        # object_id -> deadline of its entry in the heap
+        self._queued: Dict[str, float] = {}
+        self._stale: Set[str] = set()
+        self._recovered: Set[str] = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.alerts_raised = 0
+
+    def timeout_for(self, category: Optional[str], zones: Iterable[CompiledZone]) -> Tuple[float, Optional[int]]:
+        """
+        The shortest of the category's (or the default) timeout and the
+        timeouts of the zones the object is inside, with the zone that set
+        it (None when no zone did).
+        """
+        timeout = self.category_timeouts.get(category, self.default_timeout_s) if category else self.default_timeout_s
+        zone_id = None
+        for zone in zones:
+            if zone.stale_timeout_s is not None and zone.stale_timeout_s < timeout:
+                timeout, zone_id = zone.stale_timeout_s, zone.id
+        return timeout, zone_id
+
+    def touch(self, object_id: str, last_seen: datetime, timeout_s: float, zone_id: Optional[int] = None):
+        """
+        Re-arm `object_id` after it reported.
+        """
+        deadline = last_seen.timestamp() + timeout_s
+        with self._lock:
+            self._deadlines[object_id] = (deadline, timeout_s, zone_id, last_seen)
+            if object_id in self._stale:
+                self._stale.discard(object_id)
+                self._recovered.add(object_id)
+            queued = self._queued.get(object_id)
+            if queued is None or deadline < queued:
+                heapq.heappush(self._heap, (deadline, object_id))
+                self._queued[object_id] = deadline
+
+    def forget(self, object_id: str):
+        """
+        Stop watching `object_id`, e.g. an object whose first report was
+        never stored.
+        """
+        with self._lock:
+            self._deadlines.pop(object_id, None)
+            self._queued.pop(object_id, None)
+            self._stale.discard(object_id)
+            self._recovered.discard(object_id)
+
+    def rebuild(self, entries: Iterable[Tuple[str, datetime, float, Optional[int]]], stale: Iterable[str]):
+        """
+        Replace all deadlines, e.g. at startup from every object's
+        last_seen. Objects in `stale` already have an open STALE alert.
+        """
+        with self._lock:
+            self._deadlines = {
+                object_id: (last_seen.timestamp() + timeout_s, timeout_s, zone_id, last_seen)
+                for object_id, last_seen, timeout_s, zone_id in entries
+            }
+            self._heap = [(entry[0], object_id) for object_id, entry in self._deadlines.items()]
+            heapq.heapify(self._heap)
+            self._queued = {object_id: deadline for deadline, object_id in self._heap}
+            self._stale = set(stale) & self._deadlines.keys()
+            self._recovered = set()
+
+    def reset(self):
+        self.rebuild([], [])
+
+    def due(self, now: float) -> List[Tuple[str, float, Optional[int], datetime]]:
+        """
+        Pop every object whose deadline has passed at `now` (epoch seconds)
+        and that is not already stale, marking it stale.
+        """
+        expired = []
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                deadline, object_id = heapq.heappop(heap)
+                if self._queued.get(object_id) != deadline:
+                    continue  # superseded by an earlier push
+                del self._queued[object_id]
+                current = self._deadlines.get(object_id)
+                if current is None or object_id in self._stale:
+                    continue
+                if current[0] > now:
+                    # Reported since this entry was pushed
+                    heapq.heappush(heap, (current[0], object_id))
+                    self._queued[object_id] = current[0]
+                    continue
+                self._stale.add(object_id)
+                expired.append((object_id, current[1], current[2], current[3]))
+        return expired
+
+    def check(self, engine, now: Optional[datetime] = None) -> int:
+        """
+        Raise STALE alerts for every object that is due and acknowledge the
+        alerts of objects that have reported again. Returns the number of
+        alerts raised.
+        """
+        # ingestion re-arms objects through this module
+        from src.app.services.ingestion import _alert_row, _publish
+
+        now = now or datetime.now(timezone.utc)
+        expired = self.due(now.timestamp())
+        with self._lock:
+            recovered, self._recovered = self._recovered, set()
+        if not expired and not recovered:
+            return 0
+
+        alerts = [
+            _alert_row(object_id, zone_id, AlertType.STALE,
+                       f"Object {object_id} silent for {timeout_s:g}s (last seen {last_seen:%Y-%m-%d %H:%M:%S} UTC)")
+            for object_id, timeout_s, zone_id, last_seen in expired
+        ]
+
+        def write(s: Session):
+            if alerts:
+                ids = s.execute(
+                    insert(AlertEvent).returning(AlertEvent.id, sort_by_parameter_order=True), alerts
+                ).scalars().all()
+                for alert, alert_id in zip(alerts, ids):
+                    alert["id"] = alert_id
+                after_commit(s, lambda: _publish([], {}, alerts))
+            # After the insert, so an object that reported while its alert
+            # was being raised does not keep an open one
+            if recovered:
+                s.execute(update(AlertEvent).where(
+                    AlertEvent.object_id.in_(recovered),
+                    AlertEvent.alert_type == AlertType.STALE,
+                    AlertEvent.ack == false(),
+                ).values(ack=True))
+
+        with Session(engine) as session:
+            run_write(write, session)
+        self.alerts_raised += len(alerts)
+        return len(alerts)
+
+    def load(self, session: Session, now: Optional[datetime] = None):
+        """
+        Rebuild the deadlines from the state store (every object's
+        last_seen, category and current zones) and the STALE alerts already
+        raised, acknowledged or not. Objects already past their deadline at
+        `now` count as stale without an alert, so a restart (or the first
+        start with stored objects) does not raise one for every object
+        that went silent while the server was down.
+        """
+        now = (now or datetime.now(timezone.utc)).timestamp()
+        state_store.ensure_loaded(session)
+        zones = zone_registry.snapshot(session).by_id
+        entries = []
+        with state_store.lock:
+            for obj in state_store.objects.values():
+                inside = [zones[zone_id] for zone_id in state_store.inside.get(obj.id, ()) if zone_id in zones]
+                timeout_s, zone_id = self.timeout_for(obj.category, inside)
+                entries.append((obj.id, obj.last_seen, timeout_s, zone_id))
+        last_seen = {object_id: seen.replace(tzinfo=None) for object_id, seen, _, _ in entries}
+        raised = session.exec(
+            select(AlertEvent.object_id, AlertEvent.ts).where(AlertEvent.alert_type == AlertType.STALE)
+        ).all()
+        stale = {object_id for object_id, ts in raised
+                 if object_id in last_seen and ts.replace(tzinfo=None) >= last_seen[object_id]}
+        stale.update(object_id for object_id, seen, timeout_s, _ in entries if seen.timestamp() + timeout_s <= now)
+        self.rebuild(entries, stale)
+
+    def start(self, engine, interval_s: float):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(engine, interval_s), name="stale-monitor", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self, engine, interval_s: float):
+        while not self._stop.wait(timeout=interval_s):
+            try:
+                self.check(engine)
+            except Exception as e:
+                print(f"Stale check failed: {e}")
+
+stale_monitor = StaleMonitor(settings.stale_timeout_s, settings.stale_timeouts_by_category)
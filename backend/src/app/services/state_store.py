@@ -0,0 +1,400 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+from src.app.db.models import TrackedObject, ObjectZoneState
+from src.app.db.session import after_rollback
+from src.app.db.writer import get_writer
+
+def _as_utc(ts: datetime) -> datetime:
+    # SQLite hands datetimes back naive; everything in memory is UTC-aware
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts
+
+class ObjectState:
+    """
+    In-memory counterpart of a TrackedObject row.
+    """
+    __slots__ = ("id", "last_seen", "last_lat", "last_lon", "last_confidence",
+                 "speed_mps", "heading_deg", "battery_pct", "category")
+
+    def __init__(self, id: str, last_seen: datetime, last_lat: float, last_lon: float, last_confidence: float,
+                 speed_mps: Optional[float] = None, heading_deg: Optional[float] = None,
+                 battery_pct: Optional[float] = None, category: Optional[str] = None):
+        self.id = id
+        self.last_seen = last_seen
+        self.last_lat = last_lat
+        self.last_lon = last_lon
+        self.last_confidence = last_confidence
+        self.speed_mps = speed_mps
+        self.heading_deg = heading_deg
+        self.battery_pct = battery_pct
+        self.category = category
+
+    def to_row(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def to_model(self) -> TrackedObject:
+        return TrackedObject(**self.to_row())
+
+class ZoneState:
+    """
+    In-memory counterpart of an ObjectZoneState row.
+    """
+    __slots__ = ("object_id", "zone_id", "is_inside", "last_updated")
+
+    def __init__(self, object_id: str, zone_id: int, is_inside: bool, last_updated: datetime):
+        self.object_id = object_id
+        self.zone_id = zone_id
+        self.is_inside = is_inside
+        self.last_updated = last_updated
+
+    def to_row(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class StateStore:
+    """
+    Authoritative in-memory object and object/zone state.
+
+    Loaded from the database once; ingest reads and mutates it under `lock`
+    and marks entries dirty. Dirty entries are written back in batches by
+    `flush()`, either from the background flusher (every
+    `state_flush_interval_s`, or sooner once `state_flush_max_dirty` entries
+    are pending) or explicitly, e.g. on shutdown.
+
+    An ingest batch holds the objects it changed until its own write has
+    committed; flushes leave held objects (and their zone states) dirty,
+    so state is never persisted ahead of the history and alerts it came
+    from, and a batch that fails can be put back.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.objects: Dict[str, ObjectState] = {}
+        self.zone_states: Dict[Tuple[str, int], ZoneState] = {}
+        # object_id -> zone ids the object is currently inside
+        self.inside: Dict[str, Set[int]] = {}
+        self._dirty_objects: Set[str] = set()
+        self._dirty_zone_states: Set[Tuple[str, int]] = set()
+        # object_id -> uncommitted batches that changed it
+        self._held: Dict[str, int] = {}
+        # Change sequence for incremental listings: object_id -> seq of its
+        # last change, kept in seq order (an update moves the key to the end)
+        self.seq = 0
+        self.epoch = time.time_ns()
+        self._changes: Dict[str, int] = {}
+        self._loaded = False
+        self._flush_lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    # --- Loading ---
+
+    def load(self, session: Session, keep: Optional[Callable[[str], bool]] = None):
+        """
+        Replace the in-memory state with the contents of the database, or
+        with the objects for which `keep(object_id)` is true (an ingest
+        shard's own objects).
+        """
+        keep = keep or (lambda object_id: True)
+        with self.lock:
+            self.objects = {
+                obj.id: ObjectState(
+                    id=obj.id,
+                    last_seen=_as_utc(obj.last_seen),
+                    last_lat=obj.last_lat,
+                    last_lon=obj.last_lon,
+                    last_confidence=obj.last_confidence,
+                    speed_mps=obj.speed_mps,
+                    heading_deg=obj.heading_deg,
+                    battery_pct=obj.battery_pct,
+                    category=obj.category,
+                )
+                for obj in session.exec(select(TrackedObject)) if keep(obj.id)
+            }
+            self.zone_states = {}
+            self.inside = {}
+            for row in session.exec(select(ObjectZoneState)):
+                if not keep(row.object_id):
+                    continue
+                self.zone_states[(row.object_id, row.zone_id)] = ZoneState(
+                    row.object_id, row.zone_id, row.is_inside, _as_utc(row.last_updated)
+                )
+                if row.is_inside:
+                    self.inside.setdefault(row.object_id, set()).add(row.zone_id)
+            self._dirty_objects.clear()
+            self._dirty_zone_states.clear()
+            self._held.clear()
+            self._reset_changes()
+            self._loaded = True
+
+    def ensure_loaded(self, session: Session):
+        if not self._loaded:
+            with self.lock:
+                if not self._loaded:
+                    self.load(session)
+
+    def reset(self):
+        """
+        Forget everything (including unflushed changes); the next
+        ensure_loaded() reloads from the database.
+        """
+        with self.lock:
+            self.objects = {}
+            self.zone_states = {}
+            self.inside = {}
+            self._dirty_objects.clear()
+            self._dirty_zone_states.clear()
+            self._held.clear()
+            self._reset_changes()
+            self._loaded = False
+
+    # --- Mutation (callers hold `lock`) ---
+
+    def put_object(self, obj: ObjectState):
+        self.objects[obj.id] = obj
+        self.mark_object_dirty(obj.id)
+
+    def mark_object_dirty(self, object_id: str):
+        self._dirty_objects.add(object_id)
+        self.seq += 1
+        self._changes.pop(object_id, None)
+        self._changes[object_id] = self.seq
+
+    def set_zone_state(self, object_id: str, zone_id: int, is_inside: bool, ts: datetime) -> ZoneState:
+        key = (object_id, zone_id)
+        state = self.zone_states.get(key)
+        if state is None:
+            state = ZoneState(object_id, zone_id, is_inside, ts)
+            self.zone_states[key] = state
+        else:
+            state.is_inside = is_inside
+            state.last_updated = ts
+        inside = self.inside.setdefault(object_id, set())
+        if is_inside:
+            inside.add(zone_id)
+        else:
+            inside.discard(zone_id)
+        self._dirty_zone_states.add(key)
+        return state
+
+    def restore_object(self, object_id: str, prior: Optional[ObjectState]):
+        """
+        Put back an object as it was before a failed batch (None: it did
+        not exist).
+        """
+        if prior is None:
+            self.objects.pop(object_id, None)
+        else:
+            self.objects[object_id] = prior
+        self.mark_object_dirty(object_id)
+
+    def restore_zone_state(self, object_id: str, zone_id: int, prior: Optional[ZoneState]):
+        if prior is not None:
+            self.set_zone_state(object_id, zone_id, prior.is_inside, prior.last_updated)
+            return
+        key = (object_id, zone_id)
+        self.zone_states.pop(key, None)
+        self._dirty_zone_states.discard(key)
+        inside = self.inside.get(object_id)
+        if inside is not None:
+            inside.discard(zone_id)
+
+    def hold(self, object_ids: Iterable[str]):
+        """
+        Keep these objects' state out of flushes until release().
+        """
+        for object_id in object_ids:
+            self._held[object_id] = self._held.get(object_id, 0) + 1
+
+    def release(self, object_ids: Iterable[str]):
+        with self.lock:
+            for object_id in object_ids:
+                count = self._held.get(object_id, 0) - 1
+                if count > 0:
+                    self._held[object_id] = count
+                else:
+                    self._held.pop(object_id, None)
+
+    def change_seq(self, object_id: str) -> Optional[int]:
+        return self._changes.get(object_id)
+
+    def merge(self, objects: Iterable[ObjectState], zone_state_rows: Iterable[dict]):
+        """
+        Adopt state computed elsewhere (by an ingest shard's worker
+        process) and mark it dirty for write-behind.
+        """
+        for obj in objects:
+            self.put_object(obj)
+        for row in zone_state_rows:
+            self.set_zone_state(row["object_id"], row["zone_id"], row["is_inside"], row["last_updated"])
+
+    def apply_zone_states(self, rows: Iterable[dict]):
+        """
+        Apply zone state rows (e.g. from a replay) except where a newer
+        state is already recorded for that object and zone.
+        """
+        with self.lock:
+            for row in rows:
+                current = self.zone_states.get((row["object_id"], row["zone_id"]))
+                last_updated = _as_utc(row["last_updated"])
+                if current is not None and current.last_updated >= last_updated:
+                    continue
+                self.set_zone_state(row["object_id"], row["zone_id"], row["is_inside"], last_updated)
+
+    def take_dirty(self) -> Tuple[List[dict], List[dict]]:
+        """
+        Rows for every dirty object and zone state not held by an
+        uncommitted batch, which are then no longer dirty.
+        """
+        with self.lock:
+            held = self._held
+            objects = [i for i in self._dirty_objects if i not in held]
+            states = [k for k in self._dirty_zone_states if k[0] not in held]
+            object_rows = [self.objects[i].to_row() for i in objects if i in self.objects]
+            state_rows = [self.zone_states[k].to_row() for k in states if k in self.zone_states]
+            if held:
+                self._dirty_objects.difference_update(objects)
+                self._dirty_zone_states.difference_update(states)
+            else:
+                self._dirty_objects.clear()
+                self._dirty_zone_states.clear()
+        return object_rows, state_rows
+
+    def restore_dirty(self, object_rows: List[dict], state_rows: List[dict]):
+        """
+        Mark the entries of rows that were taken but never committed dirty
+        again, so the next flush retries them.
+        """
+        with self.lock:
+            self._dirty_objects.update(row["id"] for row in object_rows)
+            self._dirty_zone_states.update((row["object_id"], row["zone_id"]) for row in state_rows)
+
+    def remove_zone(self, zone_id: int):
+        """
+        Drop every state for a deleted zone so a later flush cannot
+        resurrect its rows.
+        """
+        with self._flush_lock, self.lock:
+            for key in [key for key in self.zone_states if key[1] == zone_id]:
+                del self.zone_states[key]
+                self._dirty_zone_states.discard(key)
+            for zone_ids in self.inside.values():
+                zone_ids.discard(zone_id)
+
+    # --- Change tracking (callers hold `lock`) ---
+
+    @property
+    def cursor(self) -> str:
+        return f"{self.epoch}-{self.seq}"
+
+    def changed_since(self, cursor: str) -> Optional[List[str]]:
+        """
+        Ids of objects changed after `cursor`, newest change first, in
+        O(changes) by walking the change log from its end. Ids no longer in
+        `objects` are tombstones. None if the cursor is not from this epoch
+        (e.g. issued before a restart).
+        """
+        epoch, _, seq = cursor.partition("-")
+        if epoch != str(self.epoch) or not seq.isdigit() or int(seq) > self.seq:
+            return None
+        since = int(seq)
+        changed = []
+        for object_id in reversed(self._changes):
+            if self._changes[object_id] <= since:
+                break
+            changed.append(object_id)
+        return changed
+
+    def _reset_changes(self):
+        self.seq = 0
+        self.epoch = time.time_ns()
+        self._changes = {object_id: 0 for object_id in self.objects}
+
+    @property
+    def dirty_count(self) -> int:
+        return len(self._dirty_objects) + len(self._dirty_zone_states)
+
+    # --- Write-behind ---
+
+    def flush(self, session: Session, commit: bool = True) -> int:
+        """
+        Upsert all dirty entries in one transaction. Returns the number of
+        rows written. Pass commit=False when the caller commits; the keys
+        are marked dirty again if that commit fails (see after_rollback).
+        """
+        with self._flush_lock:
+            object_rows, state_rows = self.take_dirty()
+            if not object_rows and not state_rows:
+                return 0
+            try:
+                if object_rows:
+                    session.execute(_upsert(TrackedObject, ["id"]), object_rows)
+                if state_rows:
+                    session.execute(_upsert(ObjectZoneState, ["object_id", "zone_id"]), state_rows)
+                if commit:
+                    session.commit()
+            except Exception:
+                if commit:
+                    session.rollback()
+                # Put the keys back so the next flush retries them
+                self.restore_dirty(object_rows, state_rows)
+                raise
+            if not commit:
+                after_rollback(session, lambda: self.restore_dirty(object_rows, state_rows))
+            return len(object_rows) + len(state_rows)
+
+    def request_flush(self):
+        """
+        Ask the background flusher to run now instead of waiting for the
+        next interval.
+        """
+        self._flush_requested.set()
+
+    def start_flusher(self, engine, interval_s: float):
+        if self._flusher is not None:
+            return
+        self._stop.clear()
+        self._flusher = threading.Thread(
+            target=self._run_flusher, args=(engine, interval_s), name="state-flusher", daemon=True
+        )
+        self._flusher.start()
+
+    def stop_flusher(self, engine):
+        """
+        Stop the background flusher and write out anything still dirty.
+        """
+        if self._flusher is not None:
+            self._stop.set()
+            self._flush_requested.set()
+            self._flusher.join()
+            self._flusher = None
+        self._flush_via_writer(engine)
+
+    def _flush_via_writer(self, engine):
+        writer = get_writer()
+        if writer is not None:
+            writer.run(lambda session: self.flush(session, commit=False))
+            return
+        with Session(engine) as session:
+            self.flush(session)
+
+    def _run_flusher(self, engine, interval_s: float):
+        while not self._stop.is_set():
+            self._flush_requested.wait(timeout=interval_s)
+            self._flush_requested.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self._flush_via_writer(engine)
+            except Exception as e:
+                print(f"State flush failed: {e}")
+
+def _upsert(model, keys: List[str]):
+    stmt = sqlite_insert(model)
+    columns = [c.name for c in model.__table__.columns if c.name not in keys]
+    return stmt.on_conflict_do_update(index_elements=keys, set_={c: stmt.excluded[c] for c in columns})
+
+state_store = StateStore()
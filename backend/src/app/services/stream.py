@@ -0,0 +1,198 @@
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Set, Tuple
+
+# (min_lon, min_lat, max_lon, max_lat), same order as a GeoJSON bbox
+BBox = Tuple[float, float, float, float]
+
+def object_payload(obj) -> dict:
+    """
+    JSON shape of an object update: the TrackedObject model, serialized as
+    GET /api/objects serializes it.
+    """
+    return obj.to_model().model_dump(mode="json")
+
+def _iso(ts: Optional[datetime]) -> Optional[str]:
+    # Rows read back from SQLite are naive UTC
+    if ts is None:
+        return None
+    return (ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)).isoformat()
+
+def alert_payload(alert: dict) -> dict:
+    """
+    JSON shape of an alert row; matches the AlertEvent API model.
+    """
+    return {
+        "id": alert.get("id"),
+        "ts": _iso(alert["ts"]),
+        "object_id": alert["object_id"],
+        "zone_id": alert["zone_id"],
+        "alert_type": alert["alert_type"].value,
+        "message": alert["message"],
+        "ack": alert["ack"],
+        "occurrences": alert.get("occurrences", 1),
+        "first_ts": _iso(alert.get("first_ts")),
+        "last_ts": _iso(alert.get("last_ts")),
+    }
+
+def parse_bbox(value: Optional[str]) -> Optional[BBox]:
+    """
+    Parse a "min_lon,min_lat,max_lon,max_lat" viewport, as taken by both
+    /ws/stream and /api/objects. Raises ValueError when malformed.
+    """
+    if not value:
+        return None
+    parts = [float(p) for p in value.split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+    min_lon, min_lat, max_lon, max_lat = parts
+    if min_lon > max_lon or min_lat > max_lat:
+        raise ValueError("bbox minimums must not exceed maximums")
+    return (min_lon, min_lat, max_lon, max_lat)
+
+def in_bbox(bbox: Optional[BBox], lat: float, lon: float) -> bool:
+    return bbox is None or (bbox[0] <= lon <= bbox[2] and bbox[1] <= lat <= bbox[3])
+
+class StreamClient:
+    """
+    Per-connection outbox.
+
+    Object updates and updates to stored alerts (repeats coalesced into
+    them) are coalesced by id, only the latest state being kept, and new
+    alerts are queued; all are bounded by `max_pending`, dropping the
+    oldest entries first, so a slow consumer costs memory but never blocks
+    ingest.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_fps: float, bbox: Optional[BBox], max_pending: int,
+                 objects: bool = True, alerts: bool = True):
+        self.loop = loop
+        self.max_fps = max_fps
+        self.bbox = bbox
+        self.max_pending = max_pending
+        self.wants_objects = objects
+        self.wants_alerts = alerts
+        self.wake = asyncio.Event()
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._objects: "OrderedDict[str, dict]" = OrderedDict()
+        self._removed: Set[str] = set()
+        self._visible: Set[str] = set()
+        self._alerts: deque = deque()
+        self._alert_updates: "OrderedDict[int, dict]" = OrderedDict()
+
+    def set_bbox(self, bbox: Optional[BBox]):
+        with self._lock:
+            self.bbox = bbox
+
+    def offer(self, objects: List[dict], alerts: List[dict], alert_updates: List[dict] = ()):
+        if not self.wants_objects:
+            objects = []
+        if not self.wants_alerts:
+            alerts, alert_updates = [], []
+        if not objects and not alerts and not alert_updates:
+            return
+        with self._lock:
+            for obj in objects:
+                object_id = obj["id"]
+                if in_bbox(self.bbox, obj["last_lat"], obj["last_lon"]):
+                    self._objects.pop(object_id, None)
+                    self._objects[object_id] = obj
+                    self._removed.discard(object_id)
+                    self._visible.add(object_id)
+                elif object_id in self._visible:
+                    # Left the viewport: tell the client to drop it
+                    self._objects.pop(object_id, None)
+                    self._visible.discard(object_id)
+                    self._removed.add(object_id)
+            while len(self._objects) > self.max_pending:
+                self._objects.popitem(last=False)
+                self.dropped += 1
+            for alert in alerts:
+                if len(self._alerts) >= self.max_pending:
+                    self._alerts.popleft()
+                    self.dropped += 1
+                self._alerts.append(alert)
+            for alert in alert_updates:
+                self._alert_updates.pop(alert["id"], None)
+                self._alert_updates[alert["id"]] = alert
+            while len(self._alert_updates) > self.max_pending:
+                self._alert_updates.popitem(last=False)
+                self.dropped += 1
+        self.loop.call_soon_threadsafe(self.wake.set)
+
+    def take_frame(self) -> Optional[dict]:
+        """
+        Everything pending as one frame, or None if there is nothing to send.
+        """
+        with self._lock:
+            if not self._objects and not self._removed and not self._alerts and not self._alert_updates:
+                return None
+            frame = {
+                "type": "update",
+                "objects": list(self._objects.values()),
+                "removed": sorted(self._removed),
+                "alerts": list(self._alerts),
+                "alert_updates": list(self._alert_updates.values()),
+                "dropped": self.dropped,
+            }
+            self._objects.clear()
+            self._removed.clear()
+            self._alerts.clear()
+            self._alert_updates.clear()
+            self.dropped = 0
+            return frame
+
+    def snapshot_frame(self, objects: Iterable[dict]) -> dict:
+        """
+        Initial (or post-viewport-change) frame with every visible object.
+        """
+        with self._lock:
+            if not self.wants_objects:
+                objects = []
+            visible = [obj for obj in objects if in_bbox(self.bbox, obj["last_lat"], obj["last_lon"])]
+            self._objects.clear()
+            self._removed.clear()
+            self._visible = {obj["id"] for obj in visible}
+            return {"type": "snapshot", "objects": visible}
+
+class StreamHub:
+    """
+    Fan-out of ingest results to connected WebSocket clients. `publish` is
+    called from ingest threads and only touches client outboxes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Set[StreamClient] = set()
+        self.frames_sent = 0
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    def add(self, client: StreamClient):
+        with self._lock:
+            self._clients = self._clients | {client}
+
+    def remove(self, client: StreamClient):
+        with self._lock:
+            self._clients = self._clients - {client}
+
+    def publish(self, objects: Iterable, alerts: List[dict], alert_updates: List[dict] = ()):
+        """
+        Offer committed results to every client: changed objects, new alert
+        rows and stored alert rows whose occurrences or last_ts changed.
+        """
+        clients = self._clients
+        if not clients:
+            return
+        object_rows = [object_payload(obj) for obj in objects]
+        alert_rows = [alert_payload(alert) for alert in alerts]
+        update_rows = [alert_payload(alert) for alert in alert_updates]
+        for client in clients:
+            client.offer(object_rows, alert_rows, update_rows)
+
+stream_hub = StreamHub()
@@ -0,0 +1,150 @@
+import bisect
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func
+from sqlmodel import Session, select
+from src.app.config import settings
+from src.app.db.models import TelemetryRecord
+
+TRAIL_FIELDS = ("object_id", "ts", "lat", "lon", "alt_m", "speed_mps", "heading_deg", "battery_pct")
+
+def _as_utc(ts: datetime) -> datetime:
+    return ts.replace(tzinfo=timezone.utc) if ts.tzinfo is None else ts
+
+def windowed_trails(session: Session, n: int, object_ids: Optional[List[str]] = None) -> Dict[str, List[dict]]:
+    """
+    Last `n` history records per object in one windowed query, oldest first.
+    """
+    rank = func.row_number().over(
+        partition_by=TelemetryRecord.object_id,
+        order_by=TelemetryRecord.ts.desc(),
+    ).label("rank")
+    inner = select(TelemetryRecord, rank)
+    if object_ids:
+        inner = inner.where(TelemetryRecord.object_id.in_(object_ids))
+    ranked = inner.subquery()
+    statement = (
+        select(*[ranked.c[name] for name in TRAIL_FIELDS])
+        .where(ranked.c.rank <= n)
+        .order_by(ranked.c.object_id, ranked.c.ts)
+    )
+    trails: Dict[str, List[dict]] = {}
+    for row in session.execute(statement):
+        point = dict(zip(TRAIL_FIELDS, row))
+        point["ts"] = _as_utc(point["ts"])
+        trails.setdefault(point["object_id"], []).append(point)
+    return trails
+
+class TrailBuffer:
+    """
+    Ring buffer of the most recent history points per object, kept up to
+    date by ingest so trail requests never touch the database.
+
+    Every appended point gets a sequence number; a cursor ("<epoch>-<seq>")
+    lets clients ask only for points added since their last request. The
+    epoch changes whenever the buffer is (re)loaded, which invalidates old
+    cursors.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        # object_id -> deque of (seq, point) ordered by point ts
+        self._trails: Dict[str, deque] = {}
+        self._seq = 0
+        self._epoch = 0
+        self._loaded = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def cursor(self) -> str:
+        return f"{self._epoch}-{self._seq}"
+
+    def load(self, session: Session):
+        trails = windowed_trails(session, self.capacity)
+        with self._lock:
+            self._epoch = time.time_ns()
+            self._seq = 0
+            self._trails = {}
+            for object_id, points in trails.items():
+                ring = deque(maxlen=self.capacity)
+                for point in points:
+                    self._seq += 1
+                    ring.append((self._seq, point))
+                self._trails[object_id] = ring
+            self._loaded = True
+
+    def ensure_loaded(self, session: Session):
+        if not self._loaded:
+            self.load(session)
+
+    def reset(self):
+        with self._lock:
+            self._trails = {}
+            self._seq = 0
+            self._loaded = False
+
+    def append(self, records: Iterable[dict]):
+        """
+        Add freshly ingested history records.
+        """
+        with self._lock:
+            for record in records:
+                point = {name: record[name] for name in TRAIL_FIELDS}
+                ring = self._trails.get(point["object_id"])
+                if ring is None:
+                    ring = self._trails[point["object_id"]] = deque(maxlen=self.capacity)
+                self._seq += 1
+                if not ring or ring[-1][1]["ts"] <= point["ts"]:
+                    ring.append((self._seq, point))
+                    continue
+                # Late point: keep the ring in timestamp order
+                if len(ring) == ring.maxlen and point["ts"] < ring[0][1]["ts"]:
+                    continue
+                entries = list(ring)
+                index = bisect.bisect_right([entry[1]["ts"] for entry in entries], point["ts"])
+                entries.insert(index, (self._seq, point))
+                ring.clear()
+                ring.extend(entries[-ring.maxlen:])
+
+    def trails(self, n: int, since: Optional[str] = None,
+               object_ids: Optional[List[str]] = None) -> Tuple[Dict[str, List[dict]], str, bool]:
+        """
+        Up to `n` latest points per object, oldest first.
+
+        Returns (trails, cursor, reset). With a valid `since` cursor only
+        points added after it are returned; `reset` is True when `since` was
+        given but no longer valid, in which case full trails are returned.
+        A late point is returned after its cursor like any other, so clients
+        merge deltas by ts rather than appending them.
+        """
+        since_seq = None
+        reset = False
+        if since:
+            epoch, _, seq = since.partition("-")
+            if epoch == str(self._epoch) and seq.isdigit():
+                since_seq = int(seq)
+            else:
+                reset = True
+
+        with self._lock:
+            keys = object_ids if object_ids else list(self._trails)
+            result: Dict[str, List[dict]] = {}
+            for object_id in keys:
+                ring = self._trails.get(object_id)
+                if not ring:
+                    continue
+                entries = list(ring)[-n:]
+                if since_seq is not None:
+                    entries = [entry for entry in entries if entry[0] > since_seq]
+                if entries:
+                    result[object_id] = [point for _, point in entries]
+            return result, self.cursor, reset
+
+trail_buffer = TrailBuffer(settings.trail_buffer_size)
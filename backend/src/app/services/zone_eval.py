@@ -1,6 +1,11 @@
 import json
-from shapely.geometry import Point, Polygon
+from typing import List, Optional, Sequence, Tuple, Union
+import numpy as np
+import shapely
+from shapely.geometry import LineString, Point, Polygon
+from src.app.config import settings
 from src.app.db.models import TelemetryPoint, Zone
+from src.app.services.polygon_grid import PolygonGrid, grid_cache
 
 def is_point_in_zone(point: TelemetryPoint, zone: Zone) -> bool:
     """
@@ -32,3 +37,149 @@ def is_point_in_zone(point: TelemetryPoint, zone: Zone) -> bool:
         zone.min_lat <= lat <= zone.max_lat and
         zone.min_lon <= lon <= zone.max_lon
     )
+
+class CompiledZone:
+    """
+    A zone with its geometry parsed and prepared once, ready for repeated
+    point tests. Matches `is_point_in_zone` exactly: polygons use Shapely
+    `contains` (boundary excluded), BBOX zones are edge-inclusive, and a zone
+    with unusable geometry never matches. Polygons with at least
+    settings.polygon_grid_min_vertices vertices also get a PolygonGrid from
+    the shared grid cache (unless gridding them is too costly), which
+    answers the same test without walking every edge.
+    """
+    __slots__ = ("id", "name", "enabled", "stale_timeout_s", "is_polygon", "bbox", "polygon", "grid")
+
+    def __init__(self, zone: Zone):
+        self.id = zone.id
+        self.name = zone.name
+        self.enabled = zone.enabled
+        self.stale_timeout_s = zone.stale_timeout_s
+        self.is_polygon = False
+        # (min_lat, min_lon, max_lat, max_lon), or None if the zone can never match
+        self.bbox: Optional[Tuple[float, float, float, float]] = None
+        self.polygon: Optional[Polygon] = None
+        self.grid: Optional[PolygonGrid] = None
+
+        if zone.is_polygon and zone.polygon_coords:
+            self.is_polygon = True
+            try:
+                coords = json.loads(zone.polygon_coords)
+                poly = Polygon([(c[1], c[0]) for c in coords])
+                shapely.prepare(poly)
+                # Run one predicate so GEOS builds its prepared index now rather
+                # than lazily inside a concurrent ingest.
+                shapely.contains_xy(poly, 0.0, 0.0)
+            except Exception as e:
+                print(f"Error compiling polygon for zone {zone.id}: {e}")
+                return
+            if poly.is_empty:
+                return
+            min_lon, min_lat, max_lon, max_lat = poly.bounds
+            self.polygon = poly
+            self.bbox = (min_lat, min_lon, max_lat, max_lon)
+            if len(coords) >= settings.polygon_grid_min_vertices:
+                self.grid = grid_cache.get(poly)
+            return
+
+        if zone.min_lat is None or zone.min_lon is None or \
+           zone.max_lat is None or zone.max_lon is None:
+            return
+        self.bbox = (zone.min_lat, zone.min_lon, zone.max_lat, zone.max_lon)
+
+    def contains(self, lat: float, lon: float) -> bool:
+        bbox = self.bbox
+        if bbox is None:
+            return False
+        if not (bbox[0] <= lat <= bbox[2] and bbox[1] <= lon <= bbox[3]):
+            return False
+        if self.polygon is None:
+            return True
+        if self.grid is not None:
+            return self.grid.contains(lon, lat)
+        return bool(shapely.contains_xy(self.polygon, lon, lat))
+
+    def segment_intervals(self, lat0: float, lon0: float, lat1: float, lon1: float) -> List[Tuple[float, float]]:
+        """
+        The parts of the segment (lat0, lon0) -> (lat1, lon1) that lie in the
+        zone (boundary included), as sorted, disjoint (start, end) fractions
+        of the way along it. Parts that only touch the zone at a point are
+        left out.
+        """
+        bbox = self.bbox
+        if bbox is None:
+            return []
+        if self.polygon is None:
+            return _clip_to_bbox(bbox, lat0, lon0, lat1, lon1)
+        line = LineString([(lon0, lat0), (lon1, lat1)])
+        if not shapely.intersects(line, self.polygon):
+            return []
+        intervals = []
+        for part in shapely.get_parts(shapely.intersection(line, self.polygon)):
+            if part.geom_type != "LineString" or part.length == 0:
+                continue
+            coords = part.coords
+            a = line.project(Point(coords[0]), normalized=True)
+            b = line.project(Point(coords[-1]), normalized=True)
+            intervals.append((min(a, b), max(a, b)))
+        intervals.sort()
+        return intervals
+
+def _clip_to_bbox(bbox: Tuple[float, float, float, float], lat0: float, lon0: float,
+                  lat1: float, lon1: float) -> List[Tuple[float, float]]:
+    """
+    Liang-Barsky clipping of a segment to an edge-inclusive bbox.
+    """
+    t0, t1 = 0.0, 1.0
+    for start, delta, low, high in ((lat0, lat1 - lat0, bbox[0], bbox[2]), (lon0, lon1 - lon0, bbox[1], bbox[3])):
+        if delta == 0:
+            if not low <= start <= high:
+                return []
+            continue
+        a = (low - start) / delta
+        b = (high - start) / delta
+        t0 = max(t0, min(a, b))
+        t1 = min(t1, max(a, b))
+    return [(t0, t1)] if t0 < t1 else []
+
+def points_in_zones(lats, lons, zones: Sequence[Union[Zone, CompiledZone]]) -> np.ndarray:
+    """
+    Evaluate many points against many zones at once.
+
+    Returns a boolean matrix of shape (len(lats), len(zones)) where entry
+    [i, j] is `is_point_in_zone` for point i and zone j. BBOX zones are
+    tested with NumPy comparisons (edges inclusive); polygon zones use
+    Shapely's vectorized `contains_xy` (or their PolygonGrid) on the points
+    inside their bbox.
+    """
+    lats = np.asarray(lats, dtype=np.float64).reshape(-1)
+    lons = np.asarray(lons, dtype=np.float64).reshape(-1)
+    compiled = [z if isinstance(z, CompiledZone) else CompiledZone(z) for z in zones]
+    result = np.zeros((lats.size, len(compiled)), dtype=bool)
+    if lats.size == 0 or not compiled:
+        return result
+
+    usable = [j for j, z in enumerate(compiled) if z.bbox is not None]
+    if not usable:
+        return result
+
+    bounds = np.array([compiled[j].bbox for j in usable], dtype=np.float64)
+    in_bbox = (
+        (lats[:, None] >= bounds[None, :, 0]) & (lats[:, None] <= bounds[None, :, 2]) &
+        (lons[:, None] >= bounds[None, :, 1]) & (lons[:, None] <= bounds[None, :, 3])
+    )
+    result[:, usable] = in_bbox
+
+    for k, j in enumerate(usable):
+        polygon = compiled[j].polygon
+        if polygon is None:
+            continue
+        hits = np.flatnonzero(in_bbox[:, k])
+        if not hits.size:
+            continue
+        grid = compiled[j].grid
+        if grid is not None:
+            result[hits, j] = grid.contains_xy(lons[hits], lats[hits])
+        else:
+            result[hits, j] = shapely.contains_xy(polygon, lons[hits], lats[hits])
+    return result
@@ -0,0 +1,134 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+import shapely
+from sqlmodel import Session, select
+from src.app.db.models import Zone
+from src.app.services.zone_eval import CompiledZone
+
+class ZoneSnapshot:
+    """
+    An immutable view of all zones at one registry version.
+
+    Ingest takes a snapshot once per batch and evaluates every point against
+    it, so a zone created or deleted mid-batch is never half-applied.
+
+    Enabled zones are indexed in an STRtree over their bounding boxes, so a
+    point is only tested against zones whose envelope contains it.
+    """
+    __slots__ = ("version", "by_id", "enabled", "_indexed", "_tree")
+
+    def __init__(self, version: int, by_id: Dict[int, CompiledZone]):
+        self.version = version
+        self.by_id = by_id
+        self.enabled: Tuple[CompiledZone, ...] = tuple(z for z in by_id.values() if z.enabled)
+        # Zones without a usable bbox can never contain a point; leave them out of the tree
+        self._indexed: Tuple[CompiledZone, ...] = tuple(z for z in self.enabled if z.bbox is not None)
+        self._tree = shapely.STRtree([
+            shapely.box(z.bbox[1], z.bbox[0], z.bbox[3], z.bbox[2]) for z in self._indexed
+        ])
+
+    def candidates(self, lat: float, lon: float, also: Iterable[int] = ()) -> List[CompiledZone]:
+        """
+        Enabled zones whose bounding box contains (lat, lon), plus any enabled
+        zones listed in `also` (e.g. zones the object is currently inside, so
+        exits are still detected).
+        """
+        indexed = self._indexed
+        found = {indexed[i].id: indexed[i] for i in self._tree.query(shapely.Point(lon, lat))}
+        for zone_id in also:
+            if zone_id not in found:
+                zone = self.by_id.get(zone_id)
+                if zone is not None and zone.enabled:
+                    found[zone_id] = zone
+        return sorted(found.values(), key=lambda z: z.id)
+
+    def segment_candidates(self, lat0: float, lon0: float, lat1: float, lon1: float,
+                           also: Iterable[int] = ()) -> List[CompiledZone]:
+        """
+        Enabled zones whose bounding box intersects the envelope of the
+        segment (lat0, lon0) -> (lat1, lon1), plus any enabled zones listed
+        in `also`.
+        """
+        indexed = self._indexed
+        envelope = shapely.box(min(lon0, lon1), min(lat0, lat1), max(lon0, lon1), max(lat0, lat1))
+        found = {indexed[i].id: indexed[i] for i in self._tree.query(envelope)}
+        for zone_id in also:
+            if zone_id not in found:
+                zone = self.by_id.get(zone_id)
+                if zone is not None and zone.enabled:
+                    found[zone_id] = zone
+        return sorted(found.values(), key=lambda z: z.id)
+
+class ZoneRegistry:
+    """
+    In-process cache of compiled zones.
+
+    Zones are loaded from the database once and kept up to date by the zone
+    routes. Every change publishes a new snapshot with a higher version;
+    readers never see a partially updated set. Compiled zones are reused
+    between snapshots, so a change only compiles the zone that changed and
+    re-packs the bbox index.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[ZoneSnapshot] = None
+        self._version = 0
+
+    def load(self, session: Session) -> ZoneSnapshot:
+        """
+        (Re)load every zone from the database.
+        """
+        with self._lock:
+            zones = session.exec(select(Zone)).all()
+            return self._publish({zone.id: CompiledZone(zone) for zone in zones})
+
+    def snapshot(self, session: Session) -> ZoneSnapshot:
+        """
+        Return the current snapshot, loading from the database on first use.
+        """
+        snap = self._snapshot
+        if snap is None:
+            snap = self.load(session)
+        return snap
+
+    def upsert(self, zone: Zone) -> Optional[ZoneSnapshot]:
+        compiled = CompiledZone(zone)
+        with self._lock:
+            if self._snapshot is None:
+                # Not loaded yet; the first load will pick the zone up from the DB.
+                return None
+            by_id = dict(self._snapshot.by_id)
+            by_id[compiled.id] = compiled
+            return self._publish(by_id)
+
+    def remove(self, zone_id: int) -> Optional[ZoneSnapshot]:
+        with self._lock:
+            if self._snapshot is None or zone_id not in self._snapshot.by_id:
+                return self._snapshot
+            by_id = dict(self._snapshot.by_id)
+            del by_id[zone_id]
+            return self._publish(by_id)
+
+    def reset(self):
+        """
+        Drop the cache; the next snapshot() reloads from the database.
+        """
+        with self._lock:
+            self._snapshot = None
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def enabled_count(self) -> Optional[int]:
+        snap = self._snapshot
+        return len(snap.enabled) if snap is not None else None
+
+    def _publish(self, by_id: Dict[int, CompiledZone]) -> ZoneSnapshot:
+        self._version += 1
+        self._snapshot = ZoneSnapshot(self._version, by_id)
+        return self._snapshot
+
+zone_registry = ZoneRegistry()
@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+from typing import Dict, List
+import numpy as np
+from sqlmodel import Session
+from src.app.db.models import AlertType, Zone
+from src.app.db.writer import get_writer
+from src.app.services.alert_policy import alert_suppressor
+from src.app.services.ingestion import BatchResult, raise_alert, write_batch
+from src.app.services.sharding import get_ingest_shards
+from src.app.services.state_store import state_store
+from src.app.services.zone_eval import CompiledZone, points_in_zones
+
+# Fields whose change can move objects in or out of a zone
+GEOMETRY_FIELDS = ("min_lat", "min_lon", "max_lat", "max_lon", "is_polygon", "polygon_coords", "enabled")
+
+def reevaluate_zone(session: Session, zone: Zone) -> Dict[str, int]:
+    """
+    Bring every tracked object's state for `zone` in line with its current
+    geometry, judged at the object's last reported position.
+
+    All objects are tested against the one zone in a single vectorized pass
+    and only the states that flip are written: through the state store
+    (write-behind, in one batch) and, for sharded ingest, to the owning
+    shards. Each flip raises an ENTER or EXIT alert through the same
+    suppression policy, write path and alert log as ingest, except when
+    the zone has been disabled: its objects are then just marked outside,
+    since none of them moved. Objects that keep their side are left alone,
+    so an edit never re-raises ENTER for objects that were already inside.
+    """
+    compiled = CompiledZone(zone)
+    now = datetime.now(timezone.utc)
+    state_store.ensure_loaded(session)
+    states: List[dict] = []
+    alerts: List[dict] = []
+    with state_store.lock:
+        objects = list(state_store.objects.values())
+        if compiled.enabled:
+            lats = np.fromiter((obj.last_lat for obj in objects), dtype=np.float64, count=len(objects))
+            lons = np.fromiter((obj.last_lon for obj in objects), dtype=np.float64, count=len(objects))
+            inside = points_in_zones(lats, lons, [compiled])[:, 0]
+        else:
+            inside = np.zeros(len(objects), dtype=bool)
+        was_inside = np.fromiter((zone.id in state_store.inside.get(obj.id, ()) for obj in objects),
+                                 dtype=bool, count=len(objects))
+
+        for i in np.flatnonzero(inside != was_inside).tolist():
+            object_id = objects[i].id
+            entered = bool(inside[i])
+            state_store.set_zone_state(object_id, zone.id, entered, now)
+            states.append(dict(object_id=object_id, zone_id=zone.id, is_inside=entered, last_updated=now))
+            if compiled.enabled:
+                verb = "entered" if entered else "exited"
+                raise_alert(alerts, object_id, zone.id, AlertType.ENTER if entered else AlertType.EXIT,
+                            f"Object {object_id} {verb} zone {zone.name} (zone updated)", now)
+
+        result = BatchResult([], alerts, alert_suppressor.take_updates(), {}, [])
+        writer = get_writer() if alerts or result.alert_updates else None
+        # Queued before the lock is released, like an ingest batch
+        committed = writer.submit(lambda s: write_batch(result, s, commit=False)) if writer is not None else None
+
+    if committed is not None:
+        committed.result()
+    elif alerts or result.alert_updates:
+        write_batch(result, session)
+    if states:
+        # Sharded ingest keeps its own copy of each shard's zone states
+        shards = get_ingest_shards()
+        if shards is not None:
+            shards.apply_zone_states(states)
+        state_store.request_flush()
+    return {
+        "objects": len(objects),
+        "entered": sum(1 for state in states if state["is_inside"]),
+        "exited": sum(1 for state in states if not state["is_inside"]),
+        "alerts": len(alerts),
+    }
@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine
+from src.app.db.models import Zone
+from src.app.services.alert_policy import alert_suppressor
+from src.app.services.staleness import stale_monitor
+from src.app.services.state_store import state_store
+from src.app.services.zone_registry import zone_registry
+
+@pytest.fixture
+def session():
+    """
+    In-memory database with a single 10..20 x 10..20 BBOX zone (id 1), and
+    the in-process zone/state caches reset around the test.
+    """
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Zone(name="Box", min_lat=10.0, min_lon=10.0, max_lat=20.0, max_lon=20.0))
+        session.commit()
+        zone_registry.reset()
+        state_store.reset()
+        stale_monitor.reset()
+        alert_suppressor.reset()
+        yield session
+    zone_registry.reset()
+    state_store.reset()
+    stale_monitor.reset()
+    alert_suppressor.reset()
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+from sqlmodel import select
+from src.app.db.models import AlertEvent, AlertType, Position, TelemetryData, TelemetryPoint
+from src.app.services import metrics
+from src.app.services.alert_policy import alert_suppressor
+
+T0 = datetime(2026, 2, 1, 12, 0, tzinfo=timezone.utc)
+
+def point(seconds, lat=15.0, lon=15.0, confidence=1.0):
+    return TelemetryPoint(
+        object_id="sled", ts=T0 + timedelta(seconds=seconds), position=Position(lat=lat, lon=lon),
+        confidence=confidence, telemetry=TelemetryData(speed_mps=1, heading_deg=0),
+    )
+
+def alerts_of(session, alert_type):
+    session.expire_all()
+    return session.exec(select(AlertEvent).where(AlertEvent.alert_type == alert_type).order_by(AlertEvent.id)).all()
+
+def test_low_confidence_repeats_coalesce_within_cooldown(session):
+    from src.app.services.ingestion import process_batch
+
+    # A first-seen object only gets its ENTER
+    process_batch([point(-1)] + [point(i, confidence=0.2) for i in range(10)], session)
+    process_batch([point(10 + i, confidence=0.2) for i in range(3)], session)
+    [alert] = alerts_of(session, AlertType.LOW_CONFIDENCE)
+    assert alert.occurrences == 13
+    assert alert.first_ts == T0.replace(tzinfo=None)
+    assert alert.last_ts == (T0 + timedelta(seconds=12)).replace(tzinfo=None)
+
+    # After the cooldown a new alert is raised
+    process_batch([point(400, confidence=0.2)], session)
+    assert [a.occurrences for a in alerts_of(session, AlertType.LOW_CONFIDENCE)] == [13, 1]
+
+def test_acknowledged_alert_is_not_extended(session):
+    from fastapi.testclient import TestClient
+    from src.app.main import app
+    from src.app.db.session import get_session
+    from src.app.services.ingestion import process_batch
+
+    process_batch([point(-1), point(0, confidence=0.2)], session)
+    [alert] = alerts_of(session, AlertType.LOW_CONFIDENCE)
+    app.dependency_overrides[get_session] = lambda: session
+    try:
+        assert TestClient(app).post(f"/api/alerts/{alert.id}/ack").json() == {"status": "ok"}
+    finally:
+        app.dependency_overrides.clear()
+    process_batch([point(1, confidence=0.2)], session)
+    assert [a.occurrences for a in alerts_of(session, AlertType.LOW_CONFIDENCE)] == [1, 1]
+
+def test_hysteresis_ignores_edge_jitter(session, monkeypatch):
+    from src.app.services.ingestion import process_batch
+
+    monkeypatch.setattr(alert_suppressor, "hysteresis_s", 5.0)
+    suppressed = metrics.alerts_suppressed.value("EXIT", "hysteresis")
+    # Inside, then flickering across the lon=20 edge, then leaving for good
+    lons = [19.9, 20.1, 19.9, 20.1, 19.9] + [20.1] * 8
+    process_batch([point(i, lon=lon) for i, lon in enumerate(lons)], session)
+
+    assert [a.alert_type for a in session.exec(select(AlertEvent).order_by(AlertEvent.id))] == \
+        [AlertType.ENTER, AlertType.EXIT]
+    [exit_alert] = alerts_of(session, AlertType.EXIT)
+    assert exit_alert.first_ts == (T0 + timedelta(seconds=10)).replace(tzinfo=None)
+    assert metrics.alerts_suppressed.value("EXIT", "hysteresis") == suppressed + 2
+
+def test_enter_exit_flaps_coalesce_with_cooldown(session, monkeypatch):
+    from src.app.services.ingestion import process_batch
+
+    monkeypatch.setitem(alert_suppressor.cooldowns, AlertType.ENTER, 60.0)
+    monkeypatch.setitem(alert_suppressor.cooldowns, AlertType.EXIT, 60.0)
+    process_batch([point(i, lon=19.9 if i % 2 == 0 else 20.1) for i in range(6)], session)
+    rows = session.exec(select(AlertEvent).order_by(AlertEvent.id)).all()
+    assert [(a.alert_type, a.occurrences) for a in rows] == [(AlertType.ENTER, 3), (AlertType.EXIT, 3)]
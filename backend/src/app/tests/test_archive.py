@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+import numpy as np
+from sqlmodel import delete, select
+from src.app.db.models import ArchiveSegment, TelemetryRecord
+from src.app.services.archive import Archive, from_us, open_segment, to_us, write_segment
+
+T0 = datetime(2026, 2, 1, 0, 0)
+
+def test_segment_round_trip_is_memory_mapped(tmp_path):
+    ts = np.array([to_us(T0 + timedelta(seconds=i)) for i in range(100)])
+    columns = {
+        "ts": ts, "lat": np.linspace(60, 61, 100), "lon": np.full(100, -90.0),
+        "alt_m": np.full(100, np.nan), "speed_mps": np.arange(100.0),
+        "heading_deg": np.zeros(100), "battery_pct": np.full(100, 80.0),
+    }
+    write_segment(tmp_path / "w" / "a.seg", "a/b", columns)
+
+    segment = open_segment(tmp_path / "w" / "a.seg")
+    assert segment.object_id == "a/b"
+    assert segment.count == 100
+    part = segment.slice(to_us(T0 + timedelta(seconds=10)), to_us(T0 + timedelta(seconds=19)))
+    assert len(part["ts"]) == 10
+    assert isinstance(part["lat"], np.memmap)
+    assert np.array_equal(part["speed_mps"], np.arange(10.0, 20.0))
+    assert from_us(part["ts"][:1]) == [T0 + timedelta(seconds=10)]
+
+def test_archive_closed_windows_and_serve_history(session, tmp_path):
+    from src.app.services import archive as archive_module
+    from src.app.services.history import history_records
+
+    for i in range(3 * 3600):
+        session.add(TelemetryRecord(object_id="sled" if i % 2 else "boat", ts=T0 + timedelta(seconds=i),
+                                    lat=60 + i / 1e4, lon=-90, speed_mps=float(i)))
+    session.commit()
+
+    archive = Archive(str(tmp_path), window_s=3600, grace_s=60)
+    engine = session.get_bind()
+    # The last window is still open
+    assert archive.archive_closed_windows(engine, now=T0 + timedelta(hours=3)) == 4
+    assert archive.archive_closed_windows(engine, now=T0 + timedelta(hours=3)) == 0
+    segments = session.exec(select(ArchiveSegment)).all()
+    assert sorted((s.object_id, s.count) for s in segments) == [("boat", 1800)] * 2 + [("sled", 1800)] * 2
+
+    columns = archive.read(session, "sled", T0 + timedelta(minutes=30), T0 + timedelta(minutes=90))
+    assert len(columns["ts"]) == 1800
+    assert np.all(np.diff(columns["ts"]) == 2_000_000)
+
+    # With the raw rows gone, history is served from the archive
+    session.exec(delete(TelemetryRecord).where(TelemetryRecord.ts < T0 + timedelta(hours=2)))
+    session.commit()
+    original, archive_module.archive = archive_module.archive, archive
+    try:
+        rows = history_records(session, "sled", T0, T0 + timedelta(hours=3), None, now=T0 + timedelta(days=30))
+        assert len(rows) == 3 * 1800
+        assert [r.ts for r in rows] == sorted((r.ts for r in rows), reverse=True)
+        assert rows[-1].id is None and rows[-1].speed_mps == 1.0 and rows[-1].alt_m is None
+        assert len(history_records(session, "sled", None, None, 5, now=T0 + timedelta(days=30))) == 5
+    finally:
+        archive_module.archive = original
+
+def test_late_rows_are_merged_into_archived_windows(session, tmp_path):
+    for i in range(0, 7200, 60):
+        session.add(TelemetryRecord(object_id="sled", ts=T0 + timedelta(seconds=i), lat=60, lon=-90, speed_mps=float(i)))
+    session.commit()
+    archive = Archive(str(tmp_path), window_s=3600, grace_s=60)
+    engine = session.get_bind()
+    assert archive.archive_closed_windows(engine, now=T0 + timedelta(hours=3)) == 2
+    assert len(archive.read(session, "sled")["ts"]) == 120
+
+    # Points for the first (archived) window arrive after it was archived,
+    # one for an object it had no segment for
+    session.add(TelemetryRecord(object_id="sled", ts=T0 + timedelta(seconds=30), lat=60, lon=-90, speed_mps=-1.0))
+    session.add(TelemetryRecord(object_id="boat", ts=T0 + timedelta(seconds=90), lat=60, lon=-90, speed_mps=-2.0))
+    session.commit()
+    assert archive.archive_closed_windows(engine, now=T0 + timedelta(hours=3)) == 2
+    columns = archive.read(session, "sled", T0, T0 + timedelta(minutes=2))
+    assert list(columns["speed_mps"]) == [0.0, -1.0, 60.0, 120.0]
+    assert list(archive.read(session, "boat")["speed_mps"]) == [-2.0]
+    assert len(archive.read(session, "sled")["ts"]) == 121
+    # Nothing new: nothing rewritten
+    assert archive.archive_closed_windows(engine, now=T0 + timedelta(hours=3)) == 0
+
+def test_open_segments_are_bounded(session, tmp_path):
+    for i in range(6):
+        session.add(TelemetryRecord(object_id=f"obj-{i}", ts=T0, lat=60, lon=-90))
+    session.commit()
+    archive = Archive(str(tmp_path), window_s=3600, grace_s=60, max_open=4)
+    assert archive.archive_closed_windows(session.get_bind(), now=T0 + timedelta(hours=2)) == 6
+    for i in range(6):
+        assert len(archive.read(session, f"obj-{i}")["ts"]) == 1
+    assert list(archive._segments) == [f"20260201T000000/obj-{i}.seg" for i in range(2, 6)]
@@ -0,0 +1,162 @@
+import json
+from datetime import datetime, timedelta, timezone
+import pytest
+from pydantic import ValidationError
+from sqlmodel import select
+from src.app.db.models import AlertEvent, AlertType, TelemetryPoint
+from src.app.services.codec import FlatPoint, decode_binary, decode_ndjson, encode_binary
+from src.app.services.state_store import state_store
+
+T0 = datetime(2026, 2, 1, 12, 0, tzinfo=timezone.utc)
+
+def payload(object_id="c", seconds=0, **overrides):
+    item = {"object_id": object_id, "ts": (T0 + timedelta(seconds=seconds)).isoformat().replace("+00:00", "Z"),
+            "position": {"lat": 15.0, "lon": 15.0}, "confidence": 0.9,
+            "telemetry": {"speed_mps": 3.5, "heading_deg": 90, "battery_pct": 80},
+            "inference": {"category": "UAV", "class_confidence": 0.8}, "meta": {"firmware": "1.2"}}
+    for path, value in overrides.items():
+        *parents, leaf = path.split("__")
+        target = item
+        for parent in parents:
+            target = target[parent]
+        target[leaf] = value
+    return item
+
+BAD = [
+    dict(object_id=""),
+    dict(ts="2026-02-01T12:00:00"),
+    dict(position__lat=90.5),
+    dict(position__lon=-181),
+    dict(position__lat="north"),
+    dict(confidence=1.01),
+    dict(confidence=float("nan")),
+    dict(telemetry__speed_mps=-1),
+    dict(telemetry__heading_deg=361),
+    dict(telemetry__battery_pct=101),
+    dict(inference__category="SHIP"),
+]
+
+def ndjson(items) -> bytes:
+    return "\n".join(json.dumps(item) for item in items).encode()
+
+def test_ndjson_checks_match_the_models():
+    items = [payload()] + [payload(**bad) for bad in BAD]
+    points, errors = decode_ndjson(ndjson(items))
+    for index, item in enumerate(items):
+        try:
+            TelemetryPoint.model_validate(item)
+            model_ok = True
+        except ValidationError:
+            model_ok = False
+        assert model_ok == (index not in {i for i, _ in errors}), item
+
+    [point] = points
+    model = FlatPoint.from_model(TelemetryPoint.model_validate(items[0]))
+    assert all(getattr(point, field) == getattr(model, field) for field in FlatPoint.__slots__)
+
+# Accepted by the model in lax mode, or spelled differently from the fast path's usual input
+VARIANTS = [
+    dict(ts="2026-02-01T12:00:00.5Z"),
+    dict(ts="2026-02-01 12:00:00+00:00"),
+    dict(ts=1769947200),
+    dict(ts=1769947200500),
+    dict(ts="20260201T120000Z"),
+    dict(position__lat="15.5"),
+    dict(position__alt_m="120"),
+    dict(confidence="0.5"),
+    dict(telemetry__speed_mps=True),
+    dict(telemetry__rssi_dbm="-70"),
+    dict(telemetry__rssi_dbm="strong"),
+    dict(telemetry__source=5),
+    dict(inference__class_confidence=1.5),
+    dict(inference=None),
+    dict(meta=[1]),
+]
+
+def test_ndjson_and_json_agree_on_every_record(session):
+    from fastapi.testclient import TestClient
+    from src.app.main import app
+    from src.app.db.session import get_session, get_read_session
+
+    items = [payload(**variant) for variant in VARIANTS + BAD]
+    points, errors = decode_ndjson(ndjson(items))
+    rejected = {index for index, _ in errors}
+    accepted = iter(points)
+    for index, item in enumerate(items):
+        try:
+            model = FlatPoint.from_model(TelemetryPoint.model_validate(item))
+        except ValidationError:
+            assert index in rejected, item
+            continue
+        assert index not in rejected, item
+        point = next(accepted)
+        assert all(getattr(point, field) == getattr(model, field) for field in FlatPoint.__slots__), item
+
+    app.dependency_overrides[get_session] = lambda: session
+    app.dependency_overrides[get_read_session] = lambda: session
+    try:
+        client = TestClient(app)
+        # Same body, either content type
+        variants = [payload(**variant) for variant in VARIANTS]
+        as_json = client.post("/api/telemetry/batch", json=variants).json()
+        as_ndjson = client.post("/api/telemetry/records", content=ndjson(variants),
+                                headers={"content-type": "application/x-ndjson"}).json()
+        assert [r["index"] for r in as_json["results"] if r["status"] == "rejected"] == \
+            [e["index"] for e in as_ndjson["errors"]]
+    finally:
+        app.dependency_overrides.clear()
+
+def test_binary_round_trip_and_rejections():
+    good = FlatPoint("ü-1", T0 + timedelta(microseconds=7), 69.5, -140.25, None, 0.5, 2.0, 359.5, 12.0, "VEHICLE")
+    bad = FlatPoint("b", T0, 10.0, 10.0, 120.0, 1.5, 0.0, 0.0, None, None)
+    points, errors = decode_binary(encode_binary([good, bad, good]))
+    assert [(i, e.split(":")[0]) for i, e in errors] == [(1, "confidence")]
+    assert len(points) == 2
+    assert all(getattr(points[0], field) == getattr(good, field) for field in FlatPoint.__slots__)
+    with pytest.raises(ValueError, match="Truncated record 1"):
+        decode_binary(encode_binary([good, good])[:-3])
+
+def test_records_endpoint_feeds_the_pipeline(session):
+    from fastapi.testclient import TestClient
+    from src.app.main import app
+    from src.app.db.session import get_session, get_read_session
+
+    app.dependency_overrides[get_session] = lambda: session
+    app.dependency_overrides[get_read_session] = lambda: session
+    try:
+        client = TestClient(app)
+        flat = [FlatPoint("bin", T0 + timedelta(seconds=i), 15.0, 15.0 + 10 * i, None, 1.0, 1.0, 90.0, None, "UAV")
+                for i in range(2)]
+        r = client.post("/api/telemetry/records", content=encode_binary(flat),
+                        headers={"content-type": "application/vnd.geofence.telemetry"})
+        assert r.json() == {"accepted": 2, "rejected": 0, "errors": []}
+
+        r = client.post("/api/telemetry/records", content=ndjson([payload("nd"), payload("nd", confidence=2)]),
+                        headers={"content-type": "application/x-ndjson"})
+        assert r.json()["accepted"] == 1 and [e["index"] for e in r.json()["errors"]] == [1]
+
+        assert client.post("/api/telemetry/records", content=b"{}",
+                           headers={"content-type": "application/json"}).status_code == 415
+        assert client.post("/api/telemetry/records", content=b"\x05\x00ab",
+                           headers={"content-type": "application/vnd.geofence.telemetry"}).status_code == 400
+    finally:
+        app.dependency_overrides.clear()
+
+    alerts = session.exec(select(AlertEvent).order_by(AlertEvent.id)).all()
+    assert [(a.object_id, a.alert_type) for a in alerts] == \
+        [("bin", AlertType.ENTER), ("bin", AlertType.EXIT), ("nd", AlertType.ENTER)]
+    assert state_store.objects["bin"].category == "UAV" and state_store.objects["bin"].last_lon == 25.0
+
+def test_msgpack_records():
+    msgpack = pytest.importorskip("msgpack")
+    from src.app.services.codec import decode_msgpack
+
+    micros = (T0 - datetime(1970, 1, 1, tzinfo=timezone.utc)) // timedelta(microseconds=1)
+    body = msgpack.packb([
+        ["m", micros, 15.0, 15.0, None, 0.9, 1.0, 90.0],
+        ["m", T0, 15.0, 15.0, 3.0, 0.9, 1.0, 90.0, 50.0, "BEACON"],
+        ["m", micros, 15.0, 15.0, None, 0.9, 1.0, 400.0],
+    ], datetime=True)
+    points, errors = decode_msgpack(body)
+    assert [p.ts for p in points] == [T0, T0] and points[1].category == "BEACON"
+    assert [i for i, _ in errors] == [2]
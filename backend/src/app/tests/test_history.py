@@ -0,0 +1,54 @@
+import math
+from datetime import datetime, timedelta, timezone
+from src.app.db.models import TelemetryRecord
+
+T0 = datetime(2026, 2, 1, 12, 0)
+
+def test_lttb_keeps_endpoints_and_corners():
+    from src.app.services.downsample import lttb_indices
+    # An L-shaped track: east along lat 0, then north along lon 100
+    xs = [float(i) for i in range(101)] + [100.0] * 100
+    ys = [0.0] * 101 + [float(i) for i in range(1, 101)]
+    keep = lttb_indices(xs, ys, 20)
+    assert len(keep) == 20
+    assert keep[0] == 0 and keep[-1] == len(xs) - 1
+    assert list(keep) == sorted(keep)
+    # The corner vertex survives
+    assert 100 in keep
+
+def test_lttb_passthrough_when_small():
+    from src.app.services.downsample import lttb_indices
+    assert list(lttb_indices([0, 1, 2], [0, 1, 0], 10)) == [0, 1, 2]
+
+def test_history_range_and_max_points(session):
+    from fastapi.testclient import TestClient
+    from src.app.main import app
+    from src.app.db.session import get_session, get_read_session
+
+    for i in range(600):
+        session.add(TelemetryRecord(object_id="sled", ts=T0 + timedelta(seconds=i),
+                                    lat=60 + math.sin(i / 50), lon=-90 + i / 100))
+    session.add(TelemetryRecord(object_id="other", ts=T0, lat=0, lon=0))
+    session.commit()
+
+    app.dependency_overrides[get_session] = lambda: session
+    app.dependency_overrides[get_read_session] = lambda: session
+    try:
+        client = TestClient(app)
+        # Default stays "last 50, newest first"
+        rows = client.get("/api/objects/sled/history").json()
+        assert len(rows) == 50
+        assert rows[0]["ts"] > rows[-1]["ts"]
+
+        start = (T0 + timedelta(seconds=100)).replace(tzinfo=timezone.utc).isoformat()
+        end = (T0 + timedelta(seconds=499)).replace(tzinfo=timezone.utc).isoformat()
+        rows = client.get("/api/objects/sled/history", params={"start": start, "end": end}).json()
+        assert len(rows) == 400
+
+        rows = client.get("/api/objects/sled/history",
+                          params={"start": start, "end": end, "max_points": 40}).json()
+        assert len(rows) == 40
+        assert rows[0]["ts"].startswith("2026-02-01T12:08:19")
+        assert rows[-1]["ts"].startswith("2026-02-01T12:01:40")
+    finally:
+        app.dependency_overrides.clear()
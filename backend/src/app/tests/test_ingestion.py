@@ -0,0 +1,303 @@
+from datetime import datetime, timedelta, timezone
+from sqlmodel import select
+from src.app.services.state_store import state_store
+from src.app.services.zone_registry import zone_registry
+from src.app.db.models import TelemetryPoint, Position, TelemetryData, Zone, TrackedObject, TelemetryRecord, ObjectZoneState, AlertEvent, AlertType
+
+T0 = datetime(2026, 2, 1, 12, 0, tzinfo=timezone.utc)
+
+# Helper to create a point
+def create_point(object_id, lat, lon, seconds=0, confidence=1.0):
+    return TelemetryPoint(
+        object_id=object_id,
+        ts=T0 + timedelta(seconds=seconds),
+        position=Position(lat=lat, lon=lon),
+        confidence=confidence,
+        telemetry=TelemetryData(speed_mps=10, heading_deg=0)
+    )
+
+def alert_types(session, object_id):
+    alerts = session.exec(select(AlertEvent).where(AlertEvent.object_id == object_id).order_by(AlertEvent.id)).all()
+    return [a.alert_type for a in alerts]
+
+def test_single_point_enter(session):
+    from src.app.services.ingestion import process_telemetry
+    obj = process_telemetry(create_point("a", 15.0, 15.0), session)
+    assert obj.last_lat == 15.0
+    assert alert_types(session, "a") == [AlertType.ENTER]
+
+def test_batch_orders_points_per_object(session):
+    from src.app.services.ingestion import process_batch
+    # Posted out of order: exit happens at t=2, enter at t=1
+    points = [
+        create_point("a", 30.0, 30.0, seconds=2),
+        create_point("b", 15.0, 15.0, seconds=0),
+        create_point("a", 15.0, 15.0, seconds=1),
+        create_point("a", 30.0, 30.0, seconds=0),
+    ]
+    process_batch(points, session)
+
+    assert alert_types(session, "a") == [AlertType.ENTER, AlertType.EXIT]
+    assert alert_types(session, "b") == [AlertType.ENTER]
+    assert len(session.exec(select(TelemetryRecord)).all()) == 4
+
+    state_store.flush(session)
+    obj = session.get(TrackedObject, "a")
+    assert obj.last_lat == 30.0
+    state = session.get(ObjectZoneState, ("a", 1))
+    assert state.is_inside is False
+
+def test_batch_matches_sequential_ingest(session):
+    from src.app.services.ingestion import process_batch, process_telemetry
+    track = [(15.0, 15.0, 1.0), (15.0, 15.0, 0.2), (25.0, 15.0, 1.0), (12.0, 12.0, 1.0)]
+    for i, (lat, lon, conf) in enumerate(track):
+        process_telemetry(create_point("seq", lat, lon, seconds=i, confidence=conf), session)
+    process_batch([create_point("bat", lat, lon, seconds=i, confidence=conf) for i, (lat, lon, conf) in enumerate(track)], session)
+
+    assert alert_types(session, "seq") == alert_types(session, "bat") == [
+        AlertType.ENTER, AlertType.LOW_CONFIDENCE, AlertType.EXIT, AlertType.ENTER
+    ]
+
+def test_state_is_written_behind_and_reloaded(session):
+    from src.app.services.ingestion import process_telemetry
+    process_telemetry(create_point("a", 15.0, 15.0), session)
+    assert session.get(TrackedObject, "a") is None
+    assert state_store.dirty_count == 2
+
+    assert state_store.flush(session) == 2
+    assert state_store.dirty_count == 0
+    assert session.get(ObjectZoneState, ("a", 1)).is_inside is True
+
+    # A restart reloads the same state: staying inside is not a new ENTER
+    state_store.reset()
+    process_telemetry(create_point("a", 16.0, 16.0, seconds=1), session)
+    assert alert_types(session, "a") == [AlertType.ENTER]
+
+def test_zone_changes_reach_ingest(session):
+    from src.app.services.ingestion import process_telemetry
+    process_telemetry(create_point("a", 35.0, 35.0), session)
+    version = zone_registry.version
+
+    zone = Zone(name="Late", is_polygon=True, polygon_coords="[[30, 30], [30, 40], [40, 40], [40, 30]]")
+    session.add(zone)
+    session.commit()
+    session.refresh(zone)
+    zone_registry.upsert(zone)
+    assert zone_registry.version == version + 1
+
+    process_telemetry(create_point("a", 35.0, 35.0, seconds=1), session)
+    assert alert_types(session, "a") == [AlertType.ENTER]
+
+    zone_registry.remove(zone.id)
+    process_telemetry(create_point("a", 45.0, 45.0, seconds=2), session)
+    assert alert_types(session, "a") == [AlertType.ENTER]
+
+def test_batch_endpoint_reports_rejections(session):
+    from fastapi.testclient import TestClient
+    from src.app.main import app
+    from src.app.db.session import get_session, get_read_session
+
+    app.dependency_overrides[get_session] = lambda: session
+    app.dependency_overrides[get_read_session] = lambda: session
+    try:
+        client = TestClient(app)
+        good = create_point("api", 15.0, 15.0).model_dump(mode="json")
+        bad = dict(good, confidence=2.0)
+        r = client.post("/api/telemetry/batch", json=[good, bad])
+        assert r.status_code == 200
+        body = r.json()
+        assert body["accepted"] == 1
+        assert body["rejected"] == 1
+        assert [res["status"] for res in body["results"]] == ["accepted", "rejected"]
+
+        import json
+        ndjson = "\n".join(json.dumps(p) for p in [good, dict(good, object_id="api2")])
+        r = client.post("/api/telemetry/batch", content=ndjson, headers={"content-type": "application/x-ndjson"})
+        assert r.json()["accepted"] == 2
+    finally:
+        app.dependency_overrides.clear()
+
+def test_ingest_queue_backpressure(session):
+    from fastapi.testclient import TestClient
+    from src.app.main import app
+    from src.app.db.session import get_session, get_read_session
+    from src.app.services import ingest_queue as ingest_queue_module
+    from src.app.services.ingest_queue import IngestQueue
+
+    # Not started, so nothing drains the queue
+    queue = IngestQueue(max_size=1, batch_max=10)
+    ingest_queue_module.ingest_queue = queue
+    app.dependency_overrides[get_session] = lambda: session
+    app.dependency_overrides[get_read_session] = lambda: session
+    try:
+        client = TestClient(app)
+        payload = create_point("q", 15.0, 15.0).model_dump(mode="json")
+        assert client.post("/api/telemetry/", json=payload).status_code == 202
+        r = client.post("/api/telemetry/", json=payload)
+        assert r.status_code == 503
+        assert "retry-after" in r.headers
+        stats = client.get("/api/telemetry/queue").json()
+        assert stats["depth"] == 1
+        assert stats["rejected"] == 1
+
+        # The worker drains what was queued before stopping
+        queue.start(session.get_bind())
+        queue.stop()
+        assert queue.stats()["processed"] == 1
+        assert alert_types(session, "q") == [AlertType.ENTER]
+    finally:
+        ingest_queue_module.ingest_queue = None
+        app.dependency_overrides.clear()
+
+def test_ingest_queue_counts_failed_batches(session, monkeypatch):
+    from src.app.services import ingest_queue as ingest_queue_module, metrics
+    from src.app.services.ingest_queue import IngestQueue
+
+    def broken(points, session):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(ingest_queue_module, "ingest", broken)
+    rejected = metrics.points_rejected.value()
+    queue = IngestQueue(max_size=10, batch_max=10)
+    for i in range(3):
+        assert queue.offer(create_point("q", 15.0, 15.0, seconds=i))
+    queue.start(session.get_bind())
+    queue.stop()
+    assert queue.stats()["failed"] == 3 and queue.stats()["processed"] == 0
+    assert metrics.points_rejected.value() == rejected + 3
+
+def test_trails_endpoint_returns_deltas(session):
+    from fastapi.testclient import TestClient
+    from src.app.main import app
+    from src.app.db.session import get_session, get_read_session
+    from src.app.services.ingestion import process_batch
+    from src.app.services.trails import trail_buffer
+
+    process_batch([create_point("a", 1.0, float(i), seconds=i) for i in range(5)] +
+                  [create_point("b", 2.0, 0.0)], session)
+    trail_buffer.reset()
+    app.dependency_overrides[get_session] = lambda: session
+    app.dependency_overrides[get_read_session] = lambda: session
+    try:
+        client = TestClient(app)
+        body = client.get("/api/objects/trails?n=3").json()
+        assert [p["lon"] for p in body["trails"]["a"]] == [2.0, 3.0, 4.0]
+        assert len(body["trails"]["b"]) == 1
+
+        process_batch([create_point("a", 1.0, 5.0, seconds=5)], session)
+        delta = client.get(f"/api/objects/trails?n=3&since={body['cursor']}").json()
+        assert delta["reset"] is False
+        assert list(delta["trails"]) == ["a"]
+        assert [p["lon"] for p in delta["trails"]["a"]] == [5.0]
+
+        # A late point comes back in the next delta with its own ts, and
+        # merging by ts (as the map does) matches a full fetch
+        process_batch([create_point("a", 1.0, 4.5, seconds=4.5)], session)
+        late = client.get(f"/api/objects/trails?n=3&since={delta['cursor']}").json()
+        assert [p["lon"] for p in late["trails"]["a"]] == [4.5]
+        merged = sorted(body["trails"]["a"] + delta["trails"]["a"] + late["trails"]["a"], key=lambda p: p["ts"])[-3:]
+        full = client.get("/api/objects/trails?n=3").json()
+        assert [p["lon"] for p in full["trails"]["a"]] == [p["lon"] for p in merged] == [4.0, 4.5, 5.0]
+
+        subset = client.get("/api/objects/trails?n=500&ids=b").json()
+        assert list(subset["trails"]) == ["b"]
+    finally:
+        trail_buffer.reset()
+        app.dependency_overrides.clear()
+
+def test_segment_crossings_catch_zones_between_reports(session, monkeypatch):
+    from src.app.config import settings
+    from src.app.services.ingestion import process_batch
+
+    # Straight through the 10..20 box between two reports 20 s apart
+    track = [create_point("fast", 15.0, 5.0), create_point("fast", 15.0, 25.0, seconds=20)]
+    process_batch(track, session)
+    assert alert_types(session, "fast") == []
+
+    monkeypatch.setattr(settings, "segment_crossings_enabled", True)
+    process_batch([create_point("jet", p.position.lat, p.position.lon, seconds=i * 20) for i, p in enumerate(track)], session)
+    alerts = session.exec(select(AlertEvent).where(AlertEvent.object_id == "jet").order_by(AlertEvent.id)).all()
+    assert [a.alert_type for a in alerts] == [AlertType.ENTER, AlertType.EXIT]
+    assert [a.first_ts for a in alerts] == [(T0 + timedelta(seconds=s)).replace(tzinfo=None) for s in (5, 15)]
+    # Stamped with the crossing time, as replay would rebuild them
+    assert [a.ts for a in alerts] == [a.first_ts for a in alerts]
+
+def test_segment_crossings_time_the_net_transition(session, monkeypatch):
+    from src.app.config import settings
+    from src.app.services.ingestion import process_batch
+    monkeypatch.setattr(settings, "segment_crossings_enabled", True)
+
+    # A U-shaped polygon: inside the left arm, out across the notch, back
+    # into the right arm, then out of the bottom
+    zone = Zone(name="U", is_polygon=True,
+                polygon_coords="[[30, 30], [40, 30], [40, 40], [30, 40], [30, 38], [38, 38], [38, 32], [30, 32]]")
+    session.add(zone)
+    session.commit()
+    session.refresh(zone)
+    zone_registry.upsert(zone)
+
+    process_batch([
+        create_point("u", 35.0, 31.0),
+        create_point("u", 35.0, 39.0, seconds=8),
+        create_point("u", 45.0, 39.0, seconds=18),
+    ], session)
+    alerts = session.exec(select(AlertEvent).where(AlertEvent.object_id == "u").order_by(AlertEvent.id)).all()
+    assert [a.alert_type for a in alerts] == [AlertType.ENTER, AlertType.EXIT, AlertType.ENTER, AlertType.EXIT]
+    assert [a.first_ts for a in alerts] == [(T0 + timedelta(seconds=s)).replace(tzinfo=None) for s in (0, 1, 7, 13)]
+    assert [a.ts for a in alerts[1:]] == [a.first_ts for a in alerts[1:]]
+    assert not state_store.zone_states[("u", zone.id)].is_inside
+
+def test_failed_write_puts_state_back(session, monkeypatch):
+    import pytest
+    from src.app.services import ingestion
+    from src.app.services.alert_policy import alert_suppressor
+
+    monkeypatch.setattr(alert_suppressor, "cooldowns", {AlertType.ENTER: 600.0})
+    ingestion.process_batch([create_point("a", 15.0, 15.0)], session)
+    state_store.flush(session)
+
+    def broken(result, s, clock):
+        raise RuntimeError("disk full")
+
+    with monkeypatch.context() as m:
+        m.setattr(ingestion, "_write_rows", broken)
+        with pytest.raises(RuntimeError):
+            # "a" leaves the zone, "b" is new and inside it
+            ingestion.process_batch([create_point("a", 30.0, 30.0, seconds=1),
+                                     create_point("b", 15.0, 15.0, seconds=1)], session)
+
+    assert state_store.objects["a"].last_lat == 15.0
+    assert state_store.inside["a"] == {1}
+    assert "b" not in state_store.objects and ("b", 1) not in state_store.zone_states
+    assert alert_suppressor.open_count == 1
+
+    # Sent again, the same points raise the alerts the failed batch lost
+    ingestion.process_batch([create_point("a", 30.0, 30.0, seconds=1),
+                             create_point("b", 15.0, 15.0, seconds=1)], session)
+    assert alert_types(session, "a") == [AlertType.ENTER, AlertType.EXIT]
+    assert alert_types(session, "b") == [AlertType.ENTER]
+    state_store.flush(session)
+    assert session.get(TrackedObject, "a").last_lat == 30.0
+
+def test_uncommitted_batch_is_not_flushed(session):
+    from src.app.services import metrics
+    from src.app.services.ingestion import evaluate_batch
+
+    zones = zone_registry.snapshot(session)
+    result = evaluate_batch([create_point("a", 15.0, 15.0)], zones, metrics.StageClock())
+    assert state_store.flush(session) == 0
+    result.undo.committed()
+    assert state_store.flush(session) == 2
+
+def test_flush_keys_come_back_when_the_commit_fails(session):
+    from src.app.db.session import run_after_rollback
+    from src.app.services.ingestion import process_batch
+
+    process_batch([create_point("a", 15.0, 15.0)], session)
+    pending = state_store.dirty_count
+    assert state_store.flush(session, commit=False) == pending
+    assert state_store.dirty_count == 0
+    # The writer's group commit failed after the flush job ran
+    session.rollback()
+    run_after_rollback(session)
+    assert state_store.dirty_count == pending
@@ -0,0 +1,95 @@
+import time
+from datetime import datetime, timedelta, timezone
+from src.app.db.models import TelemetryPoint, Position, TelemetryData
+from src.app.services import metrics
+from src.app.services.metrics import Histogram, Registry
+
+T0 = datetime(2026, 2, 1, 12, 0, tzinfo=timezone.utc)
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.register(Histogram("demo_seconds", "Demo", buckets=(0.1, 1.0), labels=("stage",)))
+    histogram.observe(0.05, "a")
+    histogram.observe_many([0.5, 5.0], "a")
+    counter = registry.counter("demo_events", "Events", labels=("type",))
+    counter.inc(2, "ENTER")
+
+    text = registry.render()
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="a",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{stage="a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{stage="a"} 3' in text
+    assert 'demo_events_total{type="ENTER"} 2' in text
+
+def test_ingest_records_stages_and_counts(session):
+    from src.app.services.ingestion import process_batch
+
+    stages_before = {name: metrics.ingest_stage_seconds.count(name) for name in ("lookup", "state", "zones", "commit")}
+    points_before = metrics.points_ingested.value()
+    enters_before = metrics.alerts_raised.value("ENTER")
+    tests_before = metrics.zones_per_point.count()
+
+    process_batch([
+        TelemetryPoint(object_id="sled", ts=T0 + timedelta(seconds=i), position=Position(lat=15, lon=5 + 5 * i),
+                       confidence=1.0, telemetry=TelemetryData(speed_mps=1, heading_deg=90))
+        for i in range(3)
+    ], session)
+
+    for name, before in stages_before.items():
+        assert metrics.ingest_stage_seconds.count(name) == before + 1
+    assert metrics.points_ingested.value() == points_before + 3
+    assert metrics.alerts_raised.value("ENTER") == enters_before + 1
+    assert metrics.zones_per_point.count() == tests_before + 3
+
+def test_group_commit_records_the_commit_stage(session):
+    from src.app.db.writer import start_writer, stop_writer
+    from src.app.services.ingestion import evaluate_and_submit
+
+    before = {name: metrics.ingest_stage_seconds.count(name) for name in ("queue", "history_insert", "commit")}
+    writer = start_writer(session.get_bind(), 64, 0.01)
+    try:
+        _, committed = evaluate_and_submit([
+            TelemetryPoint(object_id="sled", ts=T0, position=Position(lat=15, lon=15),
+                           confidence=1.0, telemetry=TelemetryData(speed_mps=1, heading_deg=90))
+        ], session, writer)
+        committed.result()
+    finally:
+        stop_writer()
+    for name, count in before.items():
+        assert metrics.ingest_stage_seconds.count(name) == count + 1
+
+def test_metrics_endpoint_and_profiler(session, monkeypatch):
+    from fastapi.testclient import TestClient
+    from src.app.config import settings
+    from src.app.main import app
+    from src.app.db.session import get_session, get_read_session
+
+    app.dependency_overrides[get_session] = lambda: session
+    app.dependency_overrides[get_read_session] = lambda: session
+    try:
+        client = TestClient(app)
+        validated = metrics.ingest_stage_seconds.count("validate")
+        client.post("/api/telemetry/batch", json=[{"object_id": "x"}])
+        invalid = client.post("/api/telemetry/", json={"object_id": "x"})
+        assert invalid.status_code == 422 and invalid.json()["detail"][0]["loc"][0] == "body"
+        assert metrics.ingest_stage_seconds.count("validate") == validated + 2
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'geofence_ingest_stage_seconds_bucket{stage="validate",le="+Inf"}' in response.text
+        assert "geofence_points_rejected_total" in response.text
+        assert "# TYPE geofence_objects_tracked gauge" in response.text
+
+        # Off by default
+        assert client.post("/api/debug/profiler/start").status_code == 404
+        monkeypatch.setattr(settings, "profiler_endpoints_enabled", True)
+        assert client.post("/api/debug/profiler/start", params={"interval_ms": 1, "duration_s": 5}).json()["running"]
+        assert client.post("/api/debug/profiler/start").status_code == 409
+        time.sleep(0.05)
+        status = client.post("/api/debug/profiler/stop").json()
+        assert not status["running"] and status["samples"] > 0
+        collapsed = client.get("/api/debug/profiler/collapsed").text
+        assert collapsed and collapsed.splitlines()[0].rsplit(" ", 1)[1].isdigit()
+    finally:
+        app.dependency_overrides.clear()
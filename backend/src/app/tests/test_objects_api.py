@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi.testclient import TestClient
+from src.app.db.models import Position, TelemetryData, TelemetryPoint
+from src.app.db.session import get_read_session, get_session
+from src.app.main import app
+
+T0 = datetime(2026, 2, 1, 12, 0, tzinfo=timezone.utc)
+
+def point(object_id, seconds, lat, lon):
+    return TelemetryPoint(object_id=object_id, ts=T0 + timedelta(seconds=seconds), position=Position(lat=lat, lon=lon),
+                          confidence=1.0, telemetry=TelemetryData(speed_mps=1, heading_deg=0))
+
+@pytest.fixture
+def client(session):
+    from src.app.services.ingestion import process_batch
+
+    process_batch([point(f"obj-{i}", 0, 10 + i, 10 + i) for i in range(5)], session)
+    app.dependency_overrides[get_session] = lambda: session
+    app.dependency_overrides[get_read_session] = lambda: session
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+def test_full_listing_with_etag_and_bbox(client):
+    response = client.get("/api/objects/")
+    assert sorted(o["id"] for o in response.json()) == [f"obj-{i}" for i in range(5)]
+    etag = response.headers["ETag"]
+    assert client.get("/api/objects/", headers={"If-None-Match": etag}).status_code == 304
+
+    inside = client.get("/api/objects/", params={"bbox": "10.5,10.5,12.5,12.5"}).json()
+    assert sorted(o["id"] for o in inside) == ["obj-1", "obj-2"]
+    # Longitude first, as for /ws/stream
+    band = client.get("/api/objects/", params={"bbox": "0,10.5,50,11.5"}).json()
+    assert [o["id"] for o in band] == ["obj-1"]
+    assert client.get("/api/objects/", params={"bbox": "1,2,3"}).status_code == 422
+    assert client.get("/api/objects/", params={"bbox": "3,2,1,4"}).status_code == 422
+
+def test_since_returns_only_changes_and_tombstones(session, client):
+    from src.app.services.ingestion import process_batch
+
+    first = client.get("/api/objects/", params={"since": "0", "bbox": "9,9,13,13"}).json()
+    assert not first["reset"] and len(first["objects"]) == 4 and first["removed"] == []
+    cursor = first["cursor"]
+
+    unchanged = client.get("/api/objects/", params={"since": cursor, "bbox": "9,9,13,13"})
+    assert unchanged.json()["objects"] == [] and unchanged.json()["cursor"] == cursor
+    assert client.get("/api/objects/", params={"since": cursor, "bbox": "9,9,13,13"},
+                      headers={"If-None-Match": unchanged.headers["ETag"]}).status_code == 304
+
+    # obj-1 moves within the viewport, obj-2 leaves it, obj-9 appears in it
+    process_batch([point("obj-1", 1, 11.5, 11.5), point("obj-2", 1, 40, 40), point("obj-9", 1, 12, 12)], session)
+    delta = client.get("/api/objects/", params={"since": cursor, "bbox": "9,9,13,13"}).json()
+    assert sorted(o["id"] for o in delta["objects"]) == ["obj-1", "obj-9"]
+    assert delta["removed"] == ["obj-2"]
+    assert delta["cursor"] != cursor
+
+    stale = client.get("/api/objects/", params={"since": "1-1"}).json()
+    assert stale["reset"] and len(stale["objects"]) == 6
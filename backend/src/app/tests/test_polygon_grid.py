@@ -0,0 +1,130 @@
+import json
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import Polygon
+from src.app.db.models import Zone
+from src.app.services.polygon_grid import PolygonGrid
+from src.app.services.zone_eval import CompiledZone, points_in_zones
+
+def _coastline(rng, n, holes=True):
+    """
+    A wiggly ring of n vertices around (10, 60), with a few round holes.
+    """
+    t = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    r = 1 + sum(rng.normal() * 0.3 / k * np.sin(k * t + rng.uniform(0, 6)) for k in range(1, 60))
+    r = r + 0.01 * rng.normal(size=n)
+    shell = np.c_[10 + 5 * np.cos(t) * r, 60 + 3 * np.sin(t) * r]
+    interiors = []
+    if holes:
+        s = np.linspace(0, 2 * np.pi, 40, endpoint=False)
+        for dx in (-0.3, 0.3):
+            interiors.append(np.c_[10 + dx + 0.1 * np.cos(s), 60 + 0.1 * np.sin(s)])
+    return Polygon(shell, interiors)
+
+def _samples(rng, polygon, n):
+    """
+    Uniform points in the bbox plus every vertex, edge midpoint and points
+    just off each edge, where rounding is hardest.
+    """
+    min_x, min_y, max_x, max_y = polygon.bounds
+    xs = [rng.uniform(min_x, max_x, n)]
+    ys = [rng.uniform(min_y, max_y, n)]
+    for ring in (polygon.exterior, *polygon.interiors):
+        coords = np.asarray(ring.coords)
+        mid = (coords[:-1] + coords[1:]) / 2
+        xs += [coords[:, 0], mid[:, 0], np.nextafter(mid[:, 0], np.inf)]
+        ys += [coords[:, 1], mid[:, 1], mid[:, 1]]
+    # Grid lines and cell corners
+    xs.append(np.linspace(min_x, max_x, 97))
+    ys.append(np.linspace(min_y, max_y, 97))
+    return np.concatenate(xs), np.concatenate(ys)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_grid_matches_shapely_contains(seed):
+    rng = np.random.default_rng(seed)
+    polygon = _coastline(rng, int(rng.integers(500, 20000)), holes=seed % 2 == 0)
+    # No build budget: exactness must not depend on the shape being easy
+    grid = PolygonGrid(polygon, max_binned_per_edge=10 ** 6, max_stored_per_edge=10 ** 6)
+    x, y = _samples(rng, polygon, 20000)
+
+    expected = shapely.contains_xy(polygon, x, y)
+    assert np.array_equal(grid.contains_xy(x, y), expected)
+    some = rng.choice(x.size, 2000, replace=False)
+    assert [grid.contains(x[i], y[i]) for i in some] == expected[some].tolist()
+
+def test_grid_matches_shapely_on_self_intersecting_ring():
+    rng = np.random.default_rng(7)
+    # A random-walk ring crosses itself many times; Shapely still answers
+    # contains_xy by even-odd crossing counts
+    steps = rng.normal(size=(3000, 2)).cumsum(axis=0)
+    polygon = Polygon(steps)
+    grid = PolygonGrid(polygon, resolution=32, max_binned_per_edge=10 ** 6, max_stored_per_edge=10 ** 6)
+    x, y = _samples(rng, polygon, 20000)
+    assert np.array_equal(grid.contains_xy(x, y), shapely.contains_xy(polygon, x, y))
+
+def test_compiled_zone_uses_grid_above_threshold(monkeypatch):
+    from src.app.config import settings
+    monkeypatch.setattr(settings, "polygon_grid_min_vertices", 1000)
+    rng = np.random.default_rng(3)
+    polygon = _coastline(rng, 3000, holes=False)
+    coords = [[lat, lon] for lon, lat in polygon.exterior.coords]
+    big = Zone(id=1, name="Coast", is_polygon=True, polygon_coords=json.dumps(coords))
+    small = Zone(id=2, name="Triangle", is_polygon=True, polygon_coords="[[58, 8], [62, 8], [58, 12]]")
+
+    compiled = [CompiledZone(big), CompiledZone(small)]
+    assert compiled[0].grid is not None
+    assert compiled[1].grid is None
+
+    x, y = _samples(rng, polygon, 5000)
+    matrix = points_in_zones(y, x, compiled)
+    assert np.array_equal(matrix[:, 0], shapely.contains_xy(polygon, x, y))
+    for i in range(0, x.size, 97):
+        assert compiled[0].contains(y[i], x[i]) is bool(matrix[i, 0])
+
+def _star(rng, n):
+    """
+    Spikes of random length all the way round: every cell is a boundary
+    cell crossed by long edges, the worst case for a grid.
+    """
+    t = np.linspace(0, 2 * np.pi, n, endpoint=False)
+    r = 1 + 0.3 * rng.uniform(size=n)
+    return Polygon(np.c_[10 + np.cos(t) * r, 60 + np.sin(t) * r])
+
+def test_costly_polygon_falls_back_to_prepared_geometry(monkeypatch):
+    from src.app.config import settings
+    from src.app.services.polygon_grid import GridCache, GridTooCostly, grid_cache
+    monkeypatch.setattr(settings, "polygon_grid_min_vertices", 1000)
+    rng = np.random.default_rng(11)
+    polygon = _star(rng, 8000)
+    with pytest.raises(GridTooCostly):
+        PolygonGrid(polygon)
+
+    coords = [[lat, lon] for lon, lat in polygon.exterior.coords]
+    compiled = CompiledZone(Zone(id=1, name="Star", is_polygon=True, polygon_coords=json.dumps(coords)))
+    assert compiled.grid is None
+    assert grid_cache.export([compiled.polygon]) == {GridCache.key(compiled.polygon): None}
+    x, y = _samples(rng, polygon, 5000)
+    assert np.array_equal(points_in_zones(y, x, [compiled])[:, 0], shapely.contains_xy(polygon, x, y))
+
+def test_grid_is_built_once_per_polygon(monkeypatch):
+    from src.app.config import settings
+    from src.app.services import polygon_grid
+    monkeypatch.setattr(settings, "polygon_grid_min_vertices", 1000)
+    polygon = _coastline(np.random.default_rng(12), 3000, holes=False)
+    coords = json.dumps([[lat, lon] for lon, lat in polygon.exterior.coords])
+
+    built = []
+    original = polygon_grid.PolygonGrid
+    monkeypatch.setattr(polygon_grid, "PolygonGrid", lambda *args: built.append(1) or original(*args))
+    first = CompiledZone(Zone(id=1, name="Coast", is_polygon=True, polygon_coords=coords))
+    again = CompiledZone(Zone(id=2, name="Same coast", is_polygon=True, polygon_coords=coords))
+    assert first.grid is again.grid is not None
+    assert len(built) == 1
+
+    # Another process seeded with the exported grids does not build either
+    exported = polygon_grid.grid_cache.export([first.polygon])
+    polygon_grid.grid_cache.reset()
+    polygon_grid.grid_cache.seed(exported)
+    assert CompiledZone(Zone(id=3, name="Copy", is_polygon=True, polygon_coords=coords)).grid is first.grid
+    assert len(built) == 1
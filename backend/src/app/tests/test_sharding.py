@@ -0,0 +1,143 @@
+import random
+from datetime import datetime, timedelta, timezone
+from sqlmodel import SQLModel, Session, create_engine, select
+from src.app.db.models import AlertEvent, AlertType, Position, TelemetryData, TelemetryPoint, Zone
+from src.app.db.session import configure_sqlite
+from src.app.db.writer import run_write, start_writer, stop_writer
+from src.app.services.alert_policy import alert_suppressor
+from src.app.services.staleness import stale_monitor
+from src.app.services.state_store import state_store
+from src.app.services.zone_registry import zone_registry
+
+T0 = datetime(2026, 2, 1, 12, 0, tzinfo=timezone.utc)
+LATE_ZONE = dict(name="Late", min_lat=14.0, min_lon=14.0, max_lat=16.0, max_lon=16.0)
+
+def batches(seed=7, objects=12, steps=40, size=60):
+    """
+    Random walks across the edges of the 10..20 box with some low
+    confidence points, shuffled into batches (per-object order is restored
+    by ts).
+    """
+    rng = random.Random(seed)
+    points = []
+    for i in range(objects):
+        lat, lon = rng.uniform(8, 22), rng.uniform(8, 22)
+        for step in range(steps):
+            lat = min(max(lat + rng.uniform(-2, 2), -90), 90)
+            lon = min(max(lon + rng.uniform(-2, 2), -180), 180)
+            points.append(TelemetryPoint(
+                object_id=f"obj-{i}", ts=T0 + timedelta(seconds=step), position=Position(lat=lat, lon=lon),
+                confidence=0.3 if rng.random() < 0.2 else 0.9, telemetry=TelemetryData(speed_mps=1, heading_deg=0),
+            ))
+    points.sort(key=lambda p: p.ts)
+    return [points[i:i + size] for i in range(0, len(points), size)]
+
+def add_zone(session):
+    zone = Zone(**LATE_ZONE)
+    session.add(zone)
+    session.flush()
+    session.expunge(zone)
+    return zone
+
+def low_confidence_ids(session):
+    session.rollback()  # end the read snapshot; the writer commits on its own connection
+    return {a.id for a in session.exec(select(AlertEvent).where(AlertEvent.alert_type == AlertType.LOW_CONFIDENCE))}
+
+def outcome(session):
+    session.rollback()
+    alerts = sorted((a.object_id, a.zone_id, a.alert_type.value, a.occurrences, a.first_ts, a.last_ts)
+                    for a in session.exec(select(AlertEvent)))
+    with state_store.lock:
+        states = sorted((k, s.is_inside) for k, s in state_store.zone_states.items())
+        objects = sorted((o.id, o.last_lat, o.last_lon) for o in state_store.objects.values())
+    return alerts, states, objects
+
+def test_sharded_ingest_matches_in_process(session, tmp_path):
+    from src.app.services.ingestion import process_batch
+    from src.app.services.sharding import IngestShards
+
+    # Halfway a zone is added; at three quarters every LOW_CONFIDENCE alert
+    # is acknowledged, so repeats start new alerts
+    work = batches()
+    for i, batch in enumerate(work):
+        if i == len(work) // 2:
+            session.add(Zone(**LATE_ZONE))
+            session.commit()
+            zone_registry.reset()
+        if i == 3 * len(work) // 4:
+            alert_suppressor.close(low_confidence_ids(session))
+        process_batch(batch, session)
+    expected = outcome(session)
+    assert any(alert[2] == "LOW_CONFIDENCE" and alert[3] > 1 for alert in expected[0])
+
+    url = f"sqlite:///{tmp_path / 'sharded.db'}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    configure_sqlite(engine)
+    SQLModel.metadata.create_all(engine)
+    for cache in (zone_registry, state_store, stale_monitor, alert_suppressor):
+        cache.reset()
+    shards = IngestShards(3, url)
+    with Session(engine) as sharded:
+        sharded.add(Zone(name="Box", min_lat=10.0, min_lon=10.0, max_lat=20.0, max_lon=20.0))
+        sharded.commit()
+        shards.start()
+        start_writer(engine, 64, 0.001)
+        try:
+            for i, batch in enumerate(work):
+                if i == len(work) // 2:
+                    zone = run_write(add_zone, sharded)
+                    zone_registry.upsert(zone)
+                    shards.zones_changed()
+                if i == 3 * len(work) // 4:
+                    shards.close_alerts(low_confidence_ids(sharded))
+                shards.process_batch(batch, sharded)
+            assert shards.stats()["alive"] == 3
+        finally:
+            stop_writer()
+            shards.stop()
+        assert outcome(sharded) == expected
+    engine.dispose()
+
+def test_failed_write_rolls_back_shard_state(session, tmp_path, monkeypatch):
+    import pytest
+    from src.app.services import ingestion
+    from src.app.services.sharding import IngestShards
+
+    def point(object_id, lat, lon, seconds=0):
+        return TelemetryPoint(object_id=object_id, ts=T0 + timedelta(seconds=seconds), position=Position(lat=lat, lon=lon),
+                              confidence=1.0, telemetry=TelemetryData(speed_mps=1, heading_deg=0))
+
+    def broken(result, s, clock):
+        raise RuntimeError("disk full")
+
+    url = f"sqlite:///{tmp_path / 'sharded.db'}"
+    engine = create_engine(url, connect_args={"check_same_thread": False})
+    configure_sqlite(engine)
+    SQLModel.metadata.create_all(engine)
+    for cache in (zone_registry, state_store, stale_monitor, alert_suppressor):
+        cache.reset()
+    shards = IngestShards(2, url)
+    with Session(engine) as sharded:
+        sharded.add(Zone(name="Box", min_lat=10.0, min_lon=10.0, max_lat=20.0, max_lon=20.0))
+        sharded.commit()
+        shards.start()
+        start_writer(engine, 64, 0.001)
+        try:
+            shards.process_batch([point("a", 15.0, 15.0)], sharded)
+            # "a" leaves the zone and "b" enters it, but nothing is stored
+            retry = [point("a", 30.0, 30.0, seconds=1), point("b", 15.0, 15.0, seconds=1)]
+            with monkeypatch.context() as m:
+                m.setattr(ingestion, "_write_rows", broken)
+                with pytest.raises(RuntimeError):
+                    shards.process_batch(retry, sharded)
+            assert state_store.inside["a"] == {1} and "b" not in state_store.objects
+
+            # The shards were put back too: sent again, the points raise the lost alerts
+            shards.process_batch(retry, sharded)
+        finally:
+            stop_writer()
+            shards.stop()
+        sharded.rollback()
+        alerts = sorted((a.object_id, a.alert_type.value) for a in sharded.exec(select(AlertEvent)))
+        assert alerts == [("a", "ENTER"), ("a", "EXIT"), ("b", "ENTER")]
+    engine.dispose()
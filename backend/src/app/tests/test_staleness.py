@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, inspect
+from sqlmodel import select
+from src.app.db.models import AlertEvent, AlertType, ObjectInference, Position, TelemetryData, TelemetryPoint, Zone
+from src.app.services.staleness import StaleMonitor, stale_monitor
+
+T0 = datetime(2026, 2, 1, 12, 0, tzinfo=timezone.utc)
+
+def point(object_id, seconds, lat=30.0, lon=30.0, category=None):
+    return TelemetryPoint(
+        object_id=object_id, ts=T0 + timedelta(seconds=seconds), position=Position(lat=lat, lon=lon),
+        confidence=1.0, telemetry=TelemetryData(speed_mps=1, heading_deg=0),
+        inference=ObjectInference(category=category, class_confidence=0.9) if category else None,
+    )
+
+def test_deadlines_fire_once_and_rearm():
+    monitor = StaleMonitor(60, {"BEACON": 600})
+    start = T0.timestamp()
+    monitor.touch("a", T0, *monitor.timeout_for(None, []))
+    monitor.touch("b", T0, *monitor.timeout_for("BEACON", []))
+    assert monitor.due(start + 59) == []
+
+    # a reported again before its deadline; its old heap entry is skipped
+    monitor.touch("a", T0 + timedelta(seconds=30), 60)
+    assert monitor.due(start + 61) == []
+    assert [e[0] for e in monitor.due(start + 91)] == ["a"]
+    assert monitor.due(start + 500) == []
+    assert [e[0] for e in monitor.due(start + 600)] == ["b"]
+
+    # Reporting clears the stale mark, so a second silence fires again
+    monitor.touch("a", T0 + timedelta(seconds=700), 60)
+    assert [e[0] for e in monitor.due(start + 760)] == ["a"]
+
+    # A shorter timeout takes effect immediately
+    monitor.touch("c", T0, 600)
+    monitor.touch("c", T0, 10)
+    assert [e[0] for e in monitor.due(start + 10)] == ["c"]
+
+def test_ingest_arms_and_check_raises_then_clears(session):
+    from src.app.services.ingestion import process_batch
+
+    engine = session.get_bind()
+    zone = session.get(Zone, 1)
+    zone.stale_timeout_s = 30
+    session.add(zone)
+    session.commit()
+
+    process_batch([point("drifter", 0), point("beacon", 0, category="BEACON"), point("parked", 0, lat=15, lon=15)], session)
+    at = lambda seconds: T0 + timedelta(seconds=seconds)
+    # Only the object inside the 30 s zone is due
+    assert stale_monitor.check(engine, now=at(31)) == 1
+    assert stale_monitor.check(engine, now=at(60)) == 0
+    assert stale_monitor.check(engine, now=at(300)) == 2
+    stale = session.exec(select(AlertEvent).where(AlertEvent.alert_type == AlertType.STALE)).all()
+    assert sorted((a.object_id, a.zone_id, a.ack) for a in stale) == \
+        [("beacon", None, False), ("drifter", None, False), ("parked", 1, False)]
+
+    # A restart rebuilds from last_seen and does not raise them again,
+    # even once they are acknowledged
+    next(a for a in stale if a.object_id == "parked").ack = True
+    session.commit()
+    stale_monitor.reset()
+    stale_monitor.load(session, now=at(400))
+    assert stale_monitor.check(engine, now=at(400)) == 0
+
+    process_batch([point("drifter", 500)], session)
+    assert stale_monitor.check(engine, now=at(501)) == 0
+    session.expire_all()
+    acked = {a.object_id: a.ack for a in session.exec(select(AlertEvent).where(AlertEvent.alert_type == AlertType.STALE))}
+    assert acked == {"beacon": False, "drifter": True, "parked": True}
+
+def test_load_does_not_alert_objects_already_past_their_deadline(session):
+    from src.app.services.ingestion import process_batch
+
+    engine = session.get_bind()
+    process_batch([point("gone", 0), point("fresh", 250)], session)
+    # Restarted after "gone" went silent, with no STALE alert stored
+    stale_monitor.reset()
+    stale_monitor.load(session, now=T0 + timedelta(seconds=400))
+    assert stale_monitor.check(engine, now=T0 + timedelta(seconds=400)) == 0
+    assert stale_monitor.check(engine, now=T0 + timedelta(seconds=600)) == 1
+    alerts = session.exec(select(AlertEvent).where(AlertEvent.alert_type == AlertType.STALE)).all()
+    assert [a.object_id for a in alerts] == ["fresh"]
+
+    # Reporting again re-arms it as usual
+    process_batch([point("gone", 700)], session)
+    assert stale_monitor.check(engine, now=T0 + timedelta(seconds=1001)) == 1
+
+def test_create_db_adds_new_columns(tmp_path):
+    from src.app.db.session import create_db_and_tables
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE zone (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, min_lat FLOAT, min_lon FLOAT, "
+            "max_lat FLOAT, max_lon FLOAT, is_polygon BOOLEAN NOT NULL, polygon_coords VARCHAR, "
+            "enabled BOOLEAN NOT NULL, color VARCHAR NOT NULL)"
+        )
+    create_db_and_tables(engine)
+    assert "stale_timeout_s" in {c["name"] for c in inspect(engine).get_columns("zone")}
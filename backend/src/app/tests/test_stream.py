@@ -0,0 +1,100 @@
+from datetime import datetime, timezone
+from src.app.db.models import TelemetryPoint, Position, TelemetryData
+
+# Helper to create a point payload
+def point_json(object_id, lat, lon):
+    return TelemetryPoint(
+        object_id=object_id,
+        ts=datetime.now(timezone.utc),
+        position=Position(lat=lat, lon=lon),
+        confidence=1.0,
+        telemetry=TelemetryData(speed_mps=10, heading_deg=0)
+    ).model_dump(mode="json")
+
+def test_stream_pushes_updates_and_alerts(session):
+    from fastapi.testclient import TestClient
+    from src.app.main import app
+    from src.app.db.session import get_session, get_read_session
+
+    app.dependency_overrides[get_session] = lambda: session
+    app.dependency_overrides[get_read_session] = lambda: session
+    try:
+        client = TestClient(app)
+        client.post("/api/telemetry/", json=point_json("far", 50.0, 50.0))
+
+        with client.websocket_connect("/ws/stream?bbox=0,0,30,30") as ws:
+            snapshot = ws.receive_json()
+            assert snapshot["type"] == "snapshot"
+            assert snapshot["objects"] == []
+
+            client.post("/api/telemetry/", json=point_json("near", 15.0, 15.0))
+            client.post("/api/telemetry/", json=point_json("far", 51.0, 51.0))
+            frame = ws.receive_json()
+            assert frame["type"] == "update"
+            assert [obj["id"] for obj in frame["objects"]] == ["near"]
+            assert [(a["object_id"], a["alert_type"]) for a in frame["alerts"]] == [("near", "ENTER")]
+            assert frame["alerts"][0]["id"] is not None
+
+            # Leaving the viewport is reported as a removal
+            client.post("/api/telemetry/", json=point_json("near", 40.0, 40.0))
+            frame = ws.receive_json()
+            assert frame["objects"] == []
+            assert frame["removed"] == ["near"]
+
+            # A frame that is not JSON is ignored; the connection keeps working
+            ws.send_text("{not json")
+            ws.send_bytes(b"\xff")
+            ws.send_json({"bbox": [35, 35, 45, 45]})
+            snapshot = ws.receive_json()
+            assert snapshot["type"] == "snapshot"
+            assert [obj["id"] for obj in snapshot["objects"]] == ["near"]
+    finally:
+        app.dependency_overrides.clear()
+
+def test_stream_matches_objects_api_and_pushes_alert_updates(session, monkeypatch):
+    from fastapi.testclient import TestClient
+    from src.app.db.models import AlertType, ObjectInference
+    from src.app.main import app
+    from src.app.db.session import get_session, get_read_session
+    from src.app.services.alert_policy import alert_suppressor
+    monkeypatch.setattr(alert_suppressor, "cooldowns", {AlertType.ENTER: 600.0})
+
+    app.dependency_overrides[get_session] = lambda: session
+    app.dependency_overrides[get_read_session] = lambda: session
+    try:
+        client = TestClient(app)
+        with client.websocket_connect("/ws/stream") as ws:
+            ws.receive_json()
+            point = point_json("buoy", 15.0, 15.0)
+            point["inference"] = ObjectInference(category="BEACON", class_confidence=0.9).model_dump(mode="json")
+            client.post("/api/telemetry/", json=point)
+            frame = ws.receive_json()
+            # Same shape as the REST listing, category included
+            assert frame["objects"] == client.get("/api/objects/").json()
+            entered = frame["alerts"][0]
+
+            # Out and back in within the cooldown: the stored ENTER is updated, not repeated
+            client.post("/api/telemetry/", json=point_json("buoy", 40.0, 40.0))
+            ws.receive_json()
+            client.post("/api/telemetry/", json=point_json("buoy", 15.0, 15.0))
+            frame = ws.receive_json()
+            assert frame["alerts"] == []
+            assert [(a["id"], a["occurrences"]) for a in frame["alert_updates"]] == [(entered["id"], 2)]
+    finally:
+        app.dependency_overrides.clear()
+
+def test_slow_client_drops_oldest():
+    import asyncio
+    from src.app.services.stream import StreamClient
+
+    loop = asyncio.new_event_loop()
+    try:
+        client = StreamClient(loop, max_fps=1, bbox=None, max_pending=2)
+        objects = [{"id": f"obj{i}", "last_lat": 0.0, "last_lon": 0.0} for i in range(4)]
+        client.offer(objects, [])
+        frame = client.take_frame()
+        assert [obj["id"] for obj in frame["objects"]] == ["obj2", "obj3"]
+        assert frame["dropped"] == 2
+        assert client.take_frame() is None
+    finally:
+        loop.close()
@@ -0,0 +1,63 @@
+import threading
+import pytest
+from sqlmodel import SQLModel, Session, create_engine, select
+from src.app.db.models import Zone
+from src.app.db.session import after_commit, configure_sqlite
+from src.app.db.writer import GroupCommitWriter
+
+@pytest.fixture
+def writer(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'writer.db'}", connect_args={"check_same_thread": False})
+    configure_sqlite(engine)
+    SQLModel.metadata.create_all(engine)
+    writer = GroupCommitWriter(engine, max_batch=64, max_delay_s=0.05)
+    writer.start()
+    yield writer
+    writer.stop()
+
+def add_zone(name):
+    def job(session):
+        session.add(Zone(name=name, min_lat=0, min_lon=0, max_lat=1, max_lon=1))
+        return name
+    return job
+
+def test_concurrent_writes_share_commits(writer):
+    results = []
+    barrier = threading.Barrier(20)
+
+    def worker(i):
+        barrier.wait()
+        results.append(writer.run(add_zone(f"z{i}")))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sorted(results) == sorted(f"z{i}" for i in range(20))
+    assert writer.jobs_committed == 20
+    assert writer.commits < 20
+    with Session(writer.engine) as session:
+        assert len(session.exec(select(Zone)).all()) == 20
+
+def test_failing_job_does_not_undo_its_group(writer):
+    committed = []
+
+    def good(session):
+        add_zone("good")(session)
+        after_commit(session, lambda: committed.append("good"))
+
+    def bad(session):
+        add_zone("bad")(session)
+        after_commit(session, lambda: committed.append("bad"))
+        raise ValueError("boom")
+
+    futures = [writer.submit(good), writer.submit(bad)]
+    futures[0].result()
+    with pytest.raises(ValueError):
+        futures[1].result()
+
+    assert committed == ["good"]
+    with Session(writer.engine) as session:
+        assert [z.name for z in session.exec(select(Zone))] == ["good"]
@@ -58,3 +58,38 @@ def test_point_on_corner(test_zone):
     from src.app.services.zone_eval import is_point_in_zone
     p_corner = create_point(10.0, 10.0)
     assert is_point_in_zone(p_corner, test_zone) is True
+
+def test_compiled_zone_matches_is_point_in_zone(test_zone):
+    from src.app.services.zone_eval import is_point_in_zone, CompiledZone
+    polygon_zone = Zone(
+        name="Triangle",
+        is_polygon=True,
+        polygon_coords="[[10, 10], [20, 10], [10, 20]]"
+    )
+    broken_zone = Zone(name="Broken", is_polygon=True, polygon_coords="[[10, 10]]")
+    empty_zone = Zone(name="Empty")
+    samples = [(15.0, 15.0), (12.0, 12.0), (10.0, 10.0), (10.0, 15.0), (20.0, 20.0), (9.0, 15.0), (14.0, 14.0)]
+    for zone in (test_zone, polygon_zone, broken_zone, empty_zone):
+        compiled = CompiledZone(zone)
+        for lat, lon in samples:
+            assert compiled.contains(lat, lon) is is_point_in_zone(create_point(lat, lon), zone)
+
+def test_points_in_zones_matches_scalar(test_zone):
+    import numpy as np
+    from src.app.services.zone_eval import is_point_in_zone, points_in_zones
+    polygon_zone = Zone(
+        name="Triangle",
+        is_polygon=True,
+        polygon_coords="[[10, 10], [20, 10], [10, 20]]"
+    )
+    empty_zone = Zone(name="Empty")
+    zones = [test_zone, polygon_zone, empty_zone]
+    # Inside, outside on each side, every edge and every corner of the bbox
+    lats = np.array([15.0, 21.0, 9.0, 15.0, 15.0, 10.0, 20.0, 15.0, 15.0, 10.0, 10.0, 20.0, 20.0, 12.0])
+    lons = np.array([15.0, 15.0, 15.0, 21.0, 9.0, 15.0, 15.0, 10.0, 20.0, 10.0, 20.0, 10.0, 20.0, 12.0])
+
+    matrix = points_in_zones(lats, lons, zones)
+    assert matrix.shape == (len(lats), len(zones))
+    for i, (lat, lon) in enumerate(zip(lats, lons)):
+        for j, zone in enumerate(zones):
+            assert matrix[i, j] == is_point_in_zone(create_point(lat, lon), zone)
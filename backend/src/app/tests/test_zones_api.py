@@ -0,0 +1,106 @@
+from datetime import datetime, timezone
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import select
+from src.app.db.models import AlertEvent, AlertType, Position, TelemetryData, TelemetryPoint
+from src.app.db.session import get_read_session, get_session
+from src.app.main import app
+from src.app.services.state_store import state_store
+
+T0 = datetime(2026, 2, 1, 12, 0, tzinfo=timezone.utc)
+
+def point(object_id, lat, lon):
+    return TelemetryPoint(object_id=object_id, ts=T0, position=Position(lat=lat, lon=lon),
+                          confidence=1.0, telemetry=TelemetryData(speed_mps=1, heading_deg=0))
+
+def alerts(session):
+    session.expire_all()
+    return [(a.object_id, a.alert_type) for a in session.exec(select(AlertEvent).order_by(AlertEvent.id)).all()]
+
+@pytest.fixture
+def client(session):
+    from src.app.services.ingestion import process_batch
+
+    # "in" is inside the 10..20 box (zone 1), "out" is east of it
+    process_batch([point("in", 15.0, 15.0), point("out", 15.0, 25.0)], session)
+    app.dependency_overrides[get_session] = lambda: session
+    app.dependency_overrides[get_read_session] = lambda: session
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+def test_patch_geometry_flips_only_objects_that_change_side(session, client):
+    assert alerts(session) == [("in", AlertType.ENTER)]
+
+    # Widen the box east: "out" is now inside, "in" stays inside
+    response = client.patch("/api/zones/1", json={"max_lon": 30.0})
+    assert response.status_code == 200 and response.json()["max_lon"] == 30.0
+    assert alerts(session)[1:] == [("out", AlertType.ENTER)]
+    assert state_store.inside["out"] == {1}
+
+    # Renaming is not a geometry change
+    client.patch("/api/zones/1", json={"name": "Renamed"})
+    assert len(alerts(session)) == 2
+
+    # Shrink it away from both
+    client.patch("/api/zones/1", json={"min_lon": 26.0})
+    assert sorted(alerts(session)[2:]) == [("in", AlertType.EXIT), ("out", AlertType.EXIT)]
+    assert not state_store.inside["in"] and not state_store.inside["out"]
+
+    assert client.patch("/api/zones/99", json={"enabled": False}).status_code == 404
+
+def test_disable_and_enable(session, client):
+    from src.app.services.ingestion import process_batch
+
+    client.patch("/api/zones/1", json={"enabled": False})
+    # Disabling marks objects outside without alerting
+    assert alerts(session) == [("in", AlertType.ENTER)]
+    assert not state_store.inside["in"]
+    assert not state_store.zone_states[("in", 1)].is_inside
+
+    client.patch("/api/zones/1", json={"enabled": True})
+    assert alerts(session)[1:] == [("in", AlertType.ENTER)]
+
+    # The next report from an object already inside raises nothing more
+    process_batch([point("in", 15.5, 15.5).model_copy(update={"ts": T0.replace(minute=1)})], session)
+    assert len(alerts(session)) == 2
+
+def test_put_replaces_zone_with_polygon(session, client):
+    body = {"name": "Tri", "is_polygon": True, "polygon_coords": "[[5, 20], [25, 20], [25, 35]]", "enabled": True}
+    response = client.put("/api/zones/1", json=body)
+    assert response.status_code == 200 and response.json()["id"] == 1
+    # "in" (15, 15) is outside the triangle, "out" (15, 25) inside it
+    assert sorted(alerts(session)[1:]) == [("in", AlertType.EXIT), ("out", AlertType.ENTER)]
+
+def test_geometry_edit_on_a_large_fleet(session, client):
+    from src.app.services.ingestion import process_batch
+
+    process_batch([point(f"f{i}", 10.0 + (i % 100) * 0.1, 10.0 + (i // 100) * 0.1) for i in range(10000)], session)
+    before = len(alerts(session))
+    client.patch("/api/zones/1", json={"max_lat": 15.0})
+    # Rows 51..99 (lat above 15) leave the zone; the others keep their state
+    assert len(alerts(session)) - before == 49 * 100
+    assert sum(1 for zones in state_store.inside.values() if 1 in zones) == 51 * 100 + 1
+
+def test_explicit_null_is_rejected_for_required_fields(session, client):
+    for field in ("name", "enabled", "is_polygon", "color"):
+        assert client.patch("/api/zones/1", json={field: None}).status_code == 422
+    # Nullable fields can still be cleared
+    response = client.patch("/api/zones/1", json={"stale_timeout_s": None})
+    assert response.status_code == 200 and response.json()["enabled"] is True
+
+def test_zone_edit_alerts_go_through_the_alert_policy(session, client, monkeypatch):
+    from src.app.services import metrics
+    from src.app.services.alert_policy import alert_suppressor
+    monkeypatch.setattr(alert_suppressor, "cooldowns", {AlertType.ENTER: 600.0})
+
+    raised = metrics.alerts_raised.value("ENTER")
+    client.patch("/api/zones/1", json={"max_lon": 30.0})
+    client.patch("/api/zones/1", json={"max_lon": 20.0})
+    client.patch("/api/zones/1", json={"max_lon": 30.0})
+    # "out" entered twice within the cooldown: one alert with two occurrences
+    session.expire_all()
+    entered = session.exec(select(AlertEvent).where(AlertEvent.object_id == "out",
+                                                    AlertEvent.alert_type == AlertType.ENTER)).all()
+    assert len(entered) == 1 and entered[0].occurrences == 2
+    # Counted and logged like an ingest alert
+    assert metrics.alerts_raised.value("ENTER") == raised + 1
@@ -1,7 +1,45 @@
-import { TrackedObject, Zone, TelemetryRecord, AlertEvent } from './types.ts';
+import { TrackedObject, Zone, TelemetryRecord, AlertEvent, TrailsResponse } from './types.ts';
 
 const API_BASE = '/api'; // Vite proxy will handle this
 
+export type StreamFrame =
+    | { type: 'snapshot'; objects: TrackedObject[] }
+    | { type: 'update'; objects: TrackedObject[]; removed: string[]; alerts: AlertEvent[]; alert_updates: AlertEvent[]; dropped: number }
+    | { type: 'error'; detail: string };
+
+export interface StreamOptions {
+    maxFps?: number;
+    topics?: Array<'objects' | 'alerts'>;
+}
+
+// Subscribe to /ws/stream, reconnecting after drops. Returns an unsubscribe function.
+export const subscribeStream = (onFrame: (frame: StreamFrame) => void, options: StreamOptions = {}): (() => void) => {
+    const params = new URLSearchParams();
+    if (options.maxFps) params.set('max_fps', String(options.maxFps));
+    if (options.topics) params.set('topics', options.topics.join(','));
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    const url = `${protocol}://${window.location.host}/ws/stream?${params.toString()}`;
+
+    let socket: WebSocket | null = null;
+    let retry: ReturnType<typeof setTimeout> | null = null;
+    let closed = false;
+
+    const connect = () => {
+        socket = new WebSocket(url);
+        socket.onmessage = (e) => onFrame(JSON.parse(e.data) as StreamFrame);
+        socket.onclose = () => {
+            if (!closed) retry = setTimeout(connect, 2000);
+        };
+    };
+    connect();
+
+    return () => {
+        closed = true;
+        if (retry) clearTimeout(retry);
+        socket?.close();
+    };
+};
+
 export const api = {
     getObjects: async (): Promise<TrackedObject[]> => {
         const res = await fetch(`${API_BASE}/objects/`);
@@ -45,9 +83,33 @@ export const api = {
         if (!res.ok) throw new Error('Failed to acknowledge alert');
     },
 
+    ackAlerts: async (selection: { ids?: number[]; object_id?: string; zone_id?: number; until?: string }): Promise<number> => {
+        const res = await fetch(`${API_BASE}/alerts/ack`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(selection)
+        });
+        if (!res.ok) throw new Error('Failed to acknowledge alerts');
+        return (await res.json()).acknowledged;
+    },
+
+    getUnackedCount: async (cap: number = 1000): Promise<{ unacked: number; capped: boolean }> => {
+        const res = await fetch(`${API_BASE}/alerts/unacked/count?cap=${cap}`);
+        if (!res.ok) throw new Error('Failed to fetch unacknowledged count');
+        return res.json();
+    },
+
     getHistory: async (objectId: string, limit: number = 50): Promise<TelemetryRecord[]> => {
         const res = await fetch(`${API_BASE}/objects/${objectId}/history?limit=${limit}`);
         if (!res.ok) throw new Error('Failed to fetch history');
         return res.json();
+    },
+
+    getTrails: async (n: number = 30, since?: string | null): Promise<TrailsResponse> => {
+        const params = new URLSearchParams({ n: String(n) });
+        if (since) params.set('since', since);
+        const res = await fetch(`${API_BASE}/objects/trails?${params.toString()}`);
+        if (!res.ok) throw new Error('Failed to fetch trails');
+        return res.json();
     }
 };
@@ -23,6 +23,12 @@ export interface TelemetryRecord {
     battery_pct?: number | null;
 }
 
+export interface TrailsResponse {
+    cursor: string | null;
+    reset: boolean;
+    trails: { [objectId: string]: TelemetryRecord[] };
+}
+
 export interface Zone {
     id?: number | null;
     name: string;
@@ -45,4 +51,7 @@ export interface AlertEvent {
     alert_type: AlertType;
     message: string;
     ack: boolean;
+    occurrences?: number;
+    first_ts?: string | null;
+    last_ts?: string | null;
 }
@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from 'react';
-import { api } from '../api/client.ts';
+import { api, subscribeStream } from '../api/client.ts';
 import { AlertEvent, AlertType } from '../api/types.ts';
 import { Bell, CheckCircle, AlertTriangle, Info, MapPin, LogIn, LogOut, List } from 'lucide-react';
 import './AlertsPanel.css';
@@ -7,31 +7,62 @@ import './AlertsPanel.css';
 export const AlertsPanel: React.FC = () => {
     const [alerts, setAlerts] = useState<AlertEvent[]>([]);
     const [alertFilter, setAlertFilter] = useState('all');
+    const [unacked, setUnacked] = useState<{ unacked: number; capped: boolean }>({ unacked: 0, capped: false });
 
     useEffect(() => {
         const fetchAlerts = async () => {
             try {
-                const data = await api.getAlerts(20);
+                const [data, count] = await Promise.all([api.getAlerts(20), api.getUnackedCount()]);
                 setAlerts(data);
+                setUnacked(count);
             } catch (err) {
                 console.error("Failed to fetch alerts", err);
             }
         };
 
         fetchAlerts();
-        const interval = setInterval(fetchAlerts, 2000);
-        return () => clearInterval(interval);
+        // New alerts are pushed; refetch on (re)connect to fill any gap
+        return subscribeStream((frame) => {
+            if (frame.type === 'snapshot') {
+                fetchAlerts();
+            } else if (frame.type === 'update') {
+                if (frame.alerts.length > 0) {
+                    setAlerts(prev => [...frame.alerts.slice().reverse(), ...prev].slice(0, 20));
+                    const fresh = frame.alerts.filter(a => !a.ack).length;
+                    setUnacked(prev => ({ ...prev, unacked: prev.unacked + fresh }));
+                }
+                if (frame.alert_updates.length > 0) {
+                    // Repeats folded into alerts already on screen
+                    const updated = new Map(frame.alert_updates.map(a => [a.id, a]));
+                    setAlerts(prev => prev.map(a => updated.get(a.id) ?? a));
+                }
+            }
+        }, { topics: ['alerts'] });
     }, []);
 
     const handleAck = async (id: number) => {
         try {
             await api.ackAlert(id);
             setAlerts(prev => prev.map(a => a.id === id ? { ...a, ack: true } : a));
+            setUnacked(prev => ({ ...prev, unacked: Math.max(0, prev.unacked - 1) }));
         } catch (err) {
             console.error("Failed to ack alert", err);
         }
     };
 
+    const handleAckAll = async () => {
+        const newest = alerts[0];
+        if (!newest) return;
+        try {
+            // Everything up to the newest alert on screen, in one request
+            await api.ackAlerts({ until: newest.ts });
+            setAlerts(prev => prev.map(a => ({ ...a, ack: true })));
+            setUnacked(await api.getUnackedCount());
+        } catch (err) {
+            console.error("Failed to ack alerts", err);
+        }
+    };
+
     const getIcon = (type: AlertType) => {
         switch (type) {
             case 'ENTER': return <MapPin className="alert-icon enter" size={16} />;
@@ -45,7 +76,14 @@ export const AlertsPanel: React.FC = () => {
     return (
         <div className="alerts-panel">
             <div className="alerts-header">
-                <h3>Live Alerts</h3>
+                <h3>
+                    Live Alerts
+                    {unacked.unacked > 0 && (
+                        <span className="unacked-badge" onClick={handleAckAll} title="Acknowledge all">
+                            {unacked.capped ? `${unacked.unacked}+` : unacked.unacked}
+                        </span>
+                    )}
+                </h3>
                 <div className="filter-buttons">
                     <button
                         className={`filter-btn ${alertFilter === 'all' ? 'active' : ''}`}
@@ -90,6 +128,7 @@ export const AlertsPanel: React.FC = () => {
                         <div className="alert-top">
                             {getIcon(alert.alert_type)}
                             <span className="alert-type">{alert.alert_type}</span>
+                            {(alert.occurrences ?? 1) > 1 && <span className="alert-count">×{alert.occurrences}</span>}
                             <span className="alert-time">{new Date(alert.ts).toLocaleTimeString()}</span>
                         </div>
                         <div className="alert-message">{alert.message}</div>
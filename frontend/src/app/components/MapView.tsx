@@ -1,14 +1,16 @@
 import React, { useEffect, useRef, useState } from 'react';
 import maplibregl from 'maplibre-gl';
 import 'maplibre-gl/dist/maplibre-gl.css';
-import { api } from '../api/client.ts';
-import { TrackedObject, Zone } from '../api/types.ts';
+import { api, subscribeStream } from '../api/client.ts';
+import { TrackedObject, Zone, TelemetryRecord } from '../api/types.ts';
 import MapboxDraw from '@mapbox/mapbox-gl-draw';
 import '@mapbox/mapbox-gl-draw/dist/mapbox-gl-draw.css';
 import { Check, X, MapPin } from 'lucide-react';
 import { isAssetStale } from '../utils.ts';
 import './MapView.css';
 
+const TRAIL_LENGTH = 30;
+
 interface MapViewProps {
     onObjectSelect: (obj: TrackedObject | null) => void;
     onZoneSelect: (zone: Zone) => void;
@@ -42,6 +44,11 @@ export const MapView: React.FC<MapViewProps> = ({
     const onObjectSelectRef = useRef(onObjectSelect);
     const onZoneSelectRef = useRef(onZoneSelect);
     const onClearSelectionRef = useRef(onClearSelection);
+    const onObjectsUpdateRef = useRef(onObjectsUpdate);
+    const followedObjectIdRef = useRef(followedObjectId);
+    const objectsRef = useRef<Map<string, TrackedObject>>(new Map());
+    const trailsRef = useRef<Map<string, TelemetryRecord[]>>(new Map());
+    const trailCursorRef = useRef<string | null>(null);
 
     // Editing State
     const [isEditingZone, setIsEditingZone] = useState(false);
@@ -419,36 +426,56 @@ export const MapView: React.FC<MapViewProps> = ({
         }
     }, [mapStyle]);
 
-    // Polling Loop for Objects
+    // Live Object Stream (pushed by the backend instead of polled)
     useEffect(() => {
-        const interval = setInterval(async () => {
-            try {
-                const objects = await api.getObjects();
-                updateMarkers(objects);
-                updateTrails(objects);
-
-                // Follow Logic
-                if (followedObjectId && map.current) {
-                    const obj = objects.find(o => o.id === followedObjectId);
-                    if (obj) {
-                        map.current.easeTo({
-                            center: [obj.last_lon, obj.last_lat],
-                            duration: 1000,
-                            easing: (t) => t
-                        });
-                    }
-                }
+        followedObjectIdRef.current = followedObjectId;
+    }, [followedObjectId]);
 
-                if (onObjectsUpdate) {
-                    onObjectsUpdate(objects);
+    useEffect(() => {
+        onObjectsUpdateRef.current = onObjectsUpdate;
+    }, [onObjectsUpdate]);
+
+    useEffect(() => {
+        const unsubscribe = subscribeStream((frame) => {
+            if (frame.type === 'error') return;
+
+            const current = objectsRef.current;
+            if (frame.type === 'snapshot') current.clear();
+            frame.objects.forEach(o => current.set(o.id, o));
+            if (frame.type === 'update') frame.removed.forEach(id => current.delete(id));
+
+            const objects = Array.from(current.values());
+            updateMarkers(objects);
+
+            // Follow Logic
+            const followedId = followedObjectIdRef.current;
+            if (followedId && map.current) {
+                const obj = current.get(followedId);
+                if (obj) {
+                    map.current.easeTo({
+                        center: [obj.last_lon, obj.last_lat],
+                        duration: 1000,
+                        easing: (t) => t
+                    });
                 }
-            } catch (e) {
-                console.error("Polling error", e);
             }
+
+            if (onObjectsUpdateRef.current) {
+                onObjectsUpdateRef.current(objects);
+            }
+        }, { topics: ['objects'], maxFps: 1 });
+
+        return unsubscribe;
+    }, []);
+
+    // Trails are still refreshed on a timer
+    useEffect(() => {
+        const interval = setInterval(() => {
+            updateTrails(Array.from(objectsRef.current.values()));
         }, 1000);
 
         return () => clearInterval(interval);
-    }, [onObjectsUpdate, followedObjectId]);
+    }, []);
 
     // Trigger Drawing Mode from Sidebar
     useEffect(() => {
@@ -590,51 +617,66 @@ export const MapView: React.FC<MapViewProps> = ({
     const updateTrails = async (objects: TrackedObject[]) => {
         if (!map.current || !map.current.isStyleLoaded()) return;
 
+        let response;
+        try {
+            // One request for every trail; only points newer than the cursor come back
+            response = await api.getTrails(TRAIL_LENGTH, trailCursorRef.current);
+        } catch (e) {
+            console.error("Failed to update trails", e);
+            return;
+        }
+        if (!map.current) return;
+
+        const trails = trailsRef.current;
+        if (response.reset || !trailCursorRef.current) trails.clear();
+        trailCursorRef.current = response.cursor;
+        Object.entries(response.trails).forEach(([objectId, points]) => {
+            // A late point arrives after newer ones; keep each trail in time order
+            const merged = [...(trails.get(objectId) || []), ...points]
+                .sort((a, b) => Date.parse(a.ts) - Date.parse(b.ts));
+            trails.set(objectId, merged.slice(-TRAIL_LENGTH));
+        });
+
         for (const obj of objects) {
-            try {
-                const history = await api.getHistory(obj.id, 30);
-                if (history.length < 2) continue;
+            const history = trails.get(obj.id) || [];
+            if (history.length < 2) continue;
 
-                const sorted = history.sort((a, b) => new Date(a.ts).getTime() - new Date(b.ts).getTime());
-                const coordinates = sorted.map(r => [r.lon, r.lat]);
+            const coordinates = history.map(r => [r.lon, r.lat]);
 
-                const sourceId = `trail-${obj.id}`;
-                const layerId = `trail-layer-${obj.id}`;
+            const sourceId = `trail-${obj.id}`;
+            const layerId = `trail-layer-${obj.id}`;
 
-                const geoData: GeoJSON.FeatureCollection = {
-                    type: 'FeatureCollection',
-                    features: [{
-                        type: 'Feature',
-                        geometry: {
-                            type: 'LineString',
-                            coordinates: coordinates
-                        },
-                        properties: { objectId: obj.id }
-                    }]
-                };
+            const geoData: GeoJSON.FeatureCollection = {
+                type: 'FeatureCollection',
+                features: [{
+                    type: 'Feature',
+                    geometry: {
+                        type: 'LineString',
+                        coordinates: coordinates
+                    },
+                    properties: { objectId: obj.id }
+                }]
+            };
 
-                if (map.current.getSource(sourceId)) {
-                    (map.current.getSource(sourceId) as maplibregl.GeoJSONSource).setData(geoData);
-                } else {
-                    map.current.addSource(sourceId, { type: 'geojson', data: geoData });
+            if (map.current.getSource(sourceId)) {
+                (map.current.getSource(sourceId) as maplibregl.GeoJSONSource).setData(geoData);
+            } else {
+                map.current.addSource(sourceId, { type: 'geojson', data: geoData });
 
-                    let color = '#fca5a5';
-                    if (obj.id.includes('drone')) color = '#fbbf24';
-                    if (obj.id.includes('vehicle')) color = '#34d399';
+                let color = '#fca5a5';
+                if (obj.id.includes('drone')) color = '#fbbf24';
+                if (obj.id.includes('vehicle')) color = '#34d399';
 
-                    map.current.addLayer({
-                        id: layerId,
-                        type: 'line',
-                        source: sourceId,
-                        paint: {
-                            'line-color': color,
-                            'line-width': 2,
-                            'line-opacity': 0.6
-                        }
-                    });
-                }
-            } catch (e) {
-                console.error(`Failed to update trail for ${obj.id}`, e);
+                map.current.addLayer({
+                    id: layerId,
+                    type: 'line',
+                    source: sourceId,
+                    paint: {
+                        'line-color': color,
+                        'line-width': 2,
+                        'line-opacity': 0.6
+                    }
+                });
             }
         }
     };
@@ -0,0 +1,202 @@
+"""
+Load-test mode for the telemetry generator.
+
+Simulates a large fleet with the generator's movement models and sends it
+to the backend at a fixed aggregate rate through a pooled asyncio HTTP
+client, optionally in batches, then reports throughput, errors and
+latency percentiles.
+
+    python loadtest.py --objects 10000 --rate 5000 --batch 100 --duration 60
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from collections import Counter
+from typing import List, Optional
+
+import httpx
+
+from generator import IntermittentObject, SimulatedObject
+
+MOVEMENTS = ("circle", "linear", "lateral_bounce", "intermittent")
+
+def build_fleet(count: int, seed: int) -> List[SimulatedObject]:
+    """
+    `count` objects spread over the movement models round-robin, starting
+    at random points around Iqaluit (lateral_bounce objects cross Canada).
+    """
+    rng = random.Random(seed)
+    fleet = []
+    for i in range(count):
+        movement = MOVEMENTS[i % len(MOVEMENTS)]
+        lat = 63.7467 + rng.uniform(-0.5, 0.5)
+        lon = -68.5170 + rng.uniform(-1.0, 1.0)
+        obj_id = f"load_{movement}_{i}"
+        if movement == "intermittent":
+            obj = IntermittentObject(obj_id, lat, lon, "circle", cycle_duration=120, on_duration=60)
+        elif movement == "lateral_bounce":
+            obj = SimulatedObject(obj_id, rng.uniform(50, 65), rng.uniform(-130, -55), movement)
+        else:
+            obj = SimulatedObject(obj_id, lat, lon, movement)
+        # Stagger the intermittent cycles so the fleet does not go quiet at once
+        obj.tick = rng.randrange(120)
+        fleet.append(obj)
+    return fleet
+
+class Stats:
+    def __init__(self):
+        self.requests = 0
+        self.points_sent = 0
+        self.points_accepted = 0
+        self.points_silent = 0
+        self.errors = 0
+        self.statuses: Counter = Counter()
+        self.latencies: List[float] = []
+
+    def record(self, status: Optional[int], latency_s: float, sent: int, accepted: int):
+        self.requests += 1
+        self.points_sent += sent
+        self.points_accepted += accepted
+        self.statuses[status if status is not None else "error"] += 1
+        if status is None or status >= 400:
+            self.errors += 1
+        self.latencies.append(latency_s)
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def histogram(sorted_values: List[float], buckets_ms=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)):
+    """
+    Request counts per latency bucket (upper bounds in ms).
+    """
+    counts = []
+    i = 0
+    for bound in buckets_ms:
+        start = i
+        while i < len(sorted_values) and sorted_values[i] * 1000 <= bound:
+            i += 1
+        counts.append((f"<= {bound} ms", i - start))
+    counts.append((f"> {buckets_ms[-1]} ms", len(sorted_values) - i))
+    return counts
+
+async def send(client: httpx.AsyncClient, url: str, payloads: List[dict], batched: bool,
+               scheduled: float, stats: Stats, limit: asyncio.Semaphore):
+    status = None
+    accepted = 0
+    try:
+        if batched:
+            response = await client.post(url + "batch", json=payloads)
+        else:
+            response = await client.post(url, json=payloads[0])
+        status = response.status_code
+        if batched and status < 400:
+            accepted = response.json().get("accepted", 0)
+        elif status < 400:
+            accepted = 1
+    except httpx.HTTPError:
+        pass
+    finally:
+        limit.release()
+    # Latency is measured from when the request was due, not when it went
+    # out, so a backed-up client does not hide server slowness
+    stats.record(status, time.perf_counter() - scheduled, len(payloads), accepted)
+
+async def run_load(url: str, objects: int, rate: float, batch: int, duration: float,
+                   concurrency: int, seed: int) -> dict:
+    fleet = build_fleet(objects, seed)
+    stats = Stats()
+    limit = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    batched = batch > 1
+    interval = batch / rate
+    tasks = set()
+
+    async with httpx.AsyncClient(limits=limits, timeout=10.0) as client:
+        started = time.perf_counter()
+        next_due = started
+        cursor = 0
+        while next_due - started < duration:
+            # Open loop: requests are scheduled at a fixed rate regardless of
+            # how quickly the backend answers
+            delay = next_due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            payloads = []
+            while len(payloads) < batch:
+                obj = fleet[cursor]
+                cursor = (cursor + 1) % len(fleet)
+                obj.update()
+                if obj.should_send():
+                    payloads.append(obj.get_payload())
+                else:
+                    stats.points_silent += 1
+            await limit.acquire()
+            task = asyncio.create_task(send(client, url, payloads, batched, next_due, stats, limit))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            next_due += interval
+        if tasks:
+            await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(stats.latencies)
+    return {
+        "objects": objects,
+        "target_rate_pps": rate,
+        "batch": batch,
+        "duration_s": round(elapsed, 3),
+        "requests": stats.requests,
+        "points_sent": stats.points_sent,
+        "points_accepted": stats.points_accepted,
+        "throughput_pps": round(stats.points_accepted / elapsed, 1) if elapsed else 0.0,
+        "error_rate": round(stats.errors / stats.requests, 4) if stats.requests else 0.0,
+        "statuses": {str(k): v for k, v in sorted(stats.statuses.items(), key=str)},
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else None,
+        },
+        "latency_histogram": dict(histogram(latencies)),
+    }
+
+def print_report(report: dict):
+    print(f"Objects:      {report['objects']}  (batch {report['batch']}, target {report['target_rate_pps']} pts/s)")
+    print(f"Duration:     {report['duration_s']} s, {report['requests']} requests")
+    print(f"Points:       {report['points_sent']} sent, {report['points_accepted']} accepted")
+    print(f"Throughput:   {report['throughput_pps']} pts/s")
+    print(f"Error rate:   {report['error_rate'] * 100:.2f}%  {report['statuses']}")
+    lat = report["latency_ms"]
+    print(f"Latency:      p50 {lat['p50']} ms, p95 {lat['p95']} ms, p99 {lat['p99']} ms, max {lat['max']} ms")
+    total = max(1, report["requests"])
+    for bucket, count in report["latency_histogram"].items():
+        print(f"  {bucket:>12} {count:8d} {'#' * round(40 * count / total)}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Telemetry load generator")
+    parser.add_argument("--url", default="http://localhost:8000/api/telemetry/")
+    parser.add_argument("--objects", type=int, default=10000)
+    parser.add_argument("--rate", type=float, default=2000.0, help="target aggregate points per second")
+    parser.add_argument("--batch", type=int, default=1, help="points per request; >1 uses /batch")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to send for")
+    parser.add_argument("--concurrency", type=int, default=64, help="max in-flight requests / pooled connections")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_load(args.url, args.objects, args.rate, args.batch, args.duration,
+                                  args.concurrency, args.seed))
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+if __name__ == "__main__":
+    main()